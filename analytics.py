@@ -0,0 +1,486 @@
+"""
+Score trend analytics for the User Portal System
+Loads score_activity for one student or the whole cohort into columnar arrays (day number, subject code,
+int16 score) sorted by (user, subject, day) and computes per-series trend slopes, rolling averages,
+volatility and streaks with whole-array NumPy operations instead of a Python loop per row.
+Without NumPy the same metrics come from the pure-Python loop, which is also the benchmark baseline.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+import database
+from cache import create_cache
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install numpy for the vectorized engine
+    np = None
+
+# Configuration
+ANALYTICS_WINDOW = int(os.environ.get('ANALYTICS_WINDOW', '7'))                    # rolling average points
+ANALYTICS_STREAK_THRESHOLD = int(os.environ.get('ANALYTICS_STREAK_THRESHOLD', '60'))
+ANALYTICS_COHORT_DAYS = int(os.environ.get('ANALYTICS_COHORT_DAYS', '365'))            # widest cohort range
+ANALYTICS_COHORT_REFRESH_SECONDS = float(os.environ.get('ANALYTICS_COHORT_REFRESH_SECONDS', '60'))
+ANALYTICS_COHORT_TTL = int(os.environ.get('ANALYTICS_COHORT_TTL', '300'))                # per-range summaries
+
+ENGINE = 'numpy' if np is not None else 'python'
+EPOCH = date(1970, 1, 1)
+
+# Per-series results; 'rolling' (one value per row) is returned alongside
+METRICS = ('user_id', 'subject', 'count', 'first_day', 'last_day', 'mean', 'slope', 'volatility',
+           'latest_average', 'current_streak', 'longest_streak')
+COHORT_METRICS = ('slope', 'mean', 'volatility', 'latest_average', 'longest_streak')
+
+# Day numbers are days since 1970-01-01; rows the score summaries skip are skipped here too (SQLite 3.38+)
+DAY = 'unixepoch(date) / 86400'
+KEYED = 'user_id IS NOT NULL AND subject IS NOT NULL'
+ROWS_QUERY = f'''
+    SELECT user_id, subject, {DAY}, score
+    FROM score_activity
+    WHERE {{filters}} AND {KEYED} AND score IS NOT NULL AND {DAY} IS NOT NULL
+    ORDER BY user_id, subject, date
+'''
+# One row per series with its (day << 16 | score) values as text: building a Python tuple per score
+# costs several times more than SQLite's scan, so NumPy parses the numbers in bulk instead.
+# A missing score or invalid date makes the value NULL, which group_concat leaves out
+SERIES_QUERY = f'''
+    SELECT user_id, subject, group_concat(({DAY} << 16) | (score & 65535))
+    FROM score_activity
+    WHERE {{filters}} AND {KEYED}
+    GROUP BY user_id, subject
+    ORDER BY user_id, subject
+'''
+# Moves when activity scores are added, removed or changed (via the all-time summaries the triggers keep),
+# and not for unrelated commits; read at most once per refresh interval
+COHORT_MARKER_QUERY = '''
+    SELECT count(*), total(count), total(total), total(total_squares) FROM score_summary
+    WHERE source = 'activity' AND grain = 'all'
+'''
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+def day_date(number):
+    return (EPOCH + timedelta(days=int(number))).isoformat()
+
+
+class ScoreColumns:
+    """score_activity rows as parallel columns sorted by (user, subject, day); subject is a code into subjects"""
+
+    def __init__(self, subjects, user_ids, subject_codes, days, scores):
+        self.subjects = subjects
+        self.user_ids = user_ids
+        self.subject_codes = subject_codes
+        self.days = days
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.days)
+
+    def select(self, start=None, end=None, subjects=None):
+        """Rows in [start, end] for the given subjects (NumPy columns)"""
+        mask = np.ones(len(self.days), dtype=bool)
+        if start:
+            mask &= self.days >= day_number(start)
+        if end:
+            mask &= self.days <= day_number(end)
+        if subjects is not None:
+            mask &= np.isin(self.subject_codes, [i for i, s in enumerate(self.subjects) if s in subjects])
+        return ScoreColumns(self.subjects, self.user_ids[mask], self.subject_codes[mask],
+                            self.days[mask], self.scores[mask])
+
+
+def load_columns(conn, user_id=None, start=None, end=None, subjects=None, engine=ENGINE):
+    """Read one student's (or every student's) scores in [start, end] as ScoreColumns"""
+    where, params = ['1'], {}
+    if user_id is not None:
+        where.append('user_id = :user_id')
+        params['user_id'] = user_id
+    if subjects:
+        placeholders = {f"s{i}": subject for i, subject in enumerate(subjects)}
+        where.append(f"subject IN ({', '.join(':' + name for name in placeholders)})")
+        params.update(placeholders)
+    if start:
+        where.append('date >= :start')
+        params['start'] = start.isoformat()
+    if end:
+        where.append('date <= :end')
+        params['end'] = end.isoformat()
+    filters = ' AND '.join(where)
+    if engine == 'numpy':
+        return _parse_series(conn.execute(SERIES_QUERY.format(filters=filters), params).fetchall())
+
+    users, names, days, scores = [], [], [], []
+    for row in conn.execute(ROWS_QUERY.format(filters=filters), params):
+        users.append(row[0])
+        names.append(row[1])
+        days.append(row[2])
+        scores.append(row[3])
+    subject_names = sorted(set(names))
+    codes = {subject: code for code, subject in enumerate(subject_names)}
+    return ScoreColumns(subject_names, users, [codes[name] for name in names], days, scores)
+
+
+def _parse_series(series):
+    series = [row for row in series if row[2] is not None]
+    if not series:
+        return ScoreColumns([], *(np.zeros(0, dtype=t) for t in (np.int32, np.int16, np.int32, np.int16)))
+    user_ids, names, values = zip(*series)
+    subject_names, codes = np.unique(np.array(names), return_inverse=True)
+    counts = np.array([text.count(',') + 1 for text in values])
+    # float64 holds every packed value exactly (days << 16 stays far below 2 ** 53)
+    packed = np.array(','.join(values).split(','), dtype=np.float64).astype(np.int64)
+    columns = ScoreColumns(
+        subject_names.tolist(),
+        np.repeat(np.array(user_ids, dtype=np.int32), counts),
+        np.repeat(codes.astype(np.int16), counts),
+        (packed >> 16).astype(np.int32),
+        (packed & 0xFFFF).astype(np.uint16).view(np.int16),
+    )
+    # group_concat follows the (user_id, subject, date) index scan; sort should the planner ever differ
+    series_id = np.repeat(np.arange(len(counts)), counts)
+    if np.any((np.diff(columns.days) < 0) & (series_id[1:] == series_id[:-1])):
+        order = np.lexsort((columns.days, series_id))
+        columns.days, columns.scores = columns.days[order], columns.scores[order]
+    return columns
+
+
+class CohortSnapshot:
+    """
+    Every student's scores of the last days days kept as NumPy columns, so class-wide trends are array
+    arithmetic rather than a multi-million row read per request. Reloaded like the rank indexes: at most
+    once per refresh interval, when the activity scores changed, built outside the lock and swapped in.
+    Cohort ranges are limited to that window, so no request falls back to reading the whole history.
+    """
+
+    def __init__(self, days=ANALYTICS_COHORT_DAYS, refresh_seconds=ANALYTICS_COHORT_REFRESH_SECONDS):
+        self.days = days
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()    # one load at a time; owns the connection
+        self._conn = None
+        self._pid = None
+        self._data_version = None
+        self._marker = None
+        self._loaded_at = None
+        self._checked_at = None
+        self._generation = 0
+        self.columns = None
+        self.start = None
+        self.loads = 0
+        self.skipped_loads = 0
+        self.last_load_ms = None
+        self.summaries = create_cache('local', 64, ANALYTICS_COHORT_TTL)
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(database.DATABASE_NAME, timeout=5.0, check_same_thread=False)
+            self._conn.execute('PRAGMA busy_timeout=5000')
+            self._pid = os.getpid()
+            self._loaded_at = None
+        return self._conn
+
+    def _due(self, start):
+        return (self._loaded_at is None or self.start != start
+                or time.monotonic() - self._checked_at >= self.refresh_seconds)
+
+    def _sync(self):
+        """
+        Load on first use (callers wait). Afterwards one caller per refresh interval, or on a new day,
+        checks for changes while the others keep using the current snapshot.
+        """
+        start = date.today() - timedelta(days=self.days - 1)
+        if not self._due(start):
+            return
+        if not self._load_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self._due(start):
+                self._refresh(self._connection(), start)
+        finally:
+            self._load_lock.release()
+
+    def _refresh(self, conn, start):
+        """Reload when the day changed, or another connection committed and the activity scores changed"""
+        self._checked_at = time.monotonic()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        current = self._loaded_at is not None and self.start == start
+        if current and version == self._data_version:
+            return
+        self._data_version = version
+        marker = conn.execute(COHORT_MARKER_QUERY).fetchone()
+        if current and marker == self._marker:
+            self.skipped_loads += 1
+            return
+        self._marker = marker
+
+        started = time.perf_counter()
+        with self._lock:
+            generation = self._generation
+        columns = load_columns(conn, start=start)
+        with self._lock:
+            self.columns = columns
+            self.start = start
+            if generation == self._generation:
+                self._loaded_at = time.monotonic()
+            self.loads += 1
+            self.last_load_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.summaries.invalidate_all()
+
+    def summary(self, start=None, end=None, subjects=None, window=ANALYTICS_WINDOW,
+                threshold=ANALYTICS_STREAK_THRESHOLD):
+        """
+        Cohort summary for [start, end]; without start it covers the whole snapshot window.
+        Raises ValueError for ranges starting before the window
+        """
+        first = date.today() - timedelta(days=self.days - 1)
+        if start is None:
+            start = first
+        elif start < first:
+            raise ValueError(f'Cohort trends cover at most the last {self.days} days')
+        key = (start, end, tuple(subjects or ()), window, threshold)
+        if np is None:
+            summary = self.summaries.get(key)
+            if summary is None:
+                with database.get_db() as conn:
+                    summary = cohort_trends(conn, start, end, subjects, window, threshold)
+                self.summaries.set(key, summary)
+            return summary
+        self._sync()
+        with self._lock:
+            summary = self.summaries.get(key)
+            snapshot, loads = self.columns, self.loads
+        if summary is None:
+            columns = snapshot.select(start, end, subjects)
+            summary = summarize_cohort(columns.subjects, compute_trends(columns, window, threshold)[0])
+            with self._lock:
+                if self.loads == loads:   # not computed from a snapshot that was replaced meanwhile
+                    self.summaries.set(key, summary)
+        return summary
+
+    def invalidate(self):
+        """Reload on next use (e.g. after the database was reset)"""
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'engine': ENGINE,
+                'rows': len(self.columns) if self.columns is not None else 0,
+                'start': self.start.isoformat() if self.start else None,
+                'loads': self.loads,
+                'skipped_loads': self.skipped_loads,
+                'last_load_ms': self.last_load_ms,
+                'refresh_seconds': self.refresh_seconds,
+                'summary_cache': self.summaries.stats(),
+            }
+
+
+def compute_trends(columns, window=ANALYTICS_WINDOW, threshold=ANALYTICS_STREAK_THRESHOLD):
+    """
+    Metrics for every (user, subject) series: count, first/last day, mean, least-squares slope in points
+    per week, volatility (standard deviation), latest rolling average over the trailing window rows, and
+    the current and longest streaks of consecutive days scoring at least threshold.
+    Returns ({metric: column}, rolling average per row)
+    """
+    if isinstance(columns.days, list):
+        return _trends_python(columns, window, threshold)
+    return _trends_numpy(columns, window, threshold)
+
+
+def _trends_numpy(columns, window, threshold):
+    days, scores = columns.days, columns.scores
+    n = len(days)
+    if not n:
+        empty = {name: np.zeros(0) for name in METRICS}
+        return empty, np.zeros(0)
+
+    # A series starts wherever (user, subject) changes; group numbers every row by its series
+    first = np.empty(n, dtype=bool)
+    first[0] = True
+    first[1:] = (columns.user_ids[1:] != columns.user_ids[:-1]) | (columns.subject_codes[1:] != columns.subject_codes[:-1])
+    starts = np.flatnonzero(first)
+    ends = np.append(starts[1:], n) - 1
+    group = np.cumsum(first) - 1
+    count = np.diff(np.append(starts, n))
+
+    # Least squares on days since the series' first day (keeps the sums small)
+    x = (days - days[starts][group]).astype(np.float64)
+    y = scores.astype(np.float64)
+    sum_x, sum_y = np.bincount(group, x), np.bincount(group, y)
+    sum_xx, sum_xy, sum_yy = np.bincount(group, x * x), np.bincount(group, x * y), np.bincount(group, y * y)
+    mean = sum_y / count
+    spread = count * sum_xx - sum_x * sum_x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(spread > 0, (count * sum_xy - sum_x * sum_y) / spread * 7, np.nan)
+    volatility = np.sqrt(np.maximum(sum_yy / count - mean * mean, 0))
+
+    # Trailing mean of up to window rows, never reaching back into the previous series
+    totals = np.concatenate(([0.0], np.cumsum(y)))
+    index = np.arange(n)
+    low = np.maximum(index - window + 1, starts[group])
+    rolling = (totals[index + 1] - totals[low]) / (index + 1 - low)
+
+    # A run continues when the previous row is the same series, the day before, and also scored high
+    good = scores >= threshold
+    linked = np.zeros(n, dtype=bool)
+    linked[1:] = ~first[1:] & (np.diff(days) == 1) & good[:-1]
+    run_start = good & ~linked
+    run_id = np.cumsum(run_start) - 1
+    run_length = np.bincount(run_id[good])
+    longest = np.zeros(len(starts), dtype=np.int64)
+    np.maximum.at(longest, group[run_start], run_length)
+    current = np.where(good[ends], run_length[run_id[ends]] if run_length.size else 0, 0)
+
+    metrics = {
+        'user_id': columns.user_ids[starts],
+        'subject': columns.subject_codes[starts],
+        'count': count,
+        'first_day': days[starts],
+        'last_day': days[ends],
+        'mean': mean,
+        'slope': slope,
+        'volatility': volatility,
+        'latest_average': rolling[ends],
+        'current_streak': current,
+        'longest_streak': longest,
+    }
+    return metrics, rolling
+
+
+def _trends_python(columns, window, threshold):
+    """The same metrics with a loop over every row"""
+    users, codes, days, scores = columns.user_ids, columns.subject_codes, columns.days, columns.scores
+    metrics = {name: [] for name in METRICS}
+    rolling = []
+    n = len(days)
+    i = 0
+    while i < n:
+        user, code, first_day = users[i], codes[i], days[i]
+        count = sum_x = sum_y = sum_xx = sum_xy = sum_yy = 0
+        total = 0.0
+        run = longest = 0
+        j = i
+        while j < n and users[j] == user and codes[j] == code:
+            x, y = days[j] - first_day, scores[j]
+            count += 1
+            sum_x += x
+            sum_y += y
+            sum_xx += x * x
+            sum_xy += x * y
+            sum_yy += y * y
+            total += y
+            if count > window:
+                total -= scores[j - window]
+            rolling.append(total / min(count, window))
+            if y >= threshold:
+                run = run + 1 if run and days[j] - days[j - 1] == 1 else 1
+                longest = max(longest, run)
+            else:
+                run = 0
+            j += 1
+        mean = sum_y / count
+        spread = count * sum_xx - sum_x * sum_x
+        for name, value in (
+                ('user_id', user), ('subject', code), ('count', count), ('first_day', first_day),
+                ('last_day', days[j - 1]), ('mean', mean),
+                ('slope', (count * sum_xy - sum_x * sum_y) / spread * 7 if spread > 0 else float('nan')),
+                ('volatility', max(sum_yy / count - mean * mean, 0) ** 0.5),
+                ('latest_average', rolling[-1]), ('current_streak', run), ('longest_streak', longest)):
+            metrics[name].append(value)
+        i = j
+    return metrics, rolling
+
+
+def _round(value):
+    value = float(value)
+    return None if value != value else round(value, 2)
+
+
+def user_trends(conn, user_id, start=None, end=None, subjects=None, window=ANALYTICS_WINDOW,
+                threshold=ANALYTICS_STREAK_THRESHOLD):
+    """Return {subject: {metrics..., 'series': [{date, score, rolling_average}]}} for one student"""
+    columns = load_columns(conn, user_id, start, end, subjects)
+    metrics, rolling = compute_trends(columns, window, threshold)
+    trends = {}
+    row = 0
+    for i in range(len(metrics['count'])):
+        count = int(metrics['count'][i])
+        series = [{'date': day_date(columns.days[k]), 'score': int(columns.scores[k]),
+                   'rolling_average': _round(rolling[k])} for k in range(row, row + count)]
+        row += count
+        trends[columns.subjects[metrics['subject'][i]]] = {
+            'count': count,
+            'first_date': day_date(metrics['first_day'][i]),
+            'last_date': day_date(metrics['last_day'][i]),
+            'mean': _round(metrics['mean'][i]),
+            'slope_per_week': _round(metrics['slope'][i]),
+            'volatility': _round(metrics['volatility'][i]),
+            'rolling_average': _round(metrics['latest_average'][i]),
+            'current_streak': int(metrics['current_streak'][i]),
+            'longest_streak': int(metrics['longest_streak'][i]),
+            'series': series,
+        }
+    return trends
+
+
+def _quartiles(values):
+    """[p25, median, p75] of the non-NaN values, or None when there are none"""
+    if np is not None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        return [_round(q) for q in np.percentile(values, [25, 50, 75])] if values.size else None
+    values = sorted(v for v in values if v == v)
+    if not values:
+        return None
+
+    def percentile(p):
+        position = (len(values) - 1) * p
+        low = int(position)
+        high = min(low + 1, len(values) - 1)
+        return _round(values[low] + (values[high] - values[low]) * (position - low))
+    return [percentile(0.25), percentile(0.5), percentile(0.75)]
+
+
+def summarize_cohort(subjects, metrics):
+    """Per subject: student count, share with an upward trend, and quartiles of each metric"""
+    codes = metrics['subject']
+    vectorized = not isinstance(codes, list)
+    summary = {}
+    for code, subject in enumerate(subjects):
+        if vectorized:
+            mask = codes == code
+            picked = {name: metrics[name][mask] for name in COHORT_METRICS}
+            improving = int(np.count_nonzero(picked['slope'] > 0))
+        else:
+            picked = {name: [v for v, c in zip(metrics[name], codes) if c == code] for name in COHORT_METRICS}
+            improving = sum(1 for slope in picked['slope'] if slope > 0)
+        students = len(picked['slope'])
+        if not students:
+            continue
+        summary[subject] = {
+            'students': students,
+            'improving_share': round(improving / students, 4),
+            **{name: dict(zip(('p25', 'median', 'p75'), _quartiles(values) or (None, None, None)))
+               for name, values in picked.items()},
+        }
+    return summary
+
+
+def cohort_trends(conn, start=None, end=None, subjects=None, window=ANALYTICS_WINDOW,
+                  threshold=ANALYTICS_STREAK_THRESHOLD):
+    """Class-wide distribution of every student's trend metrics per subject"""
+    columns = load_columns(conn, None, start, end, subjects)
+    metrics, _ = compute_trends(columns, window, threshold)
+    return summarize_cohort(columns.subjects, metrics)
+
+
+cohort = CohortSnapshot()
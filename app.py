@@ -1,345 +1,84 @@
-from flask import Flask, request, jsonify, render_template_string, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 import sqlite3
 import os
-import re
 from datetime import datetime
-import openai
+from database import DATABASE_NAME, get_db
+from dashboard_data import load_dashboard_context
+from cache import dashboard_cache, DEFAULT_DASHBOARD_KEY
+from migrations import migrate
+from seed import SAMPLE_USERS, seed_sample_data
+import llm_client
+from doubt_cache import doubt_cache
+from static_page import StaticPage
+from fragments import DASHBOARD_LAZY_PANELS, PANELS, panel_renderer, panel_versions
+from passwords import HasherBusyError, hasher as password_hasher, needs_rehash
+from login_guard import login_guard
+import bulk_users
+import forum
+import forum_events
+import forum_search
+import forum_tags
+from forum_writer import SubmissionPendingError, WriterBusyError, writer as forum_writer
+from performance import PerformanceQuery, load_performance
+import analytics
+from rankings import RANKING_LEADERBOARD_MAX, rankings
+from validators import INPUT_FIELDS, first_error, record_errors, validate_email
 
 app = Flask(__name__)
 CORS(app)
 
-# Custom filter to parse JSON string to list
 import json
-@app.template_filter('json_to_tags')
-def json_to_tags_filter(s):
-    try:
-        tags = json.loads(s)
-        if isinstance(tags, list):
-            return ['#' + str(tag).strip() for tag in tags if tag]
-        return []
-    except Exception:
-        return []
 
 # Configuration
-DATABASE_NAME = 'user_portal.db'
 PORT = 5000
+USERS_MAX_PAGE_SIZE = 1000
+USERS_FETCH_SIZE = 500  # rows pulled from the cursor per chunk when streaming /api/users
+
+# Columns /api/users may return (never the password)
+USER_FIELDS = ('id', 'first_name', 'last_name', 'email_address', 'phone_number', 'registration_date')
+
+def bootstrap_database(seed=True):
+    """Bring the schema up to date without touching existing data; seed only an empty database"""
+    with get_db() as conn:
+        applied = migrate(conn)
+        has_users = conn.execute('SELECT 1 FROM users LIMIT 1').fetchone() is not None
+        if seed and not has_users:
+            seed_sample_data(conn)
+    if applied or (seed and not has_users):
+        dashboard_cache.invalidate_all()
+
+    if applied:
+        print(f"✅ Applied schema migrations: {', '.join(map(str, applied))}")
+    if seed and not has_users:
+        print(f"✅ Database '{DATABASE_NAME}' was empty - sample data seeded")
+    else:
+        print(f"✅ Database '{DATABASE_NAME}' ready (existing data kept)")
 
 def init_database():
-    """Initialize the SQLite database with sample data"""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    # Drop tables if they exist (for schema update)
-    cursor.execute('DROP TABLE IF EXISTS users')
-    cursor.execute('DROP TABLE IF EXISTS attendance')
-    cursor.execute('DROP TABLE IF EXISTS notes')
-    cursor.execute('DROP TABLE IF EXISTS subjects')
-    cursor.execute('DROP TABLE IF EXISTS timetable')
-    cursor.execute('DROP TABLE IF EXISTS test_scores')
-    cursor.execute('DROP TABLE IF EXISTS notice_board')
-    cursor.execute('DROP TABLE IF EXISTS polls')
-    cursor.execute('DROP TABLE IF EXISTS poll_participants')
-    cursor.execute('DROP TABLE IF EXISTS upcoming_tasks')
-
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            email_address TEXT UNIQUE NOT NULL,
-            phone_number TEXT NOT NULL,
-            password TEXT NOT NULL,
-            registration_date DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Create attendance table
-    cursor.execute('''
-        CREATE TABLE attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            attended INTEGER,
-            total INTEGER,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Create notes table
-    cursor.execute('''
-        CREATE TABLE notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            note_type TEXT,
-            count INTEGER,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Create subjects table
-    cursor.execute('''
-        CREATE TABLE subjects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            subject_name TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Create timetable table
-    cursor.execute('''
-        CREATE TABLE timetable (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            subject TEXT,
-            date TEXT,
-            time TEXT,
-            status TEXT,
-            duration TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Create test_scores table
-    cursor.execute('''
-        CREATE TABLE test_scores (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            subject TEXT,
-            lesson TEXT,
-            score REAL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Create notice_board table
-    cursor.execute('''
-        CREATE TABLE notice_board (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            title TEXT,
-            image_url TEXT,
-            date TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Create polls table
-    cursor.execute('''
-        CREATE TABLE polls (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            title TEXT,
-            professor TEXT,
-            end_time TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Create poll_participants table
-    cursor.execute('''
-        CREATE TABLE poll_participants (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            poll_id INTEGER,
-            participant_img TEXT,
-            FOREIGN KEY(poll_id) REFERENCES polls(id)
-        )
-    ''')
-
-    # Create upcoming_tasks table
-    cursor.execute('''
-        CREATE TABLE upcoming_tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            code TEXT,
-            title TEXT,
-            time TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Drop score_activity table if it exists (for schema update)
-    cursor.execute('DROP TABLE IF EXISTS score_activity')
-
-    # Create score_activity table for subject-wise daily scores
-    cursor.execute('''
-        CREATE TABLE score_activity (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            subject TEXT,
-            date TEXT,
-            score INTEGER,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-
-    # Drop queries table if it exists (for schema update)
-    cursor.execute('DROP TABLE IF EXISTS queries')
-    # Drop answers table if it exists (for schema update)
-    cursor.execute('DROP TABLE IF EXISTS answers')
-
-    # Create queries table for Raise Query submissions
-    cursor.execute('''
-        CREATE TABLE queries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            special_mentions TEXT,
-            brief TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Create answers table for teacher answers/comments
-    cursor.execute('''
-        CREATE TABLE answers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            query_id INTEGER,
-            answer_text TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(query_id) REFERENCES queries(id)
-        )
-    ''')
-
-    # Sample user data
-    sample_users = [
-        ('Alex', 'Johnson', 'alex.johnson@email.com', '+1 555-0101', 'password123'),
-        ('Maria', 'Garcia', 'maria.garcia@email.com', '+1 555-0102', 'securepass'),
-        ('David', 'Chen', 'david.chen@email.com', '+1 555-0103', 'davidpass'),
-        ('Sarah', 'Williams', 'sarah.williams@email.com', '+1 555-0104', 'sarahpw'),
-        ('Michael', 'Brown', 'michael.brown@email.com', '+1 555-0105', 'michaelpw'),
-        ('Emily', 'Davis', 'emily.davis@email.com', '+1 555-0106', 'emilypw'),
-        ('James', 'Miller', 'james.miller@email.com', '+1 555-0107', 'jamespw'),
-        ('Lisa', 'Wilson', 'lisa.wilson@email.com', '+1 555-0108', 'lisapw'),
-        ('Robert', 'Taylor', 'robert.taylor@email.com', '+1 555-0109', 'robertpw'),
-        ('Jennifer', 'Anderson', 'jennifer.anderson@email.com', '+1 555-0110', 'jenniferpw')
-    ]
-    
-    # Insert sample data
-    user_ids = []
-    for user in sample_users:
-        cursor.execute('''
-            INSERT OR IGNORE INTO users (first_name, last_name, email_address, phone_number, password) 
-            VALUES (?, ?, ?, ?, ?)
-        ''', user)
-        user_ids.append(cursor.lastrowid if cursor.lastrowid else cursor.execute('SELECT id FROM users WHERE email_address=?', (user[2],)).fetchone()[0])
-
-    # Insert dummy dashboard data for all users
-    for idx, user_id in enumerate(user_ids):
-        # Attendance (vary attended for each user for realism)
-        attended = 254 - idx * 10 if (254 - idx * 10) > 0 else 100 + idx * 5
-        total = 300
-        cursor.execute('INSERT INTO attendance (user_id, attended, total) VALUES (?, ?, ?)', (user_id, attended, total))
-
-        # Notes (vary counts slightly)
-        cursor.execute('INSERT INTO notes (user_id, note_type, count) VALUES (?, ?, ?)', (user_id, "Personalised Notes", 254 - idx * 5))
-        cursor.execute('INSERT INTO notes (user_id, note_type, count) VALUES (?, ?, ?)', (user_id, "Subject Planner", 25 + idx))
-        cursor.execute('INSERT INTO notes (user_id, note_type, count) VALUES (?, ?, ?)', (user_id, "Notes & PPT", 50 + idx * 2))
-
-        # Subjects (same subjects for all)
-        for subject in ["Mathematics", "Physics", "Chemistry", "Economics", "Biology"]:
-            cursor.execute('INSERT INTO subjects (user_id, subject_name) VALUES (?, ?)', (user_id, subject))
-
-        # Score Activity (subject-wise daily scores for 14 days, only for Mathematics, Physics, Chemistry)
-        import math
-        import random
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        days = 14
-        for subject in ["Mathematics", "Physics", "Chemistry"]:
-            for i in range(days):
-                date = (today - timedelta(days=days - i - 1)).strftime('%Y-%m-%d')
-                if subject == "Mathematics":
-                    score = 60 + int(20 * math.sin(i / 2.0) + 10 * math.cos(i / 3.0) + random.randint(-5, 5))
-                elif subject == "Physics":
-                    score = 45 + int(30 * math.cos(i / 1.7) + 8 * math.sin(i / 2.5) + random.randint(-8, 8))
-                elif subject == "Chemistry":
-                    score = 55 + int(18 * math.sin(i / 1.3) - 12 * math.cos(i / 2.2) + random.randint(-10, 10))
-                else:
-                    score = 50 + random.randint(-10, 10)
-                score = max(0, min(100, score))
-                cursor.execute('INSERT INTO score_activity (user_id, subject, date, score) VALUES (?, ?, ?, ?)', (user_id, subject, date, score))
-
-        # Timetable (shift dates for each user)
-        timetable_data = [
-            ("Mathematics", "18-Apr-2022", "10:00 am", "Complete", "50 Minutes"),
-            ("Physics", "18-Apr-2022", "11:05 pm", "Complete", "50 Minutes"),
-            ("Chemistry", "18-Apr-2022", "02:00 pm", "Complete", "50 Minutes"),
-            ("Physics", "19-Apr-2022", "10:00 am", "Pending", "50 Minutes"),
-            ("Economics", "19-Apr-2022", "02:00 pm", "Pending", "50 Minutes"),
-            ("Physics", "20-Apr-2022", "02:00 pm", "Pending", "50 Minutes"),
-            ("Mathematics", "20-Apr-2022", "02:00 pm", "Pending", "50 Minutes"),
-        ]
-        for row in timetable_data:
-            cursor.execute('INSERT INTO timetable (user_id, subject, date, time, status, duration) VALUES (?, ?, ?, ?, ?, ?)', (user_id, *row))
-
-        # Test Scores (vary scores for each user)
-        test_scores = [
-            (8.5 - idx * 0.2, "Physics", "Lesson 4"),
-            (6.0 + idx * 0.3, "Chemistry", "Lesson 2"),
-            (7.2 + idx * 0.1, "Maths", "Lesson 2"),
-            (9.0 - idx * 0.1, "Economics", "Lesson 2"),
-            (8.0 + idx * 0.2, "Biology", "Lesson 2"),
-            (8.8 - idx * 0.1, "Biology", "Lesson 6"),
-            (6.8 + idx * 0.2, "Biology", "Lesson 5"),
-        ]
-        for score, subject, lesson in test_scores:
-            cursor.execute('INSERT INTO test_scores (user_id, subject, lesson, score) VALUES (?, ?, ?, ?)', (user_id, subject, lesson, round(score, 1)))
-
-        # Notice Board (dummy data)
-        notice_data = [
-            ("Weekly Maths MCQs & General", "https://images.unsplash.com/photo-1506744038136-46273834b3fb?auto=format&fit=facearea&w=48&h=48", "21 Apr 2022"),
-            ("Weekly Physics MCQs", "https://images.unsplash.com/photo-1465101046530-73398c7f28ca?auto=format&fit=facearea&w=48&h=48", "22 Apr 2022"),
-            ("Chemistry Quiz-22", "https://images.unsplash.com/photo-1519125323398-675f0ddb6308?auto=format&fit=facearea&w=48&h=48", "22 Apr 2022"),
-            ("Biology Special Classes", "https://images.unsplash.com/photo-1462331940025-496dfbfc7564?auto=format&fit=facearea&w=48&h=48", "25 Apr 2022"),
-        ]
-        for title, img, date in notice_data:
-            cursor.execute('INSERT INTO notice_board (user_id, title, image_url, date) VALUES (?, ?, ?, ?)', (user_id, title, img, date))
-
-        # Ongoing Poll (one per user)
-        cursor.execute('INSERT INTO polls (user_id, title, professor, end_time) VALUES (?, ?, ?, ?)', (
-            user_id, "Maths Extra Class Poll", "Prof. Joshi", "22 Apr 2022, 12:30 pm"
-        ))
-        poll_id = cursor.lastrowid
-
-        # Poll Participants (dummy avatars)
-        poll_participants = [
-            "https://randomuser.me/api/portraits/men/31.jpg",
-            "https://randomuser.me/api/portraits/women/32.jpg",
-            "https://randomuser.me/api/portraits/men/33.jpg",
-            "https://randomuser.me/api/portraits/women/34.jpg",
-            "https://randomuser.me/api/portraits/men/35.jpg",
-        ]
-        for img in poll_participants:
-            cursor.execute('INSERT INTO poll_participants (poll_id, participant_img) VALUES (?, ?)', (poll_id, img))
-
-        # Upcoming Tasks/Tests (dummy data)
-        tasks = [
-            ("P", "Metals Purification Methods", "08:30 am, 22 Apr 2022"),
-            ("M", "Maths Algorithm", "08:30 am, 22 Apr 2022"),
-            ("D", "DNA & RNA Modifications", "08:30 am, 22 Apr 2022"),
-            ("F", "Fundamental Physics MCQs", "08:30 am, 22 Apr 2022"),
-        ]
-        for code, title, time in tasks:
-            cursor.execute('INSERT INTO upcoming_tasks (user_id, code, title, time) VALUES (?, ?, ?, ?)', (user_id, code, title, time))
-
-    conn.commit()
-    conn.close()
+    """Drop every table and re-create the database with sample data (destructive)"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        _drop_tables(cursor)
+        migrate(conn)
+        seed_sample_data(conn)
+    dashboard_cache.invalidate_all()
+    login_guard.emails.invalidate()
+    rankings.invalidate()
+    analytics.cohort.invalidate()
     print(f"✅ Database '{DATABASE_NAME}' initialized successfully!")
 
-def validate_email(email):
-    """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
-def validate_phone(phone):
-    """Validate phone number format"""
-    pattern = r'^[\+]?[0-9\s\-\(\)]{10,15}$'
-    return re.match(pattern, phone) is not None
+def _drop_tables(cursor):
+    """Drop every portal table so the schema can be rebuilt from scratch"""
+    tables = [row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        cursor.execute(f'DROP TABLE IF EXISTS "{table}"')
 
-def validate_name(name):
-    """Validate name (letters, spaces, hyphens only)"""
-    pattern = r'^[a-zA-Z\s\-\']+$'
-    return re.match(pattern, name) is not None
+def user_validation_error(first_name, last_name, email, phone, password):
+    """Return the first problem with a new account's fields, or None"""
+    record = dict(zip(INPUT_FIELDS, (first_name, last_name, email, phone, password)))
+    return first_error(record_errors(record, first_only=True))
 
 # HTML Template for the login page
 LOGIN_TEMPLATE = '''
@@ -706,100 +445,59 @@ LOGIN_TEMPLATE = '''
 </html>
 '''
 
+# The login page has no per-request context, so it is rendered and compressed once at startup
+login_page = StaticPage(app.jinja_env.from_string(LOGIN_TEMPLATE).render())
+
 # Routes
 @app.route('/')
 def home():
-    """Serve the login page"""
-    return render_template_string(LOGIN_TEMPLATE)
+    """Serve the pre-rendered login page"""
+    return login_page.response(request)
+
+def _dashboard_context():
+    """Return the (cached) dashboard template context, including panel data versions"""
+    context = dashboard_cache.get(DEFAULT_DASHBOARD_KEY)
+    if context is None:
+        with get_db() as conn:
+            context = load_dashboard_context(conn)
+        context['panel_versions'] = panel_versions(context)
+        dashboard_cache.set(DEFAULT_DASHBOARD_KEY, context)
+    return context
 
 @app.route('/dashboard')
 def dashboard():
     """Serve the dashboard page with dummy data from the database"""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-
-    # For demo, use the first user
-    cursor.execute('SELECT id, first_name, last_name FROM users ORDER BY id LIMIT 1')
-    user = cursor.fetchone()
-    user_id = user[0] if user else 1
-    user_name = f"{user[1]} {user[2]}" if user else "Student"
-
-    # Attendance
-    cursor.execute('SELECT attended, total FROM attendance WHERE user_id=?', (user_id,))
-    attendance = cursor.fetchone()
-    attendance_data = {'attended': attendance[0], 'total': attendance[1]} if attendance else {'attended': 0, 'total': 0}
-
-    # Notes
-    cursor.execute('SELECT note_type, count FROM notes WHERE user_id=?', (user_id,))
-    notes = cursor.fetchall()
-    notes_data = {row[0]: row[1] for row in notes}
-
-    # Timetable
-    cursor.execute('SELECT subject, date, time, status, duration FROM timetable WHERE user_id=? ORDER BY date, time', (user_id,))
-    timetable = cursor.fetchall()
-
-    # Test Scores
-    cursor.execute('SELECT score, subject, lesson FROM test_scores WHERE user_id=? ORDER BY id', (user_id,))
-    test_scores = cursor.fetchall()
-
-    # Notice Board
-    cursor.execute('SELECT title, image_url, date FROM notice_board WHERE user_id=? ORDER BY id', (user_id,))
-    notice_board = cursor.fetchall()
-
-    # Ongoing Poll (get latest poll for user)
-    cursor.execute('SELECT id, title, professor, end_time FROM polls WHERE user_id=? ORDER BY id DESC LIMIT 1', (user_id,))
-    poll = cursor.fetchone()
-    poll_data = None
-    poll_participants = []
-    if poll:
-        poll_id, poll_title, poll_prof, poll_end = poll
-        poll_data = {
-            'title': poll_title,
-            'professor': poll_prof,
-            'end_time': poll_end
-        }
-        cursor.execute('SELECT participant_img FROM poll_participants WHERE poll_id=?', (poll_id,))
-        poll_participants = [row[0] for row in cursor.fetchall()]
-
-    # Fetch subjects in a fixed order
-    FIXED_SUBJECT_ORDER = ["Mathematics", "Chemistry", "Physics", "Economics", "Biology"]
-    cursor.execute('SELECT subject_name FROM subjects WHERE user_id=?', (user_id,))
-    user_subjects = [row[0] for row in cursor.fetchall()]
-    # Keep only those in FIXED_SUBJECT_ORDER and preserve order
-    ordered_subjects = [subj for subj in FIXED_SUBJECT_ORDER if subj in user_subjects]
-
-    # Upcoming Tasks/Tests
-    cursor.execute('SELECT code, title, time FROM upcoming_tasks WHERE user_id=? ORDER BY id', (user_id,))
-    upcoming_tasks = cursor.fetchall()
-
-    # Fetch queries for Doubt Forum
-    cursor.execute('SELECT id, special_mentions, brief, created_at FROM queries ORDER BY created_at DESC')
-    queries = cursor.fetchall()
-
-    # Fetch answers for all queries
-    cursor.execute('SELECT query_id, answer_text, created_at FROM answers ORDER BY created_at ASC')
-    answers_raw = cursor.fetchall()
-    answers = {}
-    for query_id, answer_text, created_at in answers_raw:
-        answers.setdefault(query_id, []).append({'text': answer_text, 'created_at': created_at})
-
-    conn.close()
-
-    return render_template(
-        'dashboard.html',
-        user_name=user_name,
-        attendance=attendance_data,
-        notes=notes_data,
-        timetable=timetable,
-        test_scores=test_scores,
-        notice_board=notice_board,
-        poll_data=poll_data,
-        poll_participants=poll_participants,
-        upcoming_tasks=upcoming_tasks,
-        subjects=ordered_subjects,
-        queries=queries,
-        answers=answers
-    )
+    # For demo, the dashboard always shows the first user
+    context = _dashboard_context()
+
+    # ?lazy=1 serves the page shell only; the panels are fetched from /dashboard/panels/<name>
+    lazy = request.args.get('lazy', '1' if DASHBOARD_LAZY_PANELS else '0') == '1'
+    if lazy:
+        panels, timings = panel_renderer.placeholders(), {}
+    else:
+        panels, timings = panel_renderer.render_all(context)
+
+    response = Response(render_template('dashboard.html', panels=panels, **context))
+    if timings:
+        response.headers['Server-Timing'] = ', '.join(f"{name};dur={ms:.3f}" for name, ms in timings.items())
+    return response
+
+@app.route('/dashboard/panels/<name>')
+def dashboard_panel(name):
+    """Serve one rendered dashboard panel (HTML fragment) for lazy loading"""
+    if name not in PANELS:
+        return jsonify({'error': 'Unknown panel'}), 404
+    context = _dashboard_context()
+    version = context['panel_versions'][name]
+    if request.if_none_match.contains(version):
+        response = Response(status=304)
+    else:
+        html, elapsed_ms = panel_renderer.render(name, context)
+        response = Response(html, mimetype='text/html')
+        response.headers['Server-Timing'] = f"{name};dur={elapsed_ms:.3f}"
+    response.set_etag(version)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/authenticate', methods=['POST'])
 def authenticate_user():
@@ -816,75 +514,119 @@ def authenticate_user():
         if not validate_email(email):
             return jsonify({'error': 'Please enter a valid email address'}), 400
         
-        # Database query
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM users 
-            WHERE email_address = ? AND password = ?
-        ''', (email, password))
-        
-        user = cursor.fetchone()
-        conn.close()
-        
-        if user:
-            user_data = {
-                'id': user[0],
-                'first_name': user[1],
-                'last_name': user[2],
-                'email_address': user[3],
-                'phone_number': user[4],
-                'full_name': f"{user[1]} {user[2]}"
-            }
-            
-            return jsonify({
-                'success': True,
-                'message': 'Authentication successful',
-                'user': user_data
-            })
-        else:
-            # Check if email exists with different password
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('SELECT email_address FROM users WHERE email_address = ?', (email,))
-            email_exists = cursor.fetchone()
-            conn.close()
-            
-            if email_exists:
-                return jsonify({'error': 'Password does not match our records for this email'}), 401
-            else:
-                return jsonify({'error': 'No account found with these credentials'}), 401
-                
+        # Refuse sources and accounts with too many recent failures
+        client_ip = request.remote_addr or 'unknown'
+        if login_guard.throttled(client_ip, email):
+            return jsonify({'error': 'Too many failed sign-in attempts. Please wait a few minutes and try again'}), 429
+
+        # Unknown emails are rejected from the in-memory filter without a database lookup
+        if not login_guard.emails.might_exist(email):
+            login_guard.count('short_circuited')
+            login_guard.failed(client_ip, email)
+            return jsonify({'error': 'No account found with these credentials'}), 401
+
+        # One indexed lookup by email, then constant-time verification off the request thread
+        with get_db() as conn:
+            user = conn.execute(
+                'SELECT id, first_name, last_name, email_address, phone_number, password FROM users WHERE email_address = ?',
+                (email,)
+            ).fetchone()
+
+        if user is None:
+            if login_guard.emails.enabled:
+                login_guard.count('filter_false_positives')
+            login_guard.failed(client_ip, email)
+            return jsonify({'error': 'No account found with these credentials'}), 401
+        if not password_hasher.verify(password, user[5]):
+            login_guard.failed(client_ip, email)
+            return jsonify({'error': 'Password does not match our records for this email'}), 401
+        login_guard.succeeded(email)
+
+        if needs_rehash(user[5]):
+            # Work factor changed since this hash was made - upgrade it while we have the password
+            new_hash = password_hasher.hash(password)
+            with get_db() as conn:
+                conn.execute('UPDATE users SET password = ? WHERE id = ?', (new_hash, user[0]))
+
+        user_data = {
+            'id': user[0],
+            'first_name': user[1],
+            'last_name': user[2],
+            'email_address': user[3],
+            'phone_number': user[4],
+            'full_name': f"{user[1]} {user[2]}"
+        }
+
+        return jsonify({
+            'success': True,
+            'message': 'Authentication successful',
+            'user': user_data
+        })
+
+    except HasherBusyError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': 'Server error occurred'}), 500
 
 @app.route('/api/users', methods=['GET'])
 def get_all_users():
-    """Get all users (for testing/admin purposes)"""
+    """
+    List users (for testing/admin purposes), streamed as JSON straight from the cursor.
+    Query parameters: fields=id,email_address (projection), after=<id> and limit=<n> (keyset pagination).
+    """
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users')
-        users = cursor.fetchall()
-        conn.close()
-        
-        user_list = []
-        for user in users:
-            user_list.append({
-                'id': user[0],
-                'first_name': user[1],
-                'last_name': user[2],
-                'email_address': user[3],
-                'phone_number': user[4],
-                'registration_date': user[5]
-            })
-        
-        return jsonify({'users': user_list})
-        
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(USER_FIELDS)
+        unknown = [f for f in fields if f not in USER_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        try:
+            after = int(request.args.get('after', 0))
+        except ValueError:
+            after = -1
+        if not 0 <= after < 2 ** 63:   # SQLite integer range
+            return jsonify({'error': 'after must be a user id (0 for the first page)'}), 400
+        try:
+            limit = int(request.args['limit']) if 'limit' in request.args else None
+        except ValueError:
+            limit = 0
+        if limit is not None and not 1 <= limit <= USERS_MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {USERS_MAX_PAGE_SIZE}'}), 400
     except Exception as e:
         return jsonify({'error': 'Server error occurred'}), 500
 
+    return Response(stream_with_context(_stream_users(fields, after, limit)), mimetype='application/json')
+
+def _stream_users(fields, after, limit):
+    """Yield {"users": [...], "next_after": id} one chunk of rows at a time"""
+    # id drives the cursor, so select it even when it is not requested
+    columns = ', '.join(['id'] + [f for f in fields if f != 'id'])
+    sql = f'SELECT {columns} FROM users WHERE id > ? ORDER BY id'
+    params = [after]
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    yield '{"users":['
+    last_id = None
+    count = 0
+    with get_db() as conn:
+        cursor = conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        while True:
+            rows = cursor.fetchmany(USERS_FETCH_SIZE)
+            if not rows:
+                break
+            chunk = []
+            for row in rows:
+                user = dict(zip(names, row))
+                last_id = user['id']
+                chunk.append(json.dumps({f: user[f] for f in fields}, separators=(',', ':')))
+            yield (',' if count else '') + ','.join(chunk)
+            count += len(rows)
+    # A full page means there may be more users after the last id
+    next_after = last_id if limit is not None and count == limit else None
+    yield f'],"next_after":{json.dumps(next_after)}}}'
+
 @app.route('/api/users', methods=['POST'])
 def create_user():
     """Create a new user account"""
@@ -897,31 +639,22 @@ def create_user():
         password = data.get('password', '').strip()
         
         # Validation
-        if not all([first_name, last_name, email, phone, password]):
-            return jsonify({'error': 'All fields are required'}), 400
-        
-        if not validate_name(first_name) or not validate_name(last_name):
-            return jsonify({'error': 'Names should only contain letters, spaces, and hyphens'}), 400
-        
-        if not validate_email(email):
-            return jsonify({'error': 'Please enter a valid email address'}), 400
-        
-        if not validate_phone(phone):
-            return jsonify({'error': 'Please enter a valid phone number'}), 400
-        
-        # Database insertion
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
+        error = user_validation_error(first_name, last_name, email, phone, password)
+        if error:
+            return jsonify({'error': error}), 400
         
+        # Database insertion (only the salted hash is stored)
+        password_hash = password_hasher.hash(password)
         try:
-            cursor.execute('''
-                INSERT INTO users (first_name, last_name, email_address, phone_number, password) 
-                VALUES (?, ?, ?, ?, ?)
-            ''', (first_name, last_name, email, phone, password))
-            
-            user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO users (first_name, last_name, email_address, phone_number, password) 
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (first_name, last_name, email, phone, password_hash))
+                user_id = cursor.lastrowid
+            dashboard_cache.invalidate(user_id, DEFAULT_DASHBOARD_KEY)
+            login_guard.emails.add(email)
             
             return jsonify({
                 'success': True,
@@ -937,27 +670,72 @@ def create_user():
             }), 201
             
         except sqlite3.IntegrityError:
-            conn.close()
             return jsonify({'error': 'An account with this email already exists'}), 400
             
+    except HasherBusyError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': 'Server error occurred'}), 500
 
+@app.route('/api/users/import', methods=['POST'])
+def import_users():
+    """
+    Bulk-create users from a CSV or JSON Lines upload (raw body or multipart "file").
+    Columns: first_name, last_name, email_address, phone_number, password.
+    Rows are validated and inserted in chunked transactions; the response lists per-row errors.
+    """
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        fmt = bulk_users.detect_format(request.args.get('format'),
+                                       upload.mimetype if upload else request.content_type,
+                                       upload.filename if upload else '')
+        if fmt is None:
+            return jsonify({'error': 'Upload must be CSV or JSON Lines (use ?format=csv or ?format=jsonl)'}), 400
+
+        report = bulk_users.import_users(bulk_users.parse_rows(stream, fmt),
+                                         on_imported=login_guard.emails.add)
+        if report.imported:
+            dashboard_cache.invalidate(DEFAULT_DASHBOARD_KEY)
+        # A stopped upload still reports what was committed before it stopped
+        status = 400 if report.stopped and not report.imported else 200
+        return jsonify(report.to_dict()), status
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except HasherBusyError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': 'Server error occurred'}), 500
+
+@app.route('/api/users/export', methods=['GET'])
+def export_users():
+    """Stream every user as CSV (default) or JSON Lines; fields= selects columns"""
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(USER_FIELDS)
+    unknown = [f for f in fields if f not in USER_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    fmt = request.args.get('format', 'csv')
+    if fmt not in bulk_users.FORMATS:
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(bulk_users.export_users(fields, fmt)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=users.{fmt}'})
+
 @app.route('/api/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     """Delete a user account"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM users WHERE id = ? RETURNING email_address', (user_id,))
+            deleted = cursor.fetchone()
         
-        if cursor.rowcount == 0:
-            conn.close()
+        if deleted is None:
             return jsonify({'error': 'User not found'}), 404
-        
-        conn.commit()
-        conn.close()
+        dashboard_cache.invalidate(user_id, DEFAULT_DASHBOARD_KEY)
+        login_guard.emails.remove(deleted[0])
+        rankings.user_removed(user_id)
         
         return jsonify({'success': True, 'message': 'User account deleted successfully'})
         
@@ -966,29 +744,25 @@ def delete_user(user_id):
 
 @app.route('/api/performance-data', methods=['GET'])
 def performance_data():
-    """Return subject-wise score activity data for the current user from the database (for Performance tab)"""
+    """
+    Return subject-wise score activity for the current user (for the Performance tab).
+    Optional: start/end or days, subjects=a,b, rollup=day|week|month, window=<moving average points>,
+    points=<downsample target>, limit=<points per subject>. Without a range the first 14 days are returned.
+    """
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        # For demo, use the first user (same as dashboard)
-        cursor.execute('SELECT id, first_name, last_name FROM users ORDER BY id LIMIT 1')
-        user = cursor.fetchone()
-        if not user:
-            return jsonify({"error": "No user found"}), 404
-        user_id, first, last = user
-        subjects = ["Mathematics", "Physics", "Chemistry"]
-        subject_data = {}
-        for subject in subjects:
-            cursor.execute('''
-                SELECT date, score FROM score_activity
-                WHERE user_id=? AND subject=?
-                ORDER BY date ASC
-                LIMIT 14
-            ''', (user_id, subject))
-            rows = cursor.fetchall()
-            scores = [{"date": row[0], "score": row[1]} for row in rows]
-            subject_data[subject] = scores
-        conn.close()
+        query = PerformanceQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            # For demo, use the first user (same as dashboard)
+            cursor.execute('SELECT id, first_name, last_name FROM users ORDER BY id LIMIT 1')
+            user = cursor.fetchone()
+            if not user:
+                return jsonify({"error": "No user found"}), 404
+            user_id, first, last = user
+            subject_data = load_performance(conn, user_id, query)
         return jsonify({
             "user": f"{first} {last}",
             "subjects": subject_data
@@ -996,6 +770,147 @@ def performance_data():
     except Exception as e:
         return jsonify({"error": "Failed to fetch performance data"}), 500
 
+def _trend_args(args):
+    """(PerformanceQuery, window, threshold) for the analytics endpoints; raises ValueError"""
+    query = PerformanceQuery.from_args(args)
+    try:
+        threshold = int(args.get('threshold', analytics.ANALYTICS_STREAK_THRESHOLD))
+    except ValueError:
+        threshold = -1
+    if not 0 <= threshold <= 100:
+        raise ValueError('threshold must be between 0 and 100')
+    return query, query.window or analytics.ANALYTICS_WINDOW, threshold
+
+@app.route('/api/analytics/trends', methods=['GET'])
+def analytics_trends():
+    """
+    Trend slope (points/week), rolling average, volatility and streaks per subject for the current user,
+    with the class-wide quartiles for comparison (cohort=0 to skip). Optional: start/end or days,
+    subjects=a,b, window=<rolling average points>, threshold=<streak score, default 60>
+    """
+    try:
+        query, window, threshold = _trend_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with get_db() as conn:
+            # For demo, use the first user (same as dashboard)
+            user = conn.execute('SELECT id, first_name, last_name FROM users ORDER BY id LIMIT 1').fetchone()
+            if not user:
+                return jsonify({"error": "No user found"}), 404
+            user_id, first, last = user
+            trends = analytics.user_trends(conn, user_id, query.start, query.end, query.subjects, window, threshold)
+        result = {"user": f"{first} {last}", "window": window, "threshold": threshold, "subjects": trends}
+        if request.args.get('cohort') != '0':
+            result["cohort"] = analytics.cohort.summary(query.start, query.end, query.subjects, window, threshold)
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Failed to compute trends"}), 500
+
+@app.route('/api/analytics/cohort', methods=['GET'])
+def analytics_cohort():
+    """
+    Class-wide trend quartiles and share of improving students per subject (same options as
+    /api/analytics/trends; ranges are limited to the last ANALYTICS_COHORT_DAYS days)
+    """
+    try:
+        query, window, threshold = _trend_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        summary = analytics.cohort.summary(query.start, query.end, query.subjects, window, threshold)
+        return jsonify({"window": window, "threshold": threshold, "subjects": summary})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Failed to compute cohort trends"}), 500
+
+@app.route('/api/rankings/<int:user_id>', methods=['GET'])
+def student_rankings(user_id):
+    """Return a student's class-wide rank and percentile per subject and for attendance ratio"""
+    try:
+        with get_db() as conn:
+            user = conn.execute('SELECT first_name, last_name FROM users WHERE id = ?', (user_id,)).fetchone()
+        if user is None:
+            return jsonify({'error': 'User not found'}), 404
+        return jsonify({'user_id': user_id, 'user': f"{user[0]} {user[1]}", **rankings.student(user_id)})
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch rankings'}), 500
+
+@app.route('/api/leaderboard', methods=['GET'])
+def leaderboard():
+    """Return the top students for ?metric=<subject>|attendance (default attendance), limit= up to 100"""
+    metric = request.args.get('metric', 'attendance')
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= RANKING_LEADERBOARD_MAX:
+        return jsonify({'error': f'limit must be between 1 and {RANKING_LEADERBOARD_MAX}'}), 400
+    try:
+        entries = rankings.leaderboard(metric, limit)
+        if entries is None:
+            return jsonify({'error': f"Unknown metric. Use one of: {', '.join(rankings.metrics())}"}), 400
+        if entries:
+            with get_db() as conn:
+                placeholders = ','.join('?' * len(entries))
+                names = {row[0]: f"{row[1]} {row[2]}" for row in conn.execute(
+                    f'SELECT id, first_name, last_name FROM users WHERE id IN ({placeholders})',
+                    [entry['user_id'] for entry in entries])}
+            for entry in entries:
+                entry['user'] = names.get(entry['user_id'])
+        return jsonify({'metric': metric, 'leaders': entries})
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch leaderboard'}), 500
+
+@app.route('/api/test-scores', methods=['POST'])
+def add_test_score():
+    """Record a test score (user_id, subject, lesson, score) and update the subject ranking"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        subject = str(data.get('subject', '')).strip()
+        lesson = str(data.get('lesson', '')).strip()
+        score = data.get('score')
+        if not isinstance(user_id, int) or not subject or not isinstance(score, (int, float)):
+            return jsonify({'error': 'user_id, subject and a numeric score are required'}), 400
+        with get_db() as conn:
+            if conn.execute('SELECT 1 FROM users WHERE id = ?', (user_id,)).fetchone() is None:
+                return jsonify({'error': 'User not found'}), 404
+            conn.execute('INSERT INTO test_scores (user_id, subject, lesson, score) VALUES (?, ?, ?, ?)',
+                         (user_id, subject, lesson, score))
+            conn.commit()
+            rankings.test_score_written(conn, user_id, subject)
+        dashboard_cache.invalidate(user_id, DEFAULT_DASHBOARD_KEY)
+        return jsonify({'success': True}), 201
+    except Exception as e:
+        return jsonify({'error': 'Failed to save test score'}), 500
+
+@app.route('/api/attendance/<int:user_id>', methods=['PUT'])
+def update_attendance(user_id):
+    """Set a student's attended/total classes and update the attendance ranking"""
+    try:
+        data = request.get_json()
+        attended, total = data.get('attended'), data.get('total')
+        if not isinstance(attended, int) or not isinstance(total, int) or not 0 <= attended <= total:
+            return jsonify({'error': 'attended and total must be integers with 0 <= attended <= total'}), 400
+        with get_db() as conn:
+            updated = conn.execute('UPDATE attendance SET attended = ?, total = ? WHERE user_id = ?',
+                                   (attended, total, user_id)).rowcount
+            if not updated:
+                if conn.execute('SELECT 1 FROM users WHERE id = ?', (user_id,)).fetchone() is None:
+                    return jsonify({'error': 'User not found'}), 404
+                conn.execute('INSERT INTO attendance (user_id, attended, total) VALUES (?, ?, ?)',
+                             (user_id, attended, total))
+            conn.commit()
+        rankings.attendance_written(user_id, attended, total)
+        dashboard_cache.invalidate(user_id, DEFAULT_DASHBOARD_KEY)
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': 'Failed to update attendance'}), 500
+
 # Video Streaming API: Returns random YouTube video links with metadata
 import random
 
@@ -1058,34 +973,112 @@ def raise_query():
 def api_raise_query():
     """
     Accepts special mentions (tags) and brief about the query,
-    and inserts them into the queries table.
+    and inserts them into the queries table and its tags into query_tags.
+    The insert goes through the group-commit writer and is acknowledged once committed; if that takes
+    too long the response is 202 with "pending": true and no id, and the query appears once saved.
     """
     try:
         data = request.get_json()
-        special_mentions = data.get('special_mentions', [])
         brief = data.get('brief', '').strip()
         if not brief:
             return jsonify({'error': 'Brief about your query is required'}), 400
-        # Store special_mentions as JSON string
-        import json
-        special_mentions_json = json.dumps(special_mentions)
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO queries (special_mentions, brief) VALUES (?, ?)',
-            (special_mentions_json, brief)
-        )
-        conn.commit()
-        conn.close()
-        return jsonify({'success': True, 'message': 'Query submitted successfully'})
+        try:
+            tags = forum_tags.normalize(data.get('special_mentions', []))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # special_mentions keeps the JSON list as submitted (cleaned); reads go through query_tags
+        query_id, created_at = forum_writer.add_query(brief, json.dumps(tags), tags)
+        return jsonify({'success': True, 'message': 'Query submitted successfully',
+                        'id': query_id, 'created_at': created_at})
+    except SubmissionPendingError as e:
+        return jsonify({'success': True, 'pending': True, 'message': str(e)}), 202
+    except WriterBusyError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': 'Failed to submit query'}), 500
 
+@app.route('/api/forum', methods=['GET'])
+def forum_page():
+    """
+    Return one page of doubt forum queries, newest first, each with its answers.
+    Query parameters: limit=<n> (default 20), cursor=<next_cursor from the previous page>
+    and tag=<special mention> to list only the queries carrying that tag.
+    """
+    cursor = request.args.get('cursor') or None
+    tag = request.args.get('tag') or None
+    limit = request.args.get('limit', forum.FORUM_PAGE_SIZE, type=int)
+    if not 1 <= limit <= forum.FORUM_MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {forum.FORUM_MAX_PAGE_SIZE}'}), 400
+    try:
+        with get_db() as conn:
+            queries, next_cursor = forum.load_page(conn, cursor, limit, tag)
+        return jsonify({'queries': queries, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch forum'}), 500
+
+@app.route('/api/forum/events', methods=['GET'])
+def forum_events_stream():
+    """
+    Server-sent events for the doubt forum: 'query' for each new query (shaped like an /api/forum item),
+    'answer' for each new answer and 'reset' when the client missed too much and should reload the list.
+    Browsers resume after a dropped connection by sending the last event id back as Last-Event-ID.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        stream = forum_events.hub.stream(last_event_id)
+    except forum_events.TooManyClientsError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/forum/tags', methods=['GET'])
+def forum_tag_counts():
+    """
+    Return the most used special mentions with the number of queries carrying each.
+    Query parameters: limit=<n> (default 50).
+    """
+    limit = request.args.get('limit', forum_tags.TAGS_PAGE_SIZE, type=int)
+    if not 1 <= limit <= forum_tags.TAGS_MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {forum_tags.TAGS_MAX_PAGE_SIZE}'}), 400
+    try:
+        with get_db() as conn:
+            tags = forum_tags.top_tags(conn, limit)
+        return jsonify({'tags': tags})
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch tags'}), 500
+
+@app.route('/api/forum/search', methods=['GET'])
+def forum_search_results():
+    """
+    Full-text search of forum queries and their answers, best match first.
+    Query parameters: q=<words> (the last word matches as a prefix), tag=<special mention>, limit, offset.
+    Each result has snippet_html: escaped text around the match with <mark> around matched words.
+    """
+    text = request.args.get('q', '')
+    if forum_search.match_expression(text) is None:
+        return jsonify({'error': 'q must contain at least one word'}), 400
+    limit = request.args.get('limit', forum_search.SEARCH_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if not 1 <= limit <= forum_search.SEARCH_MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {forum_search.SEARCH_MAX_PAGE_SIZE}'}), 400
+    if not 0 <= offset <= forum_search.SEARCH_MAX_OFFSET:
+        return jsonify({'error': f'offset must be between 0 and {forum_search.SEARCH_MAX_OFFSET}'}), 400
+    try:
+        with get_db() as conn:
+            results = forum_search.search(conn, text, request.args.get('tag'), limit, offset)
+        return jsonify({'results': results, 'next_offset': offset + limit if len(results) == limit else None})
+    except Exception as e:
+        return jsonify({'error': 'Search failed'}), 500
+
 # Add Answer API (for teacher comments)
 @app.route('/api/add-answer', methods=['POST'])
 def add_answer():
     """
-    Accepts query_id and answer_text, inserts into answers table.
+    Accepts query_id and answer_text, inserts into answers table through the group-commit writer.
+    created_at is set here rather than read back after the insert. A slow commit answers 202 with
+    "pending": true, like /api/raise-query.
     """
     try:
         data = request.get_json()
@@ -1093,51 +1086,119 @@ def add_answer():
         answer_text = data.get('answer', '').strip()
         if not query_id or not answer_text:
             return jsonify({'error': 'Query ID and answer are required'}), 400
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO answers (query_id, answer_text) VALUES (?, ?)',
-            (query_id, answer_text)
-        )
-        conn.commit()
-        # Fetch created_at for the new answer
-        cursor.execute('SELECT created_at FROM answers WHERE id = ?', (cursor.lastrowid,))
-        created_at = cursor.fetchone()[0]
-        conn.close()
-        return jsonify({'success': True, 'answer': answer_text, 'created_at': created_at})
+        answer_id, created_at = forum_writer.add_answer(query_id, answer_text)
+        return jsonify({'success': True, 'id': answer_id, 'answer': answer_text, 'created_at': created_at})
+    except SubmissionPendingError as e:
+        return jsonify({'success': True, 'pending': True, 'answer': answer_text, 'message': str(e)}), 202
+    except WriterBusyError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': 'Failed to add answer'}), 500
 
 # Doubt Solver API (OpenAI LLM)
+def _sse(event, payload):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def _stream_doubt_answer(flight):
+    """Yield the LLM answer as server-sent events"""
+    try:
+        for delta in flight.iter_tokens():
+            yield _sse('token', {'text': delta})
+        yield _sse('done', {})
+    except llm_client.LLMError as e:
+        yield _sse('error', {'error': str(e)})
+    except Exception:
+        yield _sse('error', {'error': 'Failed to get response from LLM'})
+
 @app.route('/api/doubt-solver', methods=['POST'])
 def doubt_solver():
-    """Accepts a student's doubt and returns an LLM-generated response using OpenAI API"""
+    """
+    Accepts a student's doubt and returns an LLM-generated response using OpenAI API.
+    With "stream": true the answer is streamed token by token as server-sent events.
+    Identical questions asked while an answer is being generated share one upstream call.
+    """
     try:
         data = request.get_json()
         message = data.get('message', '').strip()
         if not message:
             return jsonify({'error': 'No doubt provided'}), 400
 
-        api_key = os.environ.get('OPENAI_API_KEY')
-        if not api_key:
+        # Repeated questions are answered from the cache without calling the LLM
+        cached = doubt_cache.lookup(message)
+        if cached is not None:
+            if data.get('stream'):
+                return Response(_sse('token', {'text': cached}) + _sse('done', {'cached': True}),
+                                mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+            return jsonify({'response': cached, 'cached': True})
+
+        if not llm_client.is_configured():
             return jsonify({'error': 'OpenAI API key not set in environment'}), 500
 
-        openai.api_key = api_key
-        # Call OpenAI Chat API (gpt-3.5-turbo)
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful educational assistant. Answer student doubts in a very precise and short manner."},
-                {"role": "user", "content": message}
-            ],
-            max_tokens=512,
-            temperature=0.7
+        flight, leader = llm_client.client.submit(
+            message,
+            tenant=request.remote_addr,
+            on_complete=lambda answer: doubt_cache.store(message, answer)
         )
-        answer = response.choices[0].message.content.strip()
-        return jsonify({'response': answer})
+        if data.get('stream'):
+            return Response(
+                stream_with_context(_stream_doubt_answer(flight)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
+        result = {'response': flight.result()}
+        if not leader:
+            result['coalesced'] = True
+        return jsonify(result)
+    except llm_client.LLMRateLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    except llm_client.LLMBusyError as e:
+        return jsonify({'error': str(e)}), 503
+    except llm_client.LLMTimeoutError as e:
+        return jsonify({'error': str(e)}), 504
     except Exception as e:
         return jsonify({'error': 'Failed to get response from LLM'}), 500
 
+@app.route('/api/llm-stats', methods=['GET'])
+def llm_stats():
+    """Return Doubt Solver upstream call counters and latency histograms"""
+    return jsonify(llm_client.client.stats())
+
+@app.route('/api/auth-stats', methods=['GET'])
+def auth_stats():
+    """Return sign-in throttling and unknown-email short-circuit counters"""
+    return jsonify(login_guard.stats())
+
+@app.route('/api/ranking-stats', methods=['GET'])
+def ranking_stats():
+    """Return rank index sizes, rebuild counts and timings"""
+    return jsonify(rankings.stats())
+
+@app.route('/api/analytics-stats', methods=['GET'])
+def analytics_stats():
+    """Return the cohort snapshot size, load counts and summary cache counters"""
+    return jsonify(analytics.cohort.stats())
+
+@app.route('/api/forum-events-stats', methods=['GET'])
+def forum_events_stats():
+    """Return live forum stream counts and the events published by this process"""
+    return jsonify(forum_events.hub.stats())
+
+@app.route('/api/forum-writer-stats', methods=['GET'])
+def forum_writer_stats():
+    """Return group-commit writer batch sizes and queue depth"""
+    return jsonify(forum_writer.stats())
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Return dashboard, panel fragment and Doubt Solver cache counters"""
+    return jsonify({
+        'dashboard': dashboard_cache.stats(),
+        'dashboard_panels': panel_renderer.stats(),
+        'doubt_solver': doubt_cache.stats(),
+    })
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -1150,11 +1211,12 @@ def internal_error(error):
 def display_sample_credentials():
     """Display sample login credentials"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT first_name, last_name, email_address, phone_number, password FROM users LIMIT 5')
-        users = cursor.fetchall()
-        conn.close()
+        # Only hashes are stored, so the passwords come from the seed data
+        sample_passwords = {user[2]: user[4] for user in SAMPLE_USERS}
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT first_name, last_name, email_address, phone_number FROM users LIMIT 5')
+            users = cursor.fetchall()
         
         if users:
             print('\n📝 Sample login credentials for testing:')
@@ -1162,7 +1224,7 @@ def display_sample_credentials():
             for i, user in enumerate(users, 1):
                 print(f'{i}. {user[0]} {user[1]}')
                 print(f'   📧 Email: {user[2]}')
-                print(f'   🔑 Password: {user[4]}')
+                print(f'   🔑 Password: {sample_passwords.get(user[2], "(not a sample account)")}')
                 print(f'   📱 Phone: {user[3]}')
                 print('━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━')
                 
@@ -1170,8 +1232,20 @@ def display_sample_credentials():
         print(f"Error displaying credentials: {e}")
 
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='User Portal System')
+    parser.add_argument('--reset-db', action='store_true',
+                        help='drop all tables and re-seed the sample data (destroys existing data)')
+    parser.add_argument('--no-seed', action='store_true',
+                        help='do not seed sample data even if the database is empty')
+    args = parser.parse_args()
+
     print('🚀 Initializing User Portal System...')
-    init_database()
+    # The debug reloader re-runs this block in a child process; only reset once
+    if args.reset_db and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        init_database()
+    else:
+        bootstrap_database(seed=not args.no_seed)
     display_sample_credentials()
     print(f'\n🌐 Server starting on http://localhost:{PORT}')
     print('✅ Ready to accept connections!')
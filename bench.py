@@ -0,0 +1,1125 @@
+#!/usr/bin/env python3
+"""
+User Portal System Benchmarks
+Runs the Flask app in-process against a throwaway database and reports throughput
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Point the app at a scratch database before it is imported
+BENCH_DIR = tempfile.mkdtemp(prefix='portal_bench_')
+os.environ.setdefault('PORTAL_DATABASE', os.path.join(BENCH_DIR, 'bench.db'))
+
+import database  # noqa: E402
+import app as portal  # noqa: E402
+
+
+def timed_requests(path, requests_count, threads=1):
+    """Issue GET requests against path and return requests/sec"""
+    def worker(count):
+        client = portal.app.test_client()
+        for _ in range(count):
+            response = client.get(path)
+            assert response.status_code == 200, response.status_code
+
+    per_thread = max(1, requests_count // threads)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(worker, [per_thread] * threads))
+    elapsed = time.perf_counter() - start
+    return (per_thread * threads) / elapsed
+
+
+def print_result(label, value, unit):
+    """Print one benchmark line"""
+    print(f"   {label:<38} {value:>10.1f} {unit}")
+
+
+def start_llm_stub(latency, token_delay):
+    """Start the local OpenAI stub and point the shared LLM client at it (no per-client rate limit)"""
+    import llm_client
+    import llm_stub
+
+    server, base_url = llm_stub.start_stub_server(latency=latency, token_delay=token_delay)
+    os.environ.setdefault('OPENAI_API_KEY', 'stub')
+    llm_client.client.reset(base_url)
+    llm_client.client.rate_limiter.rate = 0  # every benchmark request comes from one address
+    return server
+
+
+def bench_pool(requests_count=2000, threads=4):
+    """Compare connect-per-request against the pooled connection layer"""
+    print("🔬 Connection pool benchmark (/dashboard)")
+    print("─" * 60)
+    portal.init_database()
+    portal.dashboard_cache.ttl = 0  # measure the database path, not the cache
+
+    results = {}
+    for label, size in (("connect per request (before)", 0), ("pooled connections (after)", database.POOL_SIZE)):
+        database.pool.close_all()
+        database.pool = database.ConnectionPool(database.DATABASE_NAME, size=size)
+        timed_requests('/dashboard', 50, threads)  # warm-up
+        results[label] = timed_requests('/dashboard', requests_count, threads)
+        print_result(label, results[label], "req/s")
+
+    before, after = results.values()
+    print(f"   speed-up: {after / before:.2f}x")
+
+
+def bench_dashboard_cache(requests_count=2000, threads=4):
+    """Compare uncached dashboard renders against the per-user context cache"""
+    print("🔬 Dashboard context cache benchmark (/dashboard)")
+    print("─" * 60)
+    portal.init_database()
+
+    results = {}
+    for label, ttl in (("uncached (before)", 0), ("cached context (after)", 300)):
+        portal.dashboard_cache.ttl = ttl
+        portal.dashboard_cache.invalidate_all()
+        timed_requests('/dashboard', 50, threads)  # warm-up
+        results[label] = timed_requests('/dashboard', requests_count, threads)
+        print_result(label, results[label], "req/s")
+
+    before, after = results.values()
+    print(f"   speed-up: {after / before:.2f}x")
+    print(f"   cache stats: {portal.dashboard_cache.stats()}")
+
+
+def bench_doubt_solver(clients=8, latency=0.3, token_delay=0.02):
+    """Time-to-first-token and throughput of the Doubt Solver against the local OpenAI stub"""
+    import statistics
+    import llm_stub
+    from doubt_cache import doubt_cache
+
+    print("🔬 Doubt solver benchmark (local OpenAI stub)")
+    print("─" * 60)
+    server = start_llm_stub(latency, token_delay)
+    doubt_cache.enabled = False  # measure upstream answers, not the answer cache
+
+    def ask(question, stream):
+        client = portal.app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/doubt-solver', json={'message': question, 'stream': stream}, buffered=False)
+        first = None
+        for chunk in response.response:
+            if first is None and chunk:
+                first = time.perf_counter() - start
+        response.close()
+        return first, time.perf_counter() - start
+
+    for label, stream in (("blocking JSON answer", False), ("streamed SSE answer", True)):
+        # A distinct question per client, so no answer is shared through single-flight coalescing
+        questions = [f"What is Ohm's law? ({label}, client {n})" for n in range(clients)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            timings = list(executor.map(ask, questions, [stream] * clients))
+        elapsed = time.perf_counter() - start
+        first_byte = statistics.median(t[0] for t in timings)
+        print_result(f"{label}: median first byte", first_byte * 1000, "ms")
+        print_result(f"{label}: answers/sec", clients / elapsed, "ans/s")
+
+    print(f"   upstream calls made: {llm_stub.StubHandler.state.calls} (one per question)")
+    server.shutdown()
+
+
+# Replayed question log: a few popular doubts asked many ways, plus a long tail
+QUESTION_LOG = (
+    ["What is Ohm's law?", "what is ohms law", "Explain Ohm's law please", "ohm's law?"] * 6
+    + ["What is Newton's second law?", "newtons second law", "Explain Newton's second law"] * 5
+    + ["Define photosynthesis", "what is photosynthesis?", "photosynthesis"] * 4
+    + [f"How do I solve quadratic equation number {n}?" for n in range(12)]
+)
+
+
+def bench_doubt_cache(latency=0.05, token_delay=0.002):
+    """Replay a question log against the stub with and without the answer cache"""
+    import random
+    import llm_stub
+    from doubt_cache import doubt_cache
+
+    print("🔬 Doubt solver answer cache benchmark (replayed question log)")
+    print("─" * 60)
+    portal.bootstrap_database()
+    server = start_llm_stub(latency, token_delay)
+
+    log = list(QUESTION_LOG)
+    random.Random(7).shuffle(log)
+    client = portal.app.test_client()
+
+    for label, enabled in (("no cache (before)", False), ("answer cache (after)", True)):
+        doubt_cache.enabled = enabled
+        doubt_cache.clear()
+        calls_before = llm_stub.StubHandler.state.calls
+        start = time.perf_counter()
+        for question in log:
+            response = client.post('/api/doubt-solver', json={'message': question})
+            assert response.status_code == 200, response.get_json()
+        elapsed = time.perf_counter() - start
+        print_result(f"{label}: mean latency", elapsed / len(log) * 1000, "ms")
+        print_result(f"{label}: upstream calls", llm_stub.StubHandler.state.calls - calls_before, f"of {len(log)}")
+
+    print(f"   cache stats: {doubt_cache.stats()}")
+    server.shutdown()
+
+
+def bench_llm_client(clients=32, latency=0.2, token_delay=0.005):
+    """Single-flight coalescing, retries and latency histograms of the shared LLM client"""
+    import llm_client
+    import llm_stub
+    from doubt_cache import doubt_cache
+
+    print("🔬 Shared LLM client benchmark (local OpenAI stub)")
+    print("─" * 60)
+    portal.bootstrap_database()
+    server = start_llm_stub(latency, token_delay)
+    doubt_cache.enabled = False  # measure coalescing, not the answer cache
+    state = llm_stub.StubHandler.state
+
+    def burst(questions):
+        def ask(question):
+            response = portal.app.test_client().post('/api/doubt-solver', json={'message': question})
+            assert response.status_code == 200, response.get_json()
+        calls_before = state.calls
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(ask, questions))
+        return time.perf_counter() - start, state.calls - calls_before
+
+    for label, questions in (
+        ("distinct questions (no coalescing)", [f"What is Ohm's law? ({n})" for n in range(clients)]),
+        ("identical questions (single-flight)", ["What is Ohm's law?"] * clients),
+    ):
+        elapsed, calls = burst(questions)
+        print_result(f"{label}: wall time", elapsed * 1000, "ms")
+        print_result(f"{label}: upstream calls", calls, f"of {clients}")
+
+    # Two transient 503s are absorbed by backoff instead of reaching the student
+    state.fail_next = 2
+    elapsed, calls = burst(["Define photosynthesis"])
+    print_result("transient 503 x2: upstream attempts", calls, "calls")
+    print_result("transient 503 x2: answer latency", elapsed * 1000, "ms")
+
+    stats = llm_client.client.stats()
+    print(f"   counters: { {k: v for k, v in stats.items() if not isinstance(v, dict)} }")
+    print(f"   upstream latency: {stats['upstream_latency']}")
+    print(f"   first token latency: {stats['first_token_latency']}")
+    server.shutdown()
+
+
+def _legacy_login():
+    """The login page as it was: render_template_string on every hit"""
+    from flask import render_template_string
+
+    return render_template_string(portal.LOGIN_TEMPLATE)
+
+
+def bench_login_page(requests_count=3000, threads=4):
+    """Compare render_template_string on every hit against the pre-rendered login page"""
+    print("🔬 Login page benchmark (/)")
+    print("─" * 60)
+    results = {}
+    for label, path in (("render_template_string (before)", '/bench/login-legacy'), ("pre-rendered page (after)", '/')):
+        timed_requests(path, 50, threads)  # warm-up
+        results[label] = timed_requests(path, requests_count, threads)
+        print_result(label, results[label], "req/s")
+
+    before, after = results.values()
+    print(f"   speed-up: {after / before:.2f}x")
+
+    client = portal.app.test_client()
+    etag = client.get('/').headers['ETag']
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+    print_result("If-None-Match revalidation (304)", requests_count / (time.perf_counter() - start), "req/s")
+    for encoding, size in portal.login_page.sizes().items():
+        print_result(f"body size ({encoding})", size / 1024, "KB")
+
+
+def bench_dashboard_panels(views=1000):
+    """Server CPU per dashboard view: full render vs cached panel fragments vs lazy shell"""
+    from fragments import panel_renderer
+
+    print("🔬 Dashboard panel fragment benchmark (/dashboard)")
+    print("─" * 60)
+    portal.init_database()
+    portal.dashboard_cache.ttl = 300  # context cached in every variant; measure rendering only
+    client = portal.app.test_client()
+
+    results = {}
+    for label, path, fragments in (("full render (before)", '/dashboard', False),
+                                   ("cached panel fragments (after)", '/dashboard', True),
+                                   ("lazy page shell (after)", '/dashboard?lazy=1', True)):
+        panel_renderer.enabled = fragments
+        panel_renderer.cache.invalidate_all()
+        client.get(path)  # warm-up
+        start = time.process_time()
+        for _ in range(views):
+            assert client.get(path).status_code == 200
+        results[label] = (time.process_time() - start) / views * 1000
+        print_result(f"{label}: CPU per view", results[label], "ms")
+
+    before = results["full render (before)"]
+    print(f"   CPU cut with fragments: {(1 - results['cached panel fragments (after)'] / before) * 100:.0f}%")
+    print("   per-panel render time (uncached):")
+    for name, timing in panel_renderer.stats()['panels'].items():
+        print_result(f"  {name}", timing['mean_ms'] or 0.0, "ms")
+
+
+# (label, algorithm, parameter overrides) for the login capacity table
+PASSWORD_COSTS = (
+    ("scrypt n=2^12", 'scrypt', {'PASSWORD_SCRYPT_N': 2 ** 12}),
+    ("scrypt n=2^14 (default)", 'scrypt', {'PASSWORD_SCRYPT_N': 2 ** 14}),
+    ("scrypt n=2^15", 'scrypt', {'PASSWORD_SCRYPT_N': 2 ** 15}),
+    ("pbkdf2_sha256 210k", 'pbkdf2_sha256', {'PASSWORD_PBKDF2_ITERATIONS': 210000}),
+    ("pbkdf2_sha256 600k (default)", 'pbkdf2_sha256', {'PASSWORD_PBKDF2_ITERATIONS': 600000}),
+)
+
+
+def bench_auth(seconds=2.0):
+    """Logins/sec per core at several password hashing cost settings"""
+    import passwords
+    from seed import SAMPLE_USERS
+
+    cores = os.cpu_count() or 1
+    print(f"🔬 Login capacity benchmark (/api/authenticate, {cores} core(s), {passwords.hasher.workers} hash workers)")
+    print("─" * 60)
+    portal.bootstrap_database()
+    _, _, email, _, password = SAMPLE_USERS[0]
+    threads = passwords.hasher.workers * 2
+
+    for label, algorithm, overrides in PASSWORD_COSTS:
+        passwords.PASSWORD_HASH_ALGORITHM = algorithm
+        for name, value in overrides.items():
+            setattr(passwords, name, value)
+        start = time.perf_counter()
+        stored = passwords.hash_password(password)
+        single = time.perf_counter() - start
+        with database.get_db() as conn:
+            conn.execute('UPDATE users SET password = ? WHERE email_address = ?', (stored, email))
+
+        def login(_):
+            response = portal.app.test_client().post('/api/authenticate', json={'email': email, 'password': password})
+            assert response.status_code == 200, response.get_json()
+
+        count = max(threads, int(seconds / single))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(login, range(count)))
+        rate = count / (time.perf_counter() - start)
+        print(f"   {label:<30} {single * 1000:>7.1f} ms/hash {rate:>8.1f} logins/s {rate / cores:>8.1f} /core")
+
+
+def bench_login_guard(attempts=3000, threads=4, users=50000):
+    """Credential-stuffing burst of unknown emails: database lookups vs the email Bloom filter"""
+    from login_guard import login_guard
+    from seed import seed_synthetic
+
+    print(f"🔬 Login guard benchmark (/api/authenticate, unknown emails, {users:,} accounts)")
+    print("─" * 60)
+    portal.init_database()
+    with database.get_db() as conn:
+        seed_synthetic(conn, users, days=1)
+
+    def stuff(offset):
+        client = portal.app.test_client()
+        for n in range(offset, offset + attempts // threads):
+            # Spread over many source addresses, as a botnet would
+            response = client.post('/api/authenticate', json={'email': f'leaked{n}@example.org', 'password': 'hunter2'},
+                                   environ_base={'REMOTE_ADDR': f'10.{n % 250}.{n // 250 % 250}.1'})
+            assert response.status_code == 401, response.status_code
+
+    for label, enabled in (("SQLite lookup per attempt (before)", False), ("Bloom filter short-circuit (after)", True)):
+        login_guard.emails.enabled = enabled
+        login_guard.emails.might_exist('warm-up@example.org')  # build the filter outside the timing
+        skipped_before = login_guard.counters['short_circuited']
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(stuff, [i * attempts for i in range(threads)]))
+        print_result(label, attempts / (time.perf_counter() - start), "req/s")
+        print_result("   users table lookups", attempts - (login_guard.counters['short_circuited'] - skipped_before),
+                     f"of {attempts}")
+
+    stats = login_guard.stats()
+    print(f"   throttled: ip={stats['throttled_ip']} email={stats['throttled_email']}, "
+          f"filter false positives: {stats['filter_false_positives']}")
+    print(f"   email filter: {stats['email_filter']}")
+
+
+def bench_import(users=100000, sample=500):
+    """Rows/sec for bulk CSV import vs one POST /api/users per user, plus streamed export"""
+    import passwords
+    from seed import FIRST_NAMES, LAST_NAMES
+
+    print(f"🔬 Bulk user import benchmark ({users:,} rows)")
+    print("─" * 60)
+    portal.bootstrap_database()
+    # Key derivation is a fixed per-user cost whichever way users arrive (see `bench.py auth`);
+    # use a minimal work factor here so the numbers measure the import pipeline itself
+    passwords.PASSWORD_HASH_ALGORITHM = 'pbkdf2_sha256'
+    passwords.PASSWORD_PBKDF2_ITERATIONS = 1
+
+    def row(n, prefix):
+        first, last = FIRST_NAMES[n % len(FIRST_NAMES)], LAST_NAMES[n // len(FIRST_NAMES) % len(LAST_NAMES)]
+        return (first, last, f"{prefix}{n}@school.example.com", f"+1 555-{n % 10000:04d}", f"pw{n}")
+
+    client = portal.app.test_client()
+    start = time.perf_counter()
+    for n in range(sample):
+        first, last, email, phone, password = row(n, 'single')
+        response = client.post('/api/users', json={'first_name': first, 'last_name': last, 'email_address': email,
+                                                   'phone_number': phone, 'password': password})
+        assert response.status_code == 201, response.get_json()
+    print_result(f"one request per user ({sample} rows, before)", sample / (time.perf_counter() - start), "rows/s")
+
+    lines = ['first_name,last_name,email_address,phone_number,password']
+    lines += [','.join(row(n, 'bulk')) for n in range(users)]
+    body = ('\n'.join(lines) + '\n').encode()
+    start = time.perf_counter()
+    response = client.post('/api/users/import?format=csv', data=body)
+    elapsed = time.perf_counter() - start
+    report = response.get_json()
+    assert response.status_code == 200 and report['imported'] == users, report
+    print_result(f"bulk CSV import ({users:,} rows, after)", users / elapsed, "rows/s")
+    print(f"   chunks: {report['chunks']}, failed rows: {report['failed']}, upload: {len(body) / 1024 / 1024:.1f} MB")
+
+    start = time.perf_counter()
+    response = client.get('/api/users/export?format=csv', buffered=False)
+    exported = sum(chunk.count(b'\n') for chunk in response.response) - 1
+    response.close()
+    print_result(f"streamed CSV export ({exported:,} rows)", exported / (time.perf_counter() - start), "rows/s")
+
+
+def bench_validators(records=20000, repeat=5):
+    """Validation cost per record (valid/invalid) and backtracking checks on pathological input"""
+    import re
+    import validators
+
+    print(f"🔬 Validator benchmark ({records:,} records)")
+    print("─" * 60)
+    legacy = {
+        'email_address': r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$',
+        'phone_number': r'^[\+]?[0-9\s\-\(\)]{10,15}$',
+        'first_name': r'^[a-zA-Z\s\-\']+$',
+        'last_name': r'^[a-zA-Z\s\-\']+$',
+    }
+
+    def legacy_errors(record):
+        """app.py's checks as they were: re.match with a pattern string per call"""
+        if not all(record.values()):
+            return 'All fields are required'
+        for field, pattern in legacy.items():
+            if re.match(pattern, record[field]) is None:
+                return field
+        return None
+
+    valid = [{'first_name': 'Mary-Jane', 'last_name': "O'Neil", 'email_address': f"student{n}@school.example.com",
+              'phone_number': f"(555) {n % 1000:03d}-0000", 'password': 'student123'} for n in range(records)]
+    invalid = [{**record, 'email_address': f"student{n}@nowhere", 'phone_number': 'call me'}
+               for n, record in enumerate(valid)]
+    assert all(legacy_errors(r) is None for r in valid) and not any(validators.validate_many(valid))
+
+    for label, batch in (("valid", valid), ("invalid", invalid)):
+        def best(func):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+            return min(timings) / len(batch) * 1e6
+        print_result(f"{label}: re.match per call (before)", best(lambda: [legacy_errors(r) for r in batch]), "µs/record")
+        print_result(f"{label}: validate_many (after)", best(lambda: validators.validate_many(batch)), "µs/record")
+        print_result(f"{label}: first error only", best(lambda: validators.validate_many(batch, True)), "µs/record")
+
+    # Inputs shaped to make the patterns backtrack as much as they can. Growth must stay linear
+    # for the raw patterns, and the length caps keep the validators themselves constant-time.
+    pathological = {
+        'email_address': lambda n: 'a' * n + '@' + 'a.' * n + '!',
+        'phone_number': lambda n: '1' * n + 'x',
+        'first_name': lambda n: 'a -' * n + '1',
+    }
+    print("\n💡 Pathological inputs (time per check):")
+    for field, make in pathological.items():
+        pattern = validators.FIELD_RULES[field][0]
+        small, large = make(1000), make(10000)
+        raw = []
+        for text in (small, large):
+            start = time.perf_counter()
+            pattern.fullmatch(text)
+            raw.append(time.perf_counter() - start)
+        assert field in validators.record_errors({field: large})
+        start = time.perf_counter()
+        for _ in range(1000):
+            validators.record_errors({field: large})
+        capped = (time.perf_counter() - start) / 1000
+        growth = raw[1] / raw[0] if raw[0] else float('inf')
+        # 10x longer input should cost ~10x, not 100x or worse
+        status = "✅" if growth < 30 else "❌"
+        print(f"   {status} {field:<14} raw pattern {len(small):,}→{len(large):,} chars: "
+              f"{raw[0] * 1e6:.0f}→{raw[1] * 1e6:.0f} µs ({growth:.1f}x), with length cap: {capped * 1e6:.1f} µs")
+
+
+def _legacy_performance():
+    """/api/performance-data as it was, minus LIMIT 14: one raw query per subject"""
+    start = portal.request.args.get('start', '')
+    with database.get_db() as conn:
+        user_id = conn.execute('SELECT id FROM users ORDER BY id LIMIT 1').fetchone()[0]
+        subject_data = {}
+        for subject in ["Mathematics", "Physics", "Chemistry"]:
+            rows = conn.execute('SELECT date, score FROM score_activity WHERE user_id=? AND subject=? AND date >= ? '
+                                'ORDER BY date ASC', (user_id, subject, start)).fetchall()
+            subject_data[subject] = [{"date": row[0], "score": row[1]} for row in rows]
+    return portal.jsonify({"subjects": subject_data})
+
+
+def bench_performance(days=365, users=300, requests_count=300):
+    """Latency and payload of a year of Performance tab data: raw per-subject rows vs grouped + downsampled"""
+    import random
+    from datetime import date, timedelta
+    from migrations import migrate
+    from seed import _score_rows, seed_synthetic
+
+    print(f"🔬 /api/performance-data benchmark ({days} days of history)")
+    print("─" * 60)
+    with database.get_db() as conn:
+        migrate(conn)
+        existing = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        if existing < users:
+            print(f"🌱 Seeding {users - existing:,} synthetic users with {days} days of scores...")
+            seed_synthetic(conn, users - existing, days=days)
+        # The route charts the first user; make sure they have the full history
+        user_id = conn.execute('SELECT id FROM users ORDER BY id LIMIT 1').fetchone()[0]
+        today = date.today()
+        dates = [(today - timedelta(days=days - i - 1)).isoformat() for i in range(days)]
+        conn.execute('DELETE FROM score_activity WHERE user_id = ?', (user_id,))
+        conn.executemany('INSERT INTO score_activity (user_id, subject, date, score) VALUES (?, ?, ?, ?)',
+                         _score_rows([user_id], dates, random.Random(1)))
+        conn.commit()
+
+    client = portal.app.test_client()
+    variants = [
+        ("raw rows, query per subject (before)", f"/bench/performance-legacy?start={dates[0]}"),
+        ("daily, 7-day average, 60 points", f"/api/performance-data?days={days}&window=7&points=60"),
+        ("weekly rollup, 4-week average", f"/api/performance-data?days={days}&rollup=week&window=4"),
+        ("weekly rollup, 60 points (after)", f"/api/performance-data?days={days}&rollup=week&window=4&points=60"),
+    ]
+    for label, path in variants:
+        response = client.get(path)
+        points = sum(len(series) for series in response.get_json()['subjects'].values())
+        print_result(f"{label}", timed_requests(path, requests_count), "req/s")
+        print(f"   {'':<38} {len(response.data) / 1024:>10.1f} KB, {points} points")
+
+
+def bench_rankings(users=100000, lookups=20000, sql_lookups=20):
+    """Rank + percentile per subject and attendance: ORDER BY per request vs in-memory bisect index"""
+    import random
+    from migrations import migrate
+    from rankings import rankings
+    from seed import seed_synthetic
+
+    print(f"🔬 Rankings benchmark ({users:,} students)")
+    print("─" * 60)
+    with database.get_db() as conn:
+        migrate(conn)
+        missing = users - conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        if missing > 0:
+            print(f"🌱 Seeding {missing:,} synthetic users...")
+            seed_synthetic(conn, missing, days=1)
+        user_ids = [row[0] for row in conn.execute('SELECT id FROM users')]
+        subjects = [row[0] for row in conn.execute(
+            "SELECT DISTINCT subject FROM score_summary WHERE source = 'test' AND grain = 'all'")]
+    rng = random.Random(7)
+
+    # Before: rank every student with window functions on each request
+    ranked = '''
+        SELECT rank, percent_rank FROM (
+            SELECT user_id, RANK() OVER (ORDER BY value DESC) AS rank,
+                   PERCENT_RANK() OVER (ORDER BY value) AS percent_rank
+            FROM ({values}))
+        WHERE user_id = :user_id
+    '''
+    per_subject = ranked.format(values="SELECT user_id, total / count AS value FROM score_summary "
+                                       "WHERE source = 'test' AND grain = 'all' AND subject = :subject")
+    attendance = ranked.format(values="SELECT user_id, CAST(attended AS REAL) / total AS value FROM attendance "
+                                      "WHERE total > 0")
+    with database.get_db() as conn:
+        start = time.perf_counter()
+        for user_id in rng.sample(user_ids, sql_lookups):
+            for subject in subjects:
+                conn.execute(per_subject, {'subject': subject, 'user_id': user_id}).fetchone()
+            conn.execute(attendance, {'user_id': user_id}).fetchone()
+        sql_ms = (time.perf_counter() - start) / sql_lookups * 1000
+    print_result("ORDER BY per request (before)", sql_ms, "ms/student")
+
+    rankings.invalidate()
+    start = time.perf_counter()
+    rankings.student(user_ids[0])
+    print_result("rank index build (first lookup)", (time.perf_counter() - start) * 1000, "ms")
+    start = time.perf_counter()
+    for user_id in rng.choices(user_ids, k=lookups):
+        rankings.student(user_id)
+    index_us = (time.perf_counter() - start) / lookups * 1e6
+    print_result("bisect rank index (after)", index_us, "µs/student")
+    print(f"   {len(subjects) + 1} metrics per student, {sql_ms * 1000 / index_us:,.0f}x faster")
+
+    start = time.perf_counter()
+    for user_id in rng.choices(user_ids, k=lookups):
+        rankings.attendance_written(user_id, rng.randint(0, 300), 300)
+    print_result("incremental update on write", (time.perf_counter() - start) / lookups * 1e6, "µs")
+    print_result("GET /api/rankings/<id>", timed_requests(f"/api/rankings/{user_ids[len(user_ids) // 2]}", 2000), "req/s")
+
+
+def bench_analytics(users=100000, days=14):
+    """Cohort score trends (slope, rolling average, volatility, streaks): Python loop vs NumPy columns"""
+    from datetime import date, timedelta
+
+    import analytics
+    from migrations import migrate
+    from seed import seed_synthetic
+
+    print(f"🔬 Score trend analytics benchmark ({users:,} students x {days} days)")
+    print("─" * 60)
+    if analytics.np is None:
+        print("❌ numpy is not installed (pip install numpy)")
+        return
+    with database.get_db() as conn:
+        migrate(conn)
+        missing = users - conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        if missing > 0:
+            print(f"🌱 Seeding {missing:,} synthetic users...")
+            seed_synthetic(conn, missing, days=days)
+
+        results = {}
+        for label, engine in (("Python loop (before)", 'python'), ("NumPy columns (after)", 'numpy')):
+            start = time.perf_counter()
+            columns = analytics.load_columns(conn, engine=engine)
+            loaded = time.perf_counter()
+            metrics, _ = analytics.compute_trends(columns)
+            results[engine] = metrics
+            print_result(f"{label} load", (loaded - start) * 1000, "ms")
+            print_result(f"{label} compute", (time.perf_counter() - loaded) * 1000, "ms")
+        print(f"   {len(columns):,} scores in {len(metrics['count']):,} series")
+
+    # Both engines must agree series by series
+    slope_python = analytics.np.array(results['python']['slope'])
+    drift = analytics.np.nanmax(analytics.np.abs(slope_python - results['numpy']['slope']))
+    streaks_match = list(results['python']['longest_streak']) == results['numpy']['longest_streak'].tolist()
+    print(f"   max slope difference {drift:.2e}, streaks {'match' if streaks_match else 'DIFFER'}")
+
+    # Class-wide summaries from the in-memory snapshot: one load, then array arithmetic per range
+    today = date.today()
+    analytics.cohort.invalidate()
+    start = time.perf_counter()
+    analytics.cohort.summary(today)
+    print_result("cohort snapshot load", (time.perf_counter() - start) * 1000, "ms")
+    for range_days in (14, 7):
+        start = time.perf_counter()
+        analytics.cohort.summary(today - timedelta(days=range_days - 1))
+        print_result(f"cohort summary, {range_days} days", (time.perf_counter() - start) * 1000, "ms")
+    print_result("GET /api/analytics/trends?days=14", timed_requests('/api/analytics/trends?days=14', 500), "req/s")
+
+
+def _seed_forum(conn, total, answers_per_query=2):
+    """Grow the forum to total queries; created_at has one-second ties like CURRENT_TIMESTAMP"""
+    from datetime import datetime, timedelta
+
+    from migrations import backfill_forum_tags
+
+    have = conn.execute('SELECT COUNT(*) FROM queries').fetchone()[0]
+    if have >= total:
+        return
+    start = datetime(2024, 1, 1)
+    conn.execute('BEGIN')
+    first_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM queries').fetchone()[0] + 1
+    conn.executemany('INSERT INTO queries (id, special_mentions, brief, created_at) VALUES (?, ?, ?, ?)', (
+        (first_id + i, '["Physics", "Doubt"]', f"How do I approach problem {n}?",
+         (start + timedelta(seconds=n // 3)).strftime('%Y-%m-%d %H:%M:%S'))
+        for i, n in enumerate(range(have, total))))
+    conn.executemany('INSERT INTO answers (query_id, answer_text, created_at) VALUES (?, ?, ?)', (
+        (query_id, f"Answer {k} to query {query_id}", '2025-01-01 00:00:00')
+        for query_id in range(first_id, first_id + total - have) for k in range(answers_per_query)))
+    backfill_forum_tags(conn)
+    conn.commit()
+
+
+def bench_forum(sizes=(1000, 10000, 100000, 300000), views=200):
+    """Dashboard and forum cost as the forum grows: whole forum per dashboard view vs cursor pages"""
+    from migrations import migrate
+
+    print("🔬 Doubt forum benchmark (2 answers per query)")
+    print("─" * 60)
+    portal.init_database()
+    portal.dashboard_cache.ttl = 0  # measure the database path, not the cache
+    client = portal.app.test_client()
+    # What every dashboard view used to load on top of its own panels
+    legacy = ['SELECT id, special_mentions, brief, created_at FROM queries ORDER BY created_at DESC, id DESC',
+              'SELECT query_id, answer_text, created_at FROM answers ORDER BY created_at ASC, id ASC']
+    for size in sizes:
+        with database.get_db() as conn:
+            migrate(conn)
+            _seed_forum(conn, size)
+            start = time.perf_counter()
+            for sql in legacy:
+                conn.execute(sql).fetchall()
+            legacy_ms = (time.perf_counter() - start) * 1000
+        print(f"   {size:,} queries")
+        print_result("  whole forum per dashboard (before)", legacy_ms, "ms")
+        print_result("  /dashboard (after)", timed_requests('/dashboard', views), "req/s")
+
+        start = time.perf_counter()
+        for _ in range(views):
+            client.get('/api/forum')
+        print_result("  /api/forum first page", (time.perf_counter() - start) / views * 1000, "ms")
+        cursor, pages = None, 0
+        start = time.perf_counter()
+        while pages < 50:
+            data = client.get('/api/forum' + (f'?cursor={cursor}' if cursor else '')).get_json()
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        print_result(f"  /api/forum scrolling {pages} pages", (time.perf_counter() - start) / pages * 1000, "ms/page")
+
+
+SEARCH_WORDS = (
+    "what how why explain solve derive define difference between law equation force energy motion "
+    "velocity acceleration momentum friction gravity circuit current voltage resistance ohm capacitor "
+    "magnetic field wave optics lens refraction reaction acid base salt oxidation reduction redox "
+    "electrolysis bond organic carbon polymer mole concentration equilibrium enthalpy entropy integral "
+    "derivative limit matrix vector probability function graph quadratic polynomial trigonometry "
+    "geometry triangle circle series sequence logarithm exponent proof theorem cell enzyme protein "
+    "genetics evolution photosynthesis respiration demand supply market inflation elasticity"
+).split()
+
+
+def _seed_search_forum(conn, posts, answers_share=0.25, seed=11):
+    """Synthetic forum of posts queries + answers with Zipf-like word frequencies and a rare-word tail"""
+    import json
+    import random
+
+    import forum_search
+    from migrations import backfill_forum_tags
+
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(SEARCH_WORDS))]
+    tags = ['Physics', 'Chemistry', 'Mathematics', 'Biology', 'Economics', 'Exam', 'Homework']
+
+    def text(low, high):
+        words = rng.choices(SEARCH_WORDS, weights, k=rng.randint(low, high))
+        words.append(f"topic{rng.randrange(100000)}")  # long tail: each appears ~10 times per million posts
+        rng.shuffle(words)
+        return ' '.join(words)
+
+    queries = int(posts * (1 - answers_share))
+    conn.execute('BEGIN')
+    for name in forum_search.trigger_names():
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')  # index once at the end instead of per row
+    conn.executemany('INSERT INTO queries (special_mentions, brief, created_at) VALUES (?, ?, ?)', (
+        (json.dumps(rng.sample(tags, 2)), text(6, 14), f"2025-{1 + n % 12:02d}-{1 + n % 28:02d} 10:00:00")
+        for n in range(queries)))
+    conn.executemany('INSERT INTO answers (query_id, answer_text) VALUES (?, ?)', (
+        (rng.randint(1, queries), text(10, 24)) for _ in range(posts - queries)))
+    backfill_forum_tags(conn)
+    forum_search.install(conn)
+    conn.commit()
+
+
+def bench_search(posts=1000000, runs=50):
+    """Forum search latency on a synthetic 1M-post forum: LIKE scan vs FTS5 index with BM25"""
+    import forum_search
+
+    print(f"🔬 Forum search benchmark ({posts:,} posts)")
+    print("─" * 60)
+    portal.init_database()
+    with database.get_db() as conn:
+        print(f"🌱 Seeding {posts:,} posts...")
+        start = time.perf_counter()
+        _seed_search_forum(conn, posts)
+        print_result("seed + build index", time.perf_counter() - start, "s")
+
+        like = '''
+            SELECT id FROM queries WHERE brief LIKE :pattern OR id IN (
+                SELECT query_id FROM answers WHERE answer_text LIKE :pattern)
+            ORDER BY created_at DESC LIMIT 20
+        '''
+        start = time.perf_counter()
+        for _ in range(3):
+            conn.execute(like, {'pattern': '%capacitor%'}).fetchall()
+        print_result("LIKE '%capacitor%' scan (before)", (time.perf_counter() - start) / 3 * 1000, "ms")
+
+        cases = (
+            ("common word", 'force', None),
+            ("mid-frequency word", 'capacitor', None),
+            ("rare word", 'topic4242', None),
+            ("two words", 'magnetic field', None),
+            ("prefix (typing)", 'electro', None),
+            ("two words + tag filter", 'acid reaction', 'Chemistry'),
+        )
+        for label, text, tag in cases:
+            start = time.perf_counter()
+            for _ in range(runs):
+                found = forum_search.search(conn, text, tag)
+            elapsed = (time.perf_counter() - start) / runs * 1000
+            print_result(f"FTS5 {label} (after)", elapsed, f"ms ({len(found)} hits)")
+
+    query = 'q=capacitor&tag=Physics'
+    print_result(f"GET /api/forum/search?{query}", timed_requests(f'/api/forum/search?{query}', 200), "req/s")
+    client = portal.app.test_client()
+    start = time.perf_counter()
+    for n in range(200):
+        client.post('/api/raise-query', json={'special_mentions': ['Physics'], 'brief': f'How does capacitor {n} charge?'})
+    print_result("POST /api/raise-query (indexed by trigger)", (time.perf_counter() - start) / 200 * 1000, "ms")
+
+
+def _seed_tagged_forum(conn, queries, seed=23):
+    """Synthetic forum whose special_mentions are JSON lists drawn from a Zipf-like set of 500 tags"""
+    import json
+    import random
+
+    rng = random.Random(seed)
+    tags = ['Physics', 'Chemistry', 'Mathematics', 'Biology', 'Exam'] + [f"Chapter {n}" for n in range(495)]
+    weights = [1 / (rank + 1) for rank in range(len(tags))]
+    conn.execute('BEGIN')
+    conn.executemany('INSERT INTO queries (special_mentions, brief, created_at) VALUES (?, ?, ?)', (
+        (json.dumps(list(dict.fromkeys(rng.choices(tags, weights, k=rng.randint(1, 3))))), f"Doubt {n}",
+         f"2025-{1 + n % 12:02d}-{1 + n % 28:02d} {n % 24:02d}:00:00")
+        for n in range(queries)))
+    conn.commit()
+
+
+def bench_tags(queries=300000, views=200):
+    """Forum tags: JSON special_mentions parsed per query vs normalized query_tags with counters"""
+    import json
+
+    import forum
+    import forum_tags
+    from migrations import backfill_forum_tags
+
+    print(f"🔬 Forum tags benchmark ({queries:,} queries, 500 tags)")
+    print("─" * 60)
+    portal.init_database()
+    with database.get_db() as conn:
+        print(f"🌱 Seeding {queries:,} queries...")
+        _seed_tagged_forum(conn, queries)
+        start = time.perf_counter()
+        conn.execute('BEGIN')
+        added = backfill_forum_tags(conn)
+        conn.commit()
+        print_result(f"backfill migration ({added:,} query tags)", time.perf_counter() - start, "s")
+
+        # How tags were read before: decode special_mentions of every query the page or count looked at
+        legacy_filter = '''
+            SELECT id, special_mentions, brief, created_at FROM queries
+            WHERE EXISTS (SELECT 1 FROM json_each(special_mentions) WHERE lower(trim(value)) = lower(:tag))
+            ORDER BY created_at DESC, id DESC LIMIT 21
+        '''
+        legacy_counts = '''
+            SELECT lower(trim(value)), COUNT(*) FROM queries, json_each(queries.special_mentions)
+            GROUP BY 1 ORDER BY 2 DESC LIMIT 50
+        '''
+        for tag in ('Physics', 'Chapter 400'):
+            matching = conn.execute('SELECT query_count FROM tags WHERE key = ?', (tag.lower(),)).fetchone()[0]
+            start = time.perf_counter()
+            conn.execute(legacy_filter, {'tag': tag}).fetchall()
+            print_result(f"#{tag} ({matching:,} queries) JSON scan (before)", (time.perf_counter() - start) * 1000, "ms")
+            start = time.perf_counter()
+            for _ in range(20):
+                forum.load_page(conn, None, forum.FORUM_PAGE_SIZE, tag)
+            print_result(f"#{tag} query_tags page (after)", (time.perf_counter() - start) / 20 * 1000, "ms")
+
+        start = time.perf_counter()
+        conn.execute(legacy_counts).fetchall()
+        print_result("tag counts from JSON (before)", (time.perf_counter() - start) * 1000, "ms")
+        start = time.perf_counter()
+        for _ in range(100):
+            forum_tags.top_tags(conn)
+        print_result("tag counts from counters (after)", (time.perf_counter() - start) / 100 * 1000, "ms")
+
+        page = conn.execute(forum.FIRST_PAGE_QUERY, {'limit': 20}).fetchall()
+        ids = [row[0] for row in page]
+        mentions = [row[0] for row in conn.execute(
+            f"SELECT special_mentions FROM queries WHERE id IN ({','.join('?' * len(ids))})", ids)]
+        start = time.perf_counter()
+        for _ in range(views):
+            [json.loads(value) for value in mentions]
+        print_result("20-query page, json.loads per query (before)", (time.perf_counter() - start) / views * 1e6, "µs")
+        start = time.perf_counter()
+        for _ in range(views):
+            forum_tags.tags_for(conn, ids)
+        print_result("20-query page, query_tags join (after)", (time.perf_counter() - start) / views * 1e6, "µs")
+
+    print_result("GET /api/forum?tag=Physics", timed_requests('/api/forum?tag=Physics', views), "req/s")
+    print_result("GET /api/forum/tags", timed_requests('/api/forum/tags', views), "req/s")
+    client = portal.app.test_client()
+    start = time.perf_counter()
+    for n in range(200):
+        client.post('/api/raise-query', json={'special_mentions': ['Physics', f'Chapter {n}'], 'brief': f'Doubt {n}'})
+    print_result("POST /api/raise-query with two tags", (time.perf_counter() - start) / 200 * 1000, "ms")
+
+
+def bench_events(clients=1000, messages=200):
+    """Live forum fan-out: dashboard reloads vs one SSE hub pushing to 1k simulated clients"""
+    import threading
+
+    import forum_events
+
+    print(f"🔬 Forum live updates benchmark ({clients:,} clients)")
+    print("─" * 60)
+    portal.init_database()
+    portal.dashboard_cache.ttl = 0  # every reload really re-runs the dashboard queries
+    reloads = timed_requests('/dashboard', 200, threads=4)
+    print_result("/dashboard reloads (before)", reloads, "req/s")
+    print_result(f"  {clients:,} dashboards reloading for one new post", clients / reloads, "s")
+
+    hub = forum_events.hub
+    hub.max_clients = clients
+    hub.heartbeat_seconds = 60
+    hub.backlog = max(hub.backlog, messages)
+    received = [0] * clients
+    progress = threading.Condition()
+
+    def client(index, stream):
+        for chunk in stream:
+            count = chunk.count('\nevent: ')
+            if count:
+                with progress:
+                    received[index] += count
+                    progress.notify_all()
+                if received[index] >= target:
+                    break
+        stream.close()
+
+    def wait_for(total, timeout=120):
+        with progress:
+            return progress.wait_for(lambda: min(received) >= total, timeout)
+
+    # Streams are opened here (registering each client) and read on their own threads, as a worker would
+    target = messages + 20
+    streams = [hub.stream() for _ in range(clients)]
+    threads = [threading.Thread(target=client, args=(i, stream), daemon=True) for i, stream in enumerate(streams)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    print(f"   {hub.stats()['clients']:,} streams connected")
+
+    payload = {'id': 0, 'tags': ['#Physics'], 'brief': 'x' * 120, 'created_at': '2025-01-01 00:00:00', 'answers': []}
+    marks = hub.marks
+    start = time.perf_counter()
+    for n in range(messages):
+        marks = (marks[0], marks[1] + 1)
+        hub.publish([('answer', dict(payload, id=n), marks)])
+    delivered = wait_for(messages)
+    elapsed = time.perf_counter() - start
+    print_result(f"fan-out, {messages} messages one at a time", messages / elapsed, "msg/s")
+    print_result("  deliveries to clients", messages * clients / elapsed, "events/s")
+    if not delivered:
+        print(f"❌ only {min(received)} of {messages} messages reached every client")
+
+    # End to end: a posted query reaches every open dashboard through the poller
+    client_app = portal.app.test_client()
+    latencies = []
+    for n in range(20):
+        start = time.perf_counter()
+        client_app.post('/api/raise-query', json={'special_mentions': ['Physics'], 'brief': f'Live doubt {n}'})
+        wait_for(messages + n + 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print_result(f"POST /api/raise-query -> all {clients:,} clients, median", latencies[len(latencies) // 2], "ms")
+    print_result(f"POST /api/raise-query -> all {clients:,} clients, max", latencies[-1], "ms")
+    for thread in threads:
+        thread.join(5)
+
+
+def bench_writes(writers=32, seconds=3.0):
+    """Forum submissions under concurrent writers: commit per request vs the group-commit writer"""
+    import sqlite3
+    import threading
+
+    from forum_writer import GroupCommitWriter
+
+    print(f"🔬 Forum write benchmark ({writers} concurrent writers, {seconds:g} s per case)")
+    print("─" * 60)
+    portal.init_database()
+    import random
+    queries = 10000
+    with database.get_db() as conn:
+        # Answers are spread over many queries: each one re-indexes its query's answers for search
+        conn.executemany('INSERT INTO queries (special_mentions, brief) VALUES (?, ?)',
+                         (('[]', f'Bench doubt {n}') for n in range(queries)))
+
+    def run(insert):
+        counts = [0] * writers
+        stop = time.perf_counter() + seconds
+
+        def worker(index):
+            while time.perf_counter() < stop:
+                insert()
+                counts[index] += 1
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / seconds
+
+    local = threading.local()
+
+    def legacy_insert(synchronous):
+        """add_answer as it was: own transaction and commit per answer, then read created_at back"""
+        def insert():
+            conn = getattr(local, synchronous, None)
+            if conn is None:
+                conn = sqlite3.connect(database.DATABASE_NAME, timeout=30.0)
+                for pragma in database.CONNECTION_PRAGMAS:
+                    conn.execute(pragma)
+                conn.execute(f'PRAGMA synchronous={synchronous}')
+                setattr(local, synchronous, conn)
+            cursor = conn.execute('INSERT INTO answers (query_id, answer_text) VALUES (?, ?)',
+                                  (random.randint(1, queries), 'Bench answer'))
+            conn.commit()
+            conn.execute('SELECT created_at FROM answers WHERE id = ?', (cursor.lastrowid,)).fetchone()
+        return insert
+
+    for synchronous in ('NORMAL', 'FULL'):
+        print_result(f"commit per answer, synchronous={synchronous} (before)", run(legacy_insert(synchronous)), "inserts/s")
+    for synchronous in ('NORMAL', 'FULL'):
+        writer = GroupCommitWriter(synchronous=synchronous)
+        rate = run(lambda: writer.add_answer(random.randint(1, queries), 'Bench answer'))
+        stats = writer.stats()
+        print_result(f"group commit, synchronous={synchronous} (after)", rate, "inserts/s")
+        print(f"     {stats['batches']:,} commits, {stats['average_batch']} answers per commit on average")
+
+    client = portal.app.test_client()
+    rate = run(lambda: client.post('/api/add-answer', json={'query_id': random.randint(1, queries), 'answer': 'Bench answer'}))
+    print_result("POST /api/add-answer (group commit, FULL)", rate, "req/s")
+
+
+def _legacy_users():
+    """/api/users as it was: SELECT *, fetchall and one jsonify"""
+    with database.get_db() as conn:
+        users = conn.execute('SELECT * FROM users').fetchall()
+    return portal.jsonify({'users': [
+        {'id': u[0], 'first_name': u[1], 'last_name': u[2], 'email_address': u[3],
+         'phone_number': u[4], 'registration_date': u[6]}
+        for u in users
+    ]})
+
+
+def users_probe(mode):
+    """Fetch every user once in this process and print 'ttfb_ms bytes peak_rss_delta_kb'"""
+    import resource
+
+    path = '/bench/users-legacy' if mode == 'before' else '/api/users'
+    client = portal.app.test_client()
+    client.get('/api/users?limit=1').close()  # warm up imports and the connection pool
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    response = client.get(path, buffered=False)
+    ttfb = None
+    size = 0
+    for chunk in response.response:
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        size += len(chunk)
+    response.close()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{ttfb * 1000:.1f} {size} {peak - baseline}")
+
+
+def bench_users(users=100000):
+    """Peak RSS and time-to-first-byte of /api/users: materialized vs streamed"""
+    from migrations import migrate
+    from seed import seed_synthetic
+
+    print(f"🔬 /api/users benchmark ({users:,} users)")
+    print("─" * 60)
+    with database.get_db() as conn:
+        migrate(conn)
+        missing = users - conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        if missing > 0:
+            print(f"🌱 Seeding {missing:,} synthetic users...")
+            seed_synthetic(conn, missing, days=1)
+
+    # Each variant runs in a fresh process so peak RSS is not shared between them
+    for label, mode in (("SELECT * + jsonify (before)", 'before'), ("keyset cursor stream (after)", 'after')):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--users-probe', mode],
+            env={**os.environ, 'PORTAL_DATABASE': database.DATABASE_NAME},
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        ttfb, size, rss = float(output[-3]), int(output[-2]), int(output[-1])
+        print_result(f"{label}: first byte", ttfb, "ms")
+        print_result(f"{label}: peak RSS growth", rss / 1024, "MB")
+        print_result(f"{label}: body size", size / 1024 / 1024, "MB")
+
+
+# Endpoints as they were, for before/after comparisons. Registered at import because Flask refuses new
+# routes once the app has served a request, and one run may take several benchmarks
+portal.app.add_url_rule('/bench/login-legacy', 'bench_login_legacy', _legacy_login)
+portal.app.add_url_rule('/bench/performance-legacy', 'bench_performance_legacy', _legacy_performance)
+portal.app.add_url_rule('/bench/users-legacy', 'bench_users_legacy', _legacy_users)
+
+BENCHMARKS = {
+    'pool': bench_pool,
+    'cache': bench_dashboard_cache,
+    'doubt': bench_doubt_solver,
+    'doubt-cache': bench_doubt_cache,
+    'llm': bench_llm_client,
+    'users': bench_users,
+    'login': bench_login_page,
+    'panels': bench_dashboard_panels,
+    'auth': bench_auth,
+    'login-guard': bench_login_guard,
+    'import': bench_import,
+    'validators': bench_validators,
+    'performance': bench_performance,
+    'rankings': bench_rankings,
+    'analytics': bench_analytics,
+    'forum': bench_forum,
+    'search': bench_search,
+    'tags': bench_tags,
+    'events': bench_events,
+    'writes': bench_writes,
+}
+
+
+def display_help():
+    """Display help information"""
+    print("User Portal System - Benchmarks")
+    print("=" * 40)
+    print("Usage: python bench.py <benchmark> [<benchmark> ...]")
+    print("\nBenchmarks:")
+    for name, func in BENCHMARKS.items():
+        print(f"  {name:<10} - {func.__doc__}")
+
+
+def main():
+    """Main function"""
+    names = sys.argv[1:]
+    if names[:1] == ['--users-probe']:
+        users_probe(names[1])
+        return
+    if not names or names[0] in ('--help', '-h', 'help'):
+        display_help()
+        return
+
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ Unknown benchmark: {name}")
+            print("💡 Use --help for available benchmarks")
+            return
+
+    for name in names:
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Bulk user import/export for the User Portal System
+Streams CSV or JSON Lines uploads row by row, validates them, and writes them with executemany
+in chunked transactions; exports stream straight from the cursor
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+
+from database import get_db
+from passwords import hasher
+from validators import first_error, validate_many
+
+# Configuration
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '2000'))
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', '1000'))   # per-row errors returned in the report
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', '1000'))
+
+IMPORT_FIELDS = ('first_name', 'last_name', 'email_address', 'phone_number', 'password')
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(requested=None, content_type='', filename=''):
+    """Return 'csv' or 'jsonl' from an explicit format, the upload's file name or its content type"""
+    if requested:
+        return requested if requested in FORMATS else None
+    filename = (filename or '').lower()
+    if filename.endswith('.csv'):
+        return 'csv'
+    if filename.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    content_type = (content_type or '').lower()
+    if 'csv' in content_type:
+        return 'csv'
+    if 'ndjson' in content_type or 'jsonl' in content_type or 'json' in content_type:
+        return 'jsonl'
+    return None
+
+
+class UploadError(ValueError):
+    """The upload cannot be read past a given line (bad header, bad encoding or malformed CSV)"""
+
+    def __init__(self, message, line):
+        super().__init__(message)
+        self.line = line
+
+
+def parse_rows(binary_stream, fmt):
+    """
+    Yield (line number, row dict or None, parse error or None) without reading the whole upload.
+    Raises UploadError if a CSV upload lacks a required column or the rest of the upload cannot be read.
+    """
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            missing = [f for f in IMPORT_FIELDS if f not in (reader.fieldnames or ())]
+            if missing:
+                raise UploadError(f"CSV header is missing: {', '.join(missing)}", 1)
+            for row in reader:
+                yield reader.line_num, row, None
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise UploadError(f"Upload could not be read after line {reader.line_num}: {e}", reader.line_num + 1)
+        return
+
+    line_number = 0
+    try:
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None, 'Invalid JSON'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, 'Each line must be a JSON object'
+                continue
+            yield line_number, row, None
+    except UnicodeDecodeError as e:
+        raise UploadError(f"Upload could not be read after line {line_number}: {e}", line_number + 1)
+
+
+class ImportReport:
+    """Counts and per-row errors for one import"""
+
+    def __init__(self, max_errors=IMPORT_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.chunks = 0
+        self.stopped = None
+        self.started = time.perf_counter()
+
+    def error(self, line, email, message, fields=None):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            entry = {'line': line, 'email_address': email, 'error': message}
+            if fields:
+                entry['fields'] = fields
+            self.errors.append(entry)
+
+    def stop(self, line, message):
+        """Record why the rest of the upload was not imported; rows before it stay committed"""
+        self.stopped = {'line': line, 'error': message}
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        total = self.imported + self.failed
+        report = {
+            'success': self.stopped is None,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda e: e['line']),
+            'errors_truncated': self.failed > len(self.errors),
+            'chunks': self.chunks,
+            'stopped': self.stopped,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(total / elapsed, 1) if elapsed > 0 else None,
+        }
+        if self.stopped:
+            report['error'] = self.stopped['error']
+        return report
+
+
+def _existing_emails(conn, emails):
+    """Return the subset of emails already registered"""
+    found = set()
+    emails = list(emails)
+    for start in range(0, len(emails), 500):
+        batch = emails[start:start + 500]
+        placeholders = ','.join('?' * len(batch))
+        found.update(row[0] for row in conn.execute(
+            f'SELECT email_address FROM users WHERE email_address IN ({placeholders})', batch))
+    return found
+
+
+def _write_chunk(chunk, report, on_imported):
+    """Insert one chunk of validated rows in a single transaction"""
+    if not chunk:
+        return
+    report.chunks += 1
+    hashes = hasher.hash_many([row[5] for row in chunk])
+    with get_db() as conn:
+        taken = _existing_emails(conn, (row[3] for row in chunk))
+        rows = []
+        for (line, first, last, email, phone, _), password_hash in zip(chunk, hashes):
+            if email in taken:
+                report.error(line, email, 'An account with this email already exists')
+            else:
+                rows.append((line, (first, last, email, phone, password_hash)))
+        sql = 'INSERT INTO users (first_name, last_name, email_address, phone_number, password) VALUES (?, ?, ?, ?, ?)'
+        try:
+            conn.execute('BEGIN')
+            conn.executemany(sql, (values for _, values in rows))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            # Someone registered one of these emails meanwhile - fall back to row-by-row for this chunk
+            conn.rollback()
+            conn.execute('BEGIN')
+            inserted = []
+            for line, values in rows:
+                try:
+                    conn.execute(sql, values)
+                    inserted.append((line, values))
+                except sqlite3.IntegrityError:
+                    report.error(line, values[2], 'An account with this email already exists')
+            conn.commit()
+            rows = inserted
+    report.imported += len(rows)
+    for _, values in rows:
+        on_imported(values[2])
+
+
+def _validate_chunk(pending, seen, report):
+    """Validate buffered rows as one batch; returns the rows ready to insert"""
+    chunk = []
+    for (line, record), errors in zip(pending, validate_many([record for _, record in pending])):
+        email = record['email_address']
+        if not errors and email in seen:
+            errors = {'email_address': 'Duplicate email in this upload'}
+        if errors:
+            report.error(line, email or None, first_error(errors), errors)
+            continue
+        seen.add(email)
+        chunk.append((line, *(record[f] for f in IMPORT_FIELDS)))
+    return chunk
+
+
+def import_users(parsed_rows, chunk_size=IMPORT_CHUNK_SIZE, on_imported=lambda email: None):
+    """
+    Validate and insert parsed rows in chunks; returns an ImportReport. Earlier chunks are already
+    committed when an UploadError stops the upload, so it is recorded in the report instead of raised.
+    """
+    report = ImportReport()
+    seen = set()
+    pending = []
+    try:
+        for line, row, parse_error in parsed_rows:
+            if parse_error:
+                report.error(line, None, parse_error)
+                continue
+            record = {f: str(row.get(f) or '').strip() for f in IMPORT_FIELDS}
+            record['email_address'] = record['email_address'].lower()
+            pending.append((line, record))
+            if len(pending) >= chunk_size:
+                _write_chunk(_validate_chunk(pending, seen, report), report, on_imported)
+                pending = []
+    except UploadError as e:
+        report.stop(e.line, str(e))
+    if pending:
+        _write_chunk(_validate_chunk(pending, seen, report), report, on_imported)
+    return report
+
+
+def export_users(fields, fmt):
+    """Yield users as CSV or JSON Lines, one fetch batch at a time"""
+    columns = ', '.join(fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(fields)
+    with get_db() as conn:
+        cursor = conn.execute(f'SELECT {columns} FROM users ORDER BY id')
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            if writer:
+                writer.writerows(rows)
+            else:
+                buffer.writelines(json.dumps(dict(zip(fields, row)), separators=(',', ':')) + '\n' for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,194 @@
+"""
+In-process caching for the User Portal System
+LRU/TTL cache with hit/miss/eviction counters and a pluggable storage backend
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from database import ConnectionPool
+
+# Configuration
+DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', '300'))
+DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', '1024'))
+DASHBOARD_CACHE_BACKEND = os.environ.get('DASHBOARD_CACHE_BACKEND', 'local')
+DASHBOARD_CACHE_PATH = os.environ.get('DASHBOARD_CACHE_PATH', 'portal_cache.db')
+
+# Key used for the demo dashboard, which always shows the first user
+DEFAULT_DASHBOARD_KEY = 'default'
+
+
+class LocalBackend:
+    """Thread-safe LRU store private to one worker process"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, expires_at) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        """Store a value; return the number of entries evicted to make room"""
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key):
+        """Remove one key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every key"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Store shared by every worker on the host through a small SQLite file"""
+
+    def __init__(self, max_entries, path=DASHBOARD_CACHE_PATH):
+        self.max_entries = max_entries
+        self.pool = ConnectionPool(path)
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_entries_stored_at ON cache_entries (stored_at)')
+
+    def get(self, key):
+        """Return (value, expires_at) or None"""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT value, expires_at FROM cache_entries WHERE key = ?', (str(key),)).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key, value, expires_at):
+        """Store a value; return the number of entries evicted to make room"""
+        with self.pool.connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)',
+                (str(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at, time.time())
+            )
+            cursor = conn.execute('''
+                DELETE FROM cache_entries WHERE key IN (
+                    SELECT key FROM cache_entries ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            return max(cursor.rowcount, 0)
+
+    def delete(self, key):
+        """Remove one key"""
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (str(key),))
+
+    def clear(self):
+        """Remove every key"""
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM cache_entries')
+
+    def __len__(self):
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+
+BACKENDS = {
+    'local': LocalBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+class TTLCache:
+    """LRU/TTL cache front-end that keeps hit/miss/eviction counters"""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expiry"""
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.time():
+                self._count('hits')
+                return value
+            self.backend.delete(key)
+            self._count('evictions')
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        """Cache value under key for the configured TTL"""
+        evicted = self.backend.set(key, value, time.time() + self.ttl)
+        if evicted:
+            self._count('evictions', evicted)
+
+    def invalidate(self, *keys):
+        """Drop the given keys"""
+        for key in keys:
+            self.backend.delete(key)
+        self._count('invalidations', len(keys))
+
+    def invalidate_all(self):
+        """Drop everything (used when the database is reset or migrated)"""
+        self.backend.clear()
+        self._count('invalidations')
+
+    def stats(self):
+        """Return cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+def create_cache(backend_name=DASHBOARD_CACHE_BACKEND, max_entries=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL):
+    """Build a TTLCache on the named backend ('local' or 'sqlite')"""
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Unknown cache backend: {backend_name}")
+    return TTLCache(BACKENDS[backend_name](max_entries), ttl)
+
+
+# Fully assembled dashboard template contexts, keyed by user id
+dashboard_cache = create_cache()
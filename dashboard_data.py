@@ -0,0 +1,90 @@
+"""
+Dashboard data access for the User Portal System
+Fetches every dashboard panel in a single SQL statement using SQLite's JSON aggregation.
+The doubt forum is not part of it: the page loads it from /api/forum one page at a time
+"""
+
+import json
+
+# Subjects are always shown in this order
+FIXED_SUBJECT_ORDER = ["Mathematics", "Chemistry", "Physics", "Economics", "Biology"]
+
+# One round trip: each panel comes back as a JSON column.
+# `me` resolves the requested user (or the first user, for the demo dashboard).
+DASHBOARD_QUERY = '''
+    WITH me AS (
+        SELECT id, first_name, last_name FROM users
+        WHERE id = coalesce(:user_id, (SELECT min(id) FROM users))
+    ),
+    uid AS (
+        SELECT coalesce((SELECT id FROM me), 1) AS id
+    )
+    SELECT
+        (SELECT json_array(id, first_name, last_name) FROM me),
+        (SELECT json_array(attended, total) FROM attendance
+            WHERE user_id = (SELECT id FROM uid) LIMIT 1),
+        (SELECT json_group_object(note_type, count) FROM notes
+            WHERE user_id = (SELECT id FROM uid)),
+        (SELECT json_group_array(json_array(subject, date, time, status, duration)) FROM (
+            SELECT subject, date, time, status, duration FROM timetable
+            WHERE user_id = (SELECT id FROM uid) ORDER BY date, time)),
+        (SELECT json_group_array(json_array(score, subject, lesson)) FROM (
+            SELECT score, subject, lesson FROM test_scores
+            WHERE user_id = (SELECT id FROM uid) ORDER BY id)),
+        (SELECT json_group_array(json_array(title, image_url, date)) FROM (
+            SELECT title, image_url, date FROM notice_board
+            WHERE user_id = (SELECT id FROM uid) ORDER BY id)),
+        (SELECT json_array(p.title, p.professor, p.end_time, json((
+                SELECT json_group_array(participant_img) FROM (
+                    SELECT participant_img FROM poll_participants
+                    WHERE poll_id = p.id ORDER BY id))))
+            FROM polls p WHERE p.user_id = (SELECT id FROM uid)
+            ORDER BY p.id DESC LIMIT 1),
+        (SELECT json_group_array(subject_name) FROM subjects
+            WHERE user_id = (SELECT id FROM uid)),
+        (SELECT json_group_array(json_array(code, title, time)) FROM (
+            SELECT code, title, time FROM upcoming_tasks
+            WHERE user_id = (SELECT id FROM uid) ORDER BY id))
+'''
+
+
+def _loads(value, default):
+    """Decode a JSON column, falling back to default for NULL"""
+    return json.loads(value) if value is not None else default
+
+
+def load_dashboard_context(conn, user_id=None):
+    """Return the dashboard.html template context for user_id (first user when None)"""
+    row = conn.execute(DASHBOARD_QUERY, {'user_id': user_id}).fetchone()
+    (user, attendance, notes, timetable, test_scores, notice_board,
+     poll, subjects, upcoming_tasks) = row
+
+    user = _loads(user, None)
+    attendance = _loads(attendance, None)
+    poll = _loads(poll, None)
+
+    poll_data = None
+    poll_participants = []
+    if poll:
+        poll_title, poll_prof, poll_end, poll_participants = poll
+        poll_data = {
+            'title': poll_title,
+            'professor': poll_prof,
+            'end_time': poll_end
+        }
+
+    user_subjects = _loads(subjects, [])
+
+    return {
+        'user_id': user[0] if user else 1,
+        'user_name': f"{user[1]} {user[2]}" if user else "Student",
+        'attendance': {'attended': attendance[0], 'total': attendance[1]} if attendance else {'attended': 0, 'total': 0},
+        'notes': _loads(notes, {}),
+        'timetable': _loads(timetable, []),
+        'test_scores': _loads(test_scores, []),
+        'notice_board': _loads(notice_board, []),
+        'poll_data': poll_data,
+        'poll_participants': poll_participants or [],
+        'upcoming_tasks': _loads(upcoming_tasks, []),
+        'subjects': [subj for subj in FIXED_SUBJECT_ORDER if subj in user_subjects],
+    }
@@ -0,0 +1,133 @@
+"""
+Database access layer for the User Portal System
+Reuses tuned SQLite connections across requests instead of reconnecting every time
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Configuration
+DATABASE_NAME = os.environ.get('PORTAL_DATABASE', 'user_portal.db')
+POOL_SIZE = int(os.environ.get('PORTAL_DB_POOL_SIZE', '8'))
+
+# Pragmas applied once to every new connection
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',   # 256 MB memory-mapped I/O
+    'PRAGMA cache_size=-16000',     # ~16 MB page cache per connection
+    'PRAGMA busy_timeout=5000',
+)
+
+
+class ConnectionPool:
+    """Pool of idle SQLite connections, one pool per worker process"""
+
+    def __init__(self, database, size=POOL_SIZE):
+        self.database = database
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=max(size, 1))
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.opened = 0
+        self.reused = 0
+
+    def _create_connection(self):
+        """Open a new connection and apply the tuned pragmas"""
+        conn = sqlite3.connect(self.database, timeout=5.0, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def _check_fork(self):
+        """Drop connections inherited from a parent process (gunicorn preload/fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # The parent still owns these handles, so forget them without closing
+                self._idle = queue.LifoQueue(maxsize=max(self.size, 1))
+                self._pid = os.getpid()
+                self.opened = 0
+                self.reused = 0
+
+    def acquire(self):
+        """Take an idle connection or open a new one"""
+        self._check_fork()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._create_connection()
+        with self._lock:
+            self.reused += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full"""
+        if conn.in_transaction:
+            conn.rollback()
+        if self.size <= 0:
+            # Pooling disabled - behave like connect-per-request
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Yield a pooled connection; commit on success, roll back on error"""
+        conn = self.acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except sqlite3.ProgrammingError:
+            # Connection is unusable (e.g. closed) - don't put it back
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection held by this process"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Return pool counters"""
+        return {
+            'database': self.database,
+            'size': self.size,
+            'idle': self._idle.qsize(),
+            'opened': self.opened,
+            'reused': self.reused,
+        }
+
+
+pool = ConnectionPool(DATABASE_NAME)
+
+
+def get_db():
+    """Context manager used by all routes: `with get_db() as conn:`"""
+    return pool.connection()
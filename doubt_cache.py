@@ -0,0 +1,190 @@
+"""
+Answer cache for the Doubt Solver
+Normalized exact-match lookups plus a word-bigram shingle similarity tier, stored in SQLite
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from database import get_db
+
+# Configuration
+DOUBT_CACHE_ENABLED = os.environ.get('DOUBT_CACHE_ENABLED', '1') != '0'
+DOUBT_CACHE_TTL = float(os.environ.get('DOUBT_CACHE_TTL', str(7 * 24 * 3600)))
+DOUBT_CACHE_MAX_ENTRIES = int(os.environ.get('DOUBT_CACHE_MAX_ENTRIES', '20000'))
+DOUBT_CACHE_SIMILARITY = float(os.environ.get('DOUBT_CACHE_SIMILARITY', '0.8'))
+
+# Words that do not change what a question is about
+STOPWORDS = frozenset('''
+    a an and are be can could do does explain for how i in is it me of on please plz tell the to
+    what whats why with you
+'''.split())
+
+# Numbers (with their decimal point), words and math operators; any other punctuation is dropped
+_TOKENS = re.compile(r"\d+(?:\.\d+)?|\w+|[-+*/^=<>%]")
+_APOSTROPHES = re.compile(r"['\u2019]")
+_EXACT = re.compile(r"\d|[-+*/^=<>%]")
+
+
+def normalize(question):
+    """Lower-case and split into space-separated tokens, keeping numbers and math operators"""
+    return ' '.join(_TOKENS.findall(_APOSTROPHES.sub('', question.lower())))
+
+
+def terms(normalized):
+    """
+    Ordered shingles used by the similarity tier: each pair of neighbouring content words, so
+    "kilometers to miles" and "miles to kilometers" share none (a single content word is its own shingle)
+    """
+    words = [word for word in normalized.split(' ') if word and word not in STOPWORDS]
+    if len(words) < 2:
+        return words
+    return sorted({f"{first} {second}" for first, second in zip(words, words[1:])})
+
+
+def exact_terms(normalized):
+    """
+    Numbers, tokens containing digits and operators, in order; two questions that differ in any of
+    these ask different things however many words they share
+    """
+    return [word for word in normalized.split(' ') if _EXACT.search(word)]
+
+
+class DoubtCache:
+    """SQLite-backed question -> answer cache with TTL and size-based eviction"""
+
+    def __init__(self, ttl=DOUBT_CACHE_TTL, max_entries=DOUBT_CACHE_MAX_ENTRIES, similarity=DOUBT_CACHE_SIMILARITY,
+                 enabled=DOUBT_CACHE_ENABLED):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _similar(self, conn, key, oldest):
+        """Return (entry_id, answer) for the best entry with the same numbers and enough shared shingles, or None"""
+        query_terms = terms(key)
+        if not query_terms:
+            return None
+        query_exact = exact_terms(key)
+        placeholders = ','.join('?' * len(query_terms))
+        candidates = conn.execute(f'''
+            SELECT c.id, c.answer, c.question_key, c.term_count, COUNT(*) AS shared
+            FROM doubt_cache_terms t
+            JOIN doubt_cache c ON c.id = t.entry_id
+            WHERE t.term IN ({placeholders}) AND c.created_at >= ?
+            GROUP BY c.id
+            ORDER BY shared DESC
+            LIMIT 20
+        ''', (*query_terms, oldest)).fetchall()
+
+        best = None
+        for entry_id, answer, question_key, term_count, shared in candidates:
+            if exact_terms(question_key) != query_exact:
+                continue
+            score = shared / (len(query_terms) + term_count - shared)
+            if score >= self.similarity and (best is None or score > best[0]):
+                best = (score, entry_id, answer)
+        return best[1:] if best else None
+
+    def lookup(self, question):
+        """Return a cached answer for question, or None"""
+        key = normalize(question)
+        if not self.enabled or not key:
+            return None
+        now = time.time()
+        oldest = now - self.ttl
+        try:
+            with get_db() as conn:
+                row = conn.execute(
+                    'SELECT id, answer FROM doubt_cache WHERE question_key = ? AND created_at >= ?',
+                    (key, oldest)
+                ).fetchone()
+                counter = 'exact_hits'
+                if row is None:
+                    row = self._similar(conn, key, oldest)
+                    counter = 'similar_hits'
+                if row is not None:
+                    conn.execute('UPDATE doubt_cache SET hits = hits + 1, last_hit_at = ? WHERE id = ?', (now, row[0]))
+        except sqlite3.Error:
+            # A broken cache must never take the Doubt Solver down with it
+            row = None
+        if row is None:
+            self._count('misses')
+            return None
+        self._count(counter)
+        return row[1]
+
+    def store(self, question, answer):
+        """Cache answer for question, evicting expired and least recently used entries"""
+        key = normalize(question)
+        if not self.enabled or not key or not answer:
+            return
+        now = time.time()
+        key_terms = terms(key)
+        try:
+            with get_db() as conn:
+                conn.execute('DELETE FROM doubt_cache_terms WHERE entry_id IN (SELECT id FROM doubt_cache WHERE question_key = ?)', (key,))
+                conn.execute('DELETE FROM doubt_cache WHERE question_key = ?', (key,))
+                cursor = conn.execute('''
+                    INSERT INTO doubt_cache (question_key, question, answer, term_count, created_at, last_hit_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (key, question, answer, len(key_terms), now, now))
+                conn.executemany('INSERT INTO doubt_cache_terms (term, entry_id) VALUES (?, ?)',
+                                 ((term, cursor.lastrowid) for term in key_terms))
+                evicted = self._evict(conn, now)
+        except sqlite3.Error:
+            return
+        self._count('stores')
+        if evicted:
+            self._count('evictions', evicted)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently hit ones beyond max_entries"""
+        stale = [row[0] for row in conn.execute('SELECT id FROM doubt_cache WHERE created_at < ?', (now - self.ttl,))]
+        overflow = conn.execute('SELECT COUNT(*) FROM doubt_cache').fetchone()[0] - len(stale) - self.max_entries
+        if overflow > 0:
+            stale += [row[0] for row in conn.execute(
+                'SELECT id FROM doubt_cache WHERE created_at >= ? ORDER BY last_hit_at LIMIT ?',
+                (now - self.ttl, overflow))]
+        if stale:
+            conn.executemany('DELETE FROM doubt_cache_terms WHERE entry_id = ?', ((i,) for i in stale))
+            conn.executemany('DELETE FROM doubt_cache WHERE id = ?', ((i,) for i in stale))
+        return len(stale)
+
+    def clear(self):
+        """Remove every cached answer"""
+        with get_db() as conn:
+            conn.execute('DELETE FROM doubt_cache_terms')
+            conn.execute('DELETE FROM doubt_cache')
+
+    def stats(self):
+        """Return hit-rate counters"""
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'exact_hits': self.exact_hits,
+            'similar_hits': self.similar_hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'ttl_seconds': self.ttl,
+            'max_entries': self.max_entries,
+        }
+
+
+doubt_cache = DoubtCache()
@@ -0,0 +1,101 @@
+"""
+Doubt forum pages for the User Portal System
+Queries are served newest first in pages addressed by a (created_at, id) cursor, so each page is one
+index range scan however long the forum gets; answers and tags are fetched only for the queries on the page
+"""
+
+import base64
+import json
+import os
+
+import forum_tags
+
+# Configuration
+FORUM_PAGE_SIZE = int(os.environ.get('FORUM_PAGE_SIZE', '20'))
+FORUM_MAX_PAGE_SIZE = int(os.environ.get('FORUM_MAX_PAGE_SIZE', '100'))
+
+FIRST_PAGE_QUERY = '''
+    SELECT id, brief, created_at FROM queries
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+'''
+# created_at ties (second resolution) are broken by id, so no query is skipped or repeated across pages
+PAGE_QUERY = '''
+    SELECT id, brief, created_at FROM queries
+    WHERE (created_at, id) < (:created_at, :id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+'''
+# One tag's queries are read in forum order straight from its query_tags index range
+TAG_FIRST_PAGE_QUERY = '''
+    SELECT q.id, q.brief, q.created_at FROM query_tags qt
+    JOIN queries q ON q.id = qt.query_id
+    WHERE qt.tag_id = :tag_id
+    ORDER BY qt.created_at DESC, qt.query_id DESC
+    LIMIT :limit
+'''
+TAG_PAGE_QUERY = '''
+    SELECT q.id, q.brief, q.created_at FROM query_tags qt
+    JOIN queries q ON q.id = qt.query_id
+    WHERE qt.tag_id = :tag_id AND (qt.created_at, qt.query_id) < (:created_at, :id)
+    ORDER BY qt.created_at DESC, qt.query_id DESC
+    LIMIT :limit
+'''
+ANSWERS_QUERY = '''
+    SELECT id, query_id, answer_text, created_at FROM answers
+    WHERE query_id IN ({placeholders})
+    ORDER BY query_id, created_at, id
+'''
+
+
+def encode_cursor(created_at, query_id):
+    """Opaque cursor for the page after the query (created_at, query_id)"""
+    raw = json.dumps([created_at, query_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor; raises ValueError if it was not made by encode_cursor"""
+    try:
+        created_at, query_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(query_id, int):
+        raise ValueError('Invalid cursor')
+    return created_at, query_id
+
+
+def load_page(conn, cursor=None, limit=FORUM_PAGE_SIZE, tag=None):
+    """Return (queries with their answers, cursor for the next page or None), optionally only those tagged tag"""
+    # One extra row tells whether another page follows
+    params = {'limit': limit + 1}
+    if cursor:
+        params['created_at'], params['id'] = decode_cursor(cursor)
+    if tag:
+        params['tag_id'] = forum_tags.tag_id(conn, tag)
+        if params['tag_id'] is None:
+            return [], None
+        sql = TAG_PAGE_QUERY if cursor else TAG_FIRST_PAGE_QUERY
+    else:
+        sql = PAGE_QUERY if cursor else FIRST_PAGE_QUERY
+    rows = conn.execute(sql, params).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    ids = [row[0] for row in rows]
+    tags = forum_tags.tags_for(conn, ids)
+    answers = {}
+    if rows:
+        sql = ANSWERS_QUERY.format(placeholders=','.join('?' * len(ids)))
+        for answer_id, query_id, answer_text, created_at in conn.execute(sql, ids):
+            answers.setdefault(query_id, []).append({'id': answer_id, 'text': answer_text, 'created_at': created_at})
+
+    queries = [{
+        'id': query_id,
+        'tags': tags.get(query_id, []),
+        'brief': brief,
+        'created_at': created_at,
+        'answers': answers.get(query_id, []),
+    } for query_id, brief, created_at in rows]
+    next_cursor = encode_cursor(rows[-1][2], rows[-1][0]) if more else None
+    return queries, next_cursor
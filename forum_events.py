@@ -0,0 +1,244 @@
+"""
+Live doubt forum updates for the User Portal System
+One poller thread per process follows the queries and answers tables by id and publishes each new row
+once, pre-formatted as a server-sent event; every connected dashboard just replays that shared list.
+Writers in this process wake the poller straight after committing, and rows written by other worker
+processes are picked up on the next poll, so no broker is needed between gunicorn workers.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import database
+import forum_tags
+
+# Configuration
+FORUM_EVENTS_POLL_SECONDS = float(os.environ.get('FORUM_EVENTS_POLL_SECONDS', '1'))
+FORUM_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('FORUM_EVENTS_HEARTBEAT_SECONDS', '15'))
+FORUM_EVENTS_BACKLOG = int(os.environ.get('FORUM_EVENTS_BACKLOG', '500'))
+# Each open stream holds a worker thread under gthread; gunicorn.conf.py sizes this from the worker
+# class, threads and connections, and the default here is half of its default 16 threads
+FORUM_EVENTS_MAX_CLIENTS = int(os.environ.get('FORUM_EVENTS_MAX_CLIENTS', '8'))
+FORUM_EVENTS_BATCH = 200
+
+NEW_QUERIES = 'SELECT id, brief, created_at FROM queries WHERE id > ? ORDER BY id LIMIT ?'
+NEW_ANSWERS = 'SELECT id, query_id, answer_text, created_at FROM answers WHERE id > ? ORDER BY id LIMIT ?'
+LAST_IDS = 'SELECT (SELECT COALESCE(MAX(id), 0) FROM queries), (SELECT COALESCE(MAX(id), 0) FROM answers)'
+
+RETRY = 'retry: 3000\n\n'
+HEARTBEAT = ': keep-alive\n\n'
+
+
+class TooManyClientsError(Exception):
+    """Raised when this process already serves FORUM_EVENTS_MAX_CLIENTS streams"""
+
+
+def format_event(event, payload, event_id=None):
+    """Format one server-sent event"""
+    head = f"id: {event_id}\n" if event_id else ''
+    return f"{head}event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def event_id(marks):
+    """Stream position as sent to the browser: the last query id and answer id published"""
+    return f"{marks[0]}.{marks[1]}"
+
+
+def parse_event_id(value):
+    """Return (query id, answer id) from a Last-Event-ID header, or None if it is not one of ours"""
+    try:
+        query_id, answer_id = (int(part) for part in value.split('.'))
+    except (AttributeError, ValueError):
+        return None
+    return query_id, answer_id
+
+
+class ForumEvents:
+    """Process-wide hub: one poller publishes, any number of streams follow the shared event list"""
+
+    def __init__(self, poll_seconds=FORUM_EVENTS_POLL_SECONDS, heartbeat_seconds=FORUM_EVENTS_HEARTBEAT_SECONDS,
+                 backlog=FORUM_EVENTS_BACKLOG, max_clients=FORUM_EVENTS_MAX_CLIENTS):
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.backlog = backlog
+        self.max_clients = max_clients
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._pid = None
+        self._thread = None
+        # events[i] is (marks after it, text) with sequence number first_seq + i
+        self._events = []
+        self._first_seq = 0
+        self._floor = None   # marks before events[0]
+        self.marks = None
+        self.clients = 0
+        self.published = 0
+        self.polls = 0
+        self.rejected = 0
+
+    @property
+    def seq(self):
+        return self._first_seq + len(self._events)
+
+    def notify(self):
+        """Poll now instead of at the next interval (called after committing a query or answer)"""
+        self._wake.set()
+
+    def _start(self):
+        """Start the poller once per process (a forked worker does not inherit the parent's thread)"""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._events, self._first_seq, self._floor, self.marks = [], 0, None, None
+            self._pid = os.getpid()
+            self._wake.set()
+            self._thread = threading.Thread(target=self._run, name='forum-events', daemon=True)
+            self._thread.start()
+            # Streams need a starting position, so wait for the first look at the tables
+            self._cond.wait_for(lambda: self.marks is not None, timeout=5)
+
+    def publish(self, events):
+        """
+        Append (event, payload, marks) tuples for every stream and wake them once; each event's text is
+        formatted here, once, however many streams are listening
+        """
+        if not events:
+            return
+        formatted = [(marks, format_event(event, payload, event_id(marks))) for event, payload, marks in events]
+        with self._cond:
+            self._events.extend(formatted)
+            if len(self._events) > 2 * self.backlog:
+                drop = len(self._events) - self.backlog
+                self._floor = self._events[drop - 1][0]
+                del self._events[:drop]
+                self._first_seq += drop
+            self.marks = formatted[-1][0]
+            self.published += len(formatted)
+            self._cond.notify_all()
+
+    def _reset(self, marks):
+        """The tables went backwards (database re-created): streams reload instead of resuming"""
+        with self._cond:
+            # Every open stream is now behind the backlog, so its next read is a reset event
+            self._first_seq = self.seq + 1
+            self._events, self._floor, self.marks = [], marks, marks
+            self._cond.notify_all()
+
+    def _poll(self, conn):
+        """Publish rows added since the last poll; returns True if a full batch was read"""
+        last_query, last_answer = conn.execute(LAST_IDS).fetchone()
+        if self.marks is None or last_query < self.marks[0] or last_answer < self.marks[1]:
+            if self.marks is None:
+                with self._cond:
+                    self._floor = self.marks = (last_query, last_answer)
+                    self._cond.notify_all()
+            else:
+                self._reset((last_query, last_answer))
+            return False
+        query_mark, answer_mark = self.marks
+        queries = conn.execute(NEW_QUERIES, (query_mark, FORUM_EVENTS_BATCH)).fetchall()
+        answers = conn.execute(NEW_ANSWERS, (answer_mark, FORUM_EVENTS_BATCH)).fetchall()
+        tags = forum_tags.tags_for(conn, [row[0] for row in queries])
+        events = []
+        # Queries first, so an answer never arrives before the query it belongs to
+        for query_id, brief, created_at in queries:
+            query_mark = query_id
+            events.append(('query', {'id': query_id, 'tags': tags.get(query_id, []), 'brief': brief,
+                                     'created_at': created_at, 'answers': []}, (query_mark, answer_mark)))
+        for answer_id, query_id, answer_text, created_at in answers:
+            answer_mark = answer_id
+            events.append(('answer', {'id': answer_id, 'query_id': query_id, 'text': answer_text,
+                                      'created_at': created_at}, (query_mark, answer_mark)))
+        self.publish(events)
+        return len(queries) == FORUM_EVENTS_BATCH or len(answers) == FORUM_EVENTS_BATCH
+
+    def _run(self):
+        """Poller loop: look at the tables when woken, when another connection committed, or every interval"""
+        conn = sqlite3.connect(database.DATABASE_NAME, timeout=5.0, check_same_thread=False)
+        conn.execute('PRAGMA busy_timeout=5000')
+        data_version = None
+        while True:
+            woken = self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            try:
+                # data_version only changes for commits made by other connections, which is all of them here
+                version = conn.execute('PRAGMA data_version').fetchone()[0]
+                if not woken and version == data_version and self.marks is not None:
+                    continue
+                data_version = version
+                self.polls += 1
+                while self._poll(conn):
+                    pass
+            except sqlite3.Error:
+                # Tables missing while the database is being re-created; try again next interval
+                time.sleep(self.poll_seconds)
+
+    def _position(self, last_event_id):
+        """Sequence number a new stream starts from; resumes after last_event_id while the backlog allows"""
+        marks = parse_event_id(last_event_id) if last_event_id else None
+        if marks is None or self.marks is None:
+            return self.seq
+        if marks[0] < self._floor[0] or marks[1] < self._floor[1]:
+            return self._first_seq - 1   # older than the backlog: the stream starts with a reset event
+        for index, (event_marks, _) in enumerate(self._events):
+            if event_marks[0] > marks[0] or event_marks[1] > marks[1]:
+                return self._first_seq + index
+        return self.seq
+
+    def stream(self, last_event_id=None):
+        """
+        Generator of server-sent event text for one dashboard. The client limit is checked here, so a full
+        hub raises TooManyClientsError before the response starts.
+        """
+        self._start()
+        with self._cond:
+            if self.clients >= self.max_clients:
+                self.rejected += 1
+                raise TooManyClientsError('Too many live forum connections')
+            position = self._position(last_event_id)
+        return self._follow(position)
+
+    def _follow(self, position):
+        # Counted from the first read, so a response that is never sent does not hold a slot
+        with self._cond:
+            self.clients += 1
+        try:
+            yield RETRY
+            while True:
+                with self._cond:
+                    if position == self.seq:
+                        self._cond.wait(self.heartbeat_seconds)
+                    if position < self._first_seq:
+                        # Missed more than the backlog holds: the page reloads the forum list instead
+                        pending = [format_event('reset', {}, event_id(self.marks))]
+                        position = self.seq
+                    else:
+                        pending = [text for _, text in self._events[position - self._first_seq:]]
+                        position = self.seq
+                if not pending:
+                    yield HEARTBEAT
+                    continue
+                yield ''.join(pending)
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+    def stats(self):
+        """Return hub counters"""
+        return {
+            'clients': self.clients,
+            'max_clients': self.max_clients,
+            'published': self.published,
+            'backlog': len(self._events),
+            'polls': self.polls,
+            'rejected': self.rejected,
+            'marks': event_id(self.marks) if self.marks else None,
+        }
+
+
+hub = ForumEvents()
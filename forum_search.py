@@ -0,0 +1,173 @@
+"""
+Full-text search over the doubt forum for the User Portal System
+An FTS5 index holds one document per query (brief, tags and the text of all its answers), kept current
+by triggers on queries and answers (defined in migrations.py), so searches are BM25-ranked index lookups
+instead of LIKE scans
+
+Usage: python forum_search.py --check | --rebuild
+"""
+
+import argparse
+import html
+import os
+import re
+import sys
+
+from database import DATABASE_NAME, get_db
+from migrations import FORUM_SEARCH_REBUILD, FORUM_SEARCH_TABLE, FORUM_SEARCH_TRIGGERS, migrate
+import forum_tags
+
+# Configuration
+SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', '20'))
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get('SEARCH_MAX_PAGE_SIZE', '50'))
+SEARCH_MAX_OFFSET = int(os.environ.get('SEARCH_MAX_OFFSET', '1000'))
+SEARCH_MAX_TERMS = 8
+
+# BM25 column weights (brief, answers, tags): a hit in the question counts most, then its tags, then the answers
+WEIGHTS = (10.0, 1.0, 5.0)
+SNIPPET_TOKENS = 16
+MARK_START, MARK_END = '\x02', '\x03'
+
+# Every match is scored and sorted, so old but relevant posts still rank; snippets are built afterwards for
+# the page only, re-matching its rows by rowid. Snippets come from the brief or the answers, never the tag list
+SEARCH_QUERY = f'''
+    SELECT q.id, q.brief, q.created_at, hits.rank,
+           snippet(forum_search, 0, char(2), char(3), '…', {SNIPPET_TOKENS}) AS brief_snippet,
+           snippet(forum_search, 1, char(2), char(3), '…', {SNIPPET_TOKENS}) AS answers_snippet
+    FROM (
+        SELECT rowid AS id, bm25(forum_search, {', '.join(map(str, WEIGHTS))}) AS rank
+        FROM forum_search
+        WHERE forum_search MATCH :match {{tag_filter}}
+        ORDER BY rank, rowid DESC
+        LIMIT :limit OFFSET :offset
+    ) hits
+    JOIN forum_search ON forum_search.rowid = hits.id AND forum_search MATCH :match
+    JOIN queries q ON q.id = hits.id
+    ORDER BY hits.rank, q.id DESC
+'''
+# The index narrows matches to the tag's words; the query_tags lookup drops e.g. "organic chemistry" for "chemistry"
+TAG_FILTER = 'AND EXISTS (SELECT 1 FROM query_tags WHERE query_id = forum_search.rowid AND tag_id = :tag_id)'
+
+
+def match_expression(text, tag=None):
+    """
+    FTS5 MATCH expression for free text: every word must appear (the last one as a prefix, for
+    search-as-you-type). Words are quoted, so FTS5 operators and stray punctuation in the input
+    cannot cause syntax errors. A tag restricts matches to its words in the tags column. Returns None
+    when there are no words.
+    """
+    words = re.findall(r'\w+', text or '')[:SEARCH_MAX_TERMS]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    tag_words = re.findall(r'\w+', tag or '')
+    if tag_words:
+        terms.append('tags : "{}"'.format(' '.join(tag_words)))
+    return ' '.join(terms)
+
+
+def best_snippet(brief_snippet, answers_snippet):
+    """The brief's snippet when the match is in the question, else the answers' (a tag-only match shows the brief)"""
+    if MARK_START not in (brief_snippet or '') and MARK_START in (answers_snippet or ''):
+        return answers_snippet
+    return brief_snippet
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and turn its match markers into <mark> elements"""
+    return html.escape(snippet or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search(conn, text, tag=None, limit=SEARCH_PAGE_SIZE, offset=0):
+    """Return the queries matching text (optionally only those tagged tag), best first"""
+    tag = (tag or '').strip().lstrip('#')
+    match = match_expression(text, tag)
+    if match is None:
+        return []
+    params = {'match': match, 'limit': limit, 'offset': offset}
+    if tag:
+        params['tag_id'] = forum_tags.tag_id(conn, tag)
+        if params['tag_id'] is None:
+            return []
+    rows = conn.execute(SEARCH_QUERY.format(tag_filter=TAG_FILTER if tag else ''), params).fetchall()
+    tags = forum_tags.tags_for(conn, [row[0] for row in rows])
+    return [{
+        'id': query_id,
+        'tags': tags.get(query_id, []),
+        'brief': brief,
+        'created_at': created_at,
+        'score': round(-rank, 3),   # bm25() is lower-is-better
+        'snippet_html': highlight(best_snippet(brief_snippet, answers_snippet)),
+    } for query_id, brief, created_at, rank, brief_snippet, answers_snippet in rows]
+
+
+def trigger_names():
+    return [f"{table}_search_{event}" for table in ('queries', 'answers') for event in ('insert', 'update', 'delete')]
+
+
+def rebuild(conn):
+    """Re-index every query from scratch; returns the number of documents"""
+    for statement in FORUM_SEARCH_REBUILD:
+        conn.execute(statement)
+    return conn.execute('SELECT COUNT(*) FROM forum_search').fetchone()[0]
+
+
+def install(conn):
+    """Create the search index and its triggers (as migrations.py defines them), then index the existing forum"""
+    for statement in [FORUM_SEARCH_TABLE, *FORUM_SEARCH_TRIGGERS]:
+        conn.execute(statement)
+    return rebuild(conn)
+
+
+def check(conn):
+    """Return a list of problems with the index (empty when it matches the forum)"""
+    problems = []
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    missing = [name for name in trigger_names() if name not in present]
+    if missing:
+        problems.append(f"Missing triggers: {', '.join(missing)}")
+    unindexed = conn.execute(
+        'SELECT COUNT(*) FROM queries WHERE id NOT IN (SELECT rowid FROM forum_search)').fetchone()[0]
+    orphaned = conn.execute(
+        'SELECT COUNT(*) FROM forum_search WHERE rowid NOT IN (SELECT id FROM queries)').fetchone()[0]
+    if unindexed:
+        problems.append(f"{unindexed} queries are not indexed")
+    if orphaned:
+        problems.append(f"{orphaned} indexed documents have no query")
+    try:
+        conn.execute("INSERT INTO forum_search (forum_search) VALUES ('integrity-check')")
+    except Exception as e:
+        problems.append(f"FTS5 integrity check failed: {e}")
+    return problems
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Maintain the forum full-text search index')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--check', action='store_true', help='compare the index with the forum tables')
+    action.add_argument('--rebuild', action='store_true', help='re-index every query from scratch')
+    args = parser.parse_args()
+
+    print(f"💾 Database: {DATABASE_NAME}")
+    with get_db() as conn:
+        migrate(conn)
+        if args.rebuild:
+            conn.execute('BEGIN')
+            count = install(conn)
+            conn.commit()
+            print(f"✅ Rebuilt forum_search: {count:,} queries indexed")
+            return
+        problems = check(conn)
+        if not problems:
+            print("✅ forum_search matches queries and answers")
+            return
+        for problem in problems:
+            print(f"❌ {problem}")
+        print("💡 Run: python forum_search.py --rebuild")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Normalized special mentions (tags) for the doubt forum
+Each distinct tag is one row of tags and each use of it one row of query_tags, so a page of one tag's
+queries is an index range scan and per-tag counts are kept by triggers instead of parsing the JSON
+special_mentions column of every query
+"""
+
+import os
+
+from migrations import tag_names
+
+# Configuration
+TAGS_PAGE_SIZE = int(os.environ.get('TAGS_PAGE_SIZE', '50'))
+TAGS_MAX_PAGE_SIZE = int(os.environ.get('TAGS_MAX_PAGE_SIZE', '500'))
+
+# The tags and query_tags tables and the triggers keeping tags.query_count are defined in migrations.py
+INSERT_TAG = 'INSERT OR IGNORE INTO tags (key, name) VALUES (?, ?)'
+INSERT_QUERY_TAG = '''
+    INSERT OR IGNORE INTO query_tags (query_id, tag_id, position, created_at)
+    SELECT q.id, t.id, ?, q.created_at FROM queries q, tags t
+    WHERE q.id = ? AND t.key = ?
+'''
+TAG_ID_QUERY = 'SELECT id FROM tags WHERE key = ?'
+# Tags of the queries on one page, in the order they were given
+PAGE_TAGS_QUERY = '''
+    SELECT qt.query_id, t.name FROM query_tags qt
+    JOIN tags t ON t.id = qt.tag_id
+    WHERE qt.query_id IN ({placeholders})
+    ORDER BY qt.query_id, qt.position
+'''
+TOP_TAGS_QUERY = '''
+    SELECT name, query_count FROM tags
+    WHERE query_count > 0
+    ORDER BY query_count DESC, key
+    LIMIT :limit
+'''
+
+
+def tag_key(name):
+    return name.lower()
+
+
+def normalize(special_mentions):
+    """
+    Clean a submitted list of special mentions: strip whitespace and a leading '#', drop empty and
+    duplicate (case-insensitive) entries and cap the count and length, exactly as the backfill migration
+    did for existing queries. Raises ValueError if it is not a list.
+    """
+    if special_mentions is None:
+        return []
+    if not isinstance(special_mentions, list):
+        raise ValueError('special_mentions must be a list')
+    return tag_names(special_mentions)
+
+
+def save(conn, query_id, names):
+    """Attach already normalized tag names to a new query, creating the tags that do not exist yet"""
+    conn.executemany(INSERT_TAG, ((tag_key(name), name) for name in names))
+    conn.executemany(INSERT_QUERY_TAG, ((position, query_id, tag_key(name)) for position, name in enumerate(names)))
+
+
+def tag_id(conn, name):
+    """Return the id of the tag called name (any case, with or without '#'), or None"""
+    names = normalize([name])
+    if not names:
+        return None
+    row = conn.execute(TAG_ID_QUERY, (tag_key(names[0]),)).fetchone()
+    return row[0] if row else None
+
+
+def tags_for(conn, query_ids):
+    """Return {query_id: ['#tag', ...]} for the given queries"""
+    tags = {}
+    if query_ids:
+        sql = PAGE_TAGS_QUERY.format(placeholders=','.join('?' * len(query_ids)))
+        for query_id, name in conn.execute(sql, list(query_ids)):
+            tags.setdefault(query_id, []).append('#' + name)
+    return tags
+
+
+def top_tags(conn, limit=TAGS_PAGE_SIZE):
+    """Most used tags first, with the number of queries carrying each"""
+    return [{'name': name, 'count': count} for name, count in conn.execute(TOP_TAGS_QUERY, {'limit': limit})]
@@ -0,0 +1,202 @@
+"""
+Group commit for doubt forum submissions
+Routes hand their inserts to one writer thread through a bounded queue and wait for the commit; the
+writer drains whatever has queued up and commits it as one transaction, so a burst of submissions pays
+for one fsync and one round of write-lock contention per batch instead of per row
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, TimeoutError as AckTimeout
+from datetime import datetime, timezone
+
+import database
+import forum_events
+import forum_tags
+
+# Configuration
+FORUM_WRITER_QUEUE = int(os.environ.get('FORUM_WRITER_QUEUE', '1000'))
+FORUM_WRITER_BATCH = int(os.environ.get('FORUM_WRITER_BATCH', '256'))
+FORUM_WRITER_WAIT = float(os.environ.get('FORUM_WRITER_WAIT', '2'))          # seconds to wait for a queue slot
+FORUM_WRITER_ACK_TIMEOUT = float(os.environ.get('FORUM_WRITER_ACK_TIMEOUT', '10'))
+# FULL syncs the WAL on every commit, so a submission is acknowledged only once it is on disk
+FORUM_WRITER_SYNCHRONOUS = os.environ.get('FORUM_WRITER_SYNCHRONOUS', 'FULL')
+
+
+class WriterBusyError(Exception):
+    """Too many submissions are already waiting to be written"""
+
+
+class SubmissionPendingError(Exception):
+    """The submission's batch was still committing when its caller stopped waiting; it will be saved"""
+
+
+def timestamp():
+    """Current UTC time formatted like SQLite's CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def insert_query(conn, brief, special_mentions_json, tags, created_at):
+    cursor = conn.execute('INSERT INTO queries (special_mentions, brief, created_at) VALUES (?, ?, ?)',
+                          (special_mentions_json, brief, created_at))
+    forum_tags.save(conn, cursor.lastrowid, tags)
+    return cursor.lastrowid
+
+
+def insert_answer(conn, query_id, answer_text, created_at):
+    cursor = conn.execute('INSERT INTO answers (query_id, answer_text, created_at) VALUES (?, ?, ?)',
+                          (query_id, answer_text, created_at))
+    return cursor.lastrowid
+
+
+class GroupCommitWriter:
+    """Single writer thread per process committing queued inserts in batches"""
+
+    def __init__(self, queue_size=FORUM_WRITER_QUEUE, batch_size=FORUM_WRITER_BATCH, wait=FORUM_WRITER_WAIT,
+                 synchronous=FORUM_WRITER_SYNCHRONOUS):
+        self.batch_size = batch_size
+        self.wait = wait
+        self.synchronous = synchronous
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._pid = None
+        self.writes = 0
+        self.failures = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.rejected = 0
+        self.expired = 0
+        self.pending = 0
+
+    def _start(self):
+        """Start the writer once per process (a forked worker does not inherit the parent's thread)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='forum-writer', daemon=True).start()
+
+    def _connect(self):
+        # Autocommit mode: transactions are the explicit BEGIN/COMMIT around each batch
+        conn = sqlite3.connect(database.DATABASE_NAME, timeout=5.0, isolation_level=None)
+        for pragma in database.CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        return conn
+
+    def submit(self, func, *args):
+        """Queue func(conn, *args) for the next batch; returns a Future resolved once the batch is committed"""
+        self._start()
+        future = Future()
+        try:
+            self._queue.put((func, args, future), timeout=self.wait)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise WriterBusyError('Too many submissions are being saved, please retry')
+        return future
+
+    def write(self, func, *args, timeout=FORUM_WRITER_ACK_TIMEOUT):
+        """
+        Run func(conn, *args) in the next batch and return its result once committed. On timeout a
+        submission still in the queue is withdrawn, so the caller can safely retry (WriterBusyError); one
+        whose batch is already committing cannot be, and raises SubmissionPendingError instead.
+        """
+        future = self.submit(func, *args)
+        try:
+            return future.result(timeout)
+        except AckTimeout:
+            if future.cancel():
+                with self._lock:
+                    self.expired += 1
+                raise WriterBusyError('Saving took too long and was abandoned, please retry')
+            with self._lock:
+                self.pending += 1
+            raise SubmissionPendingError('Submission received and is still being saved')
+
+    def add_query(self, brief, special_mentions_json, tags):
+        """Insert a query with its tags; returns (id, created_at)"""
+        created_at = timestamp()
+        return self.write(insert_query, brief, special_mentions_json, tags, created_at), created_at
+
+    def add_answer(self, query_id, answer_text):
+        """Insert an answer; returns (id, created_at)"""
+        created_at = timestamp()
+        return self.write(insert_answer, query_id, answer_text, created_at), created_at
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            # Everything that queued up while the previous batch was committing joins this one
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Submissions whose callers gave up are dropped; the rest can no longer be cancelled
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._commit(conn, batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit(self, conn, batch):
+        """Apply a batch in one transaction; a failing item is rolled back alone and only its caller sees the error"""
+        conn.execute('BEGIN IMMEDIATE')
+        applied = []
+        try:
+            for func, args, future in batch:
+                conn.execute('SAVEPOINT item')
+                try:
+                    result = func(conn, *args)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO item')
+                    conn.execute('RELEASE item')
+                    future.set_exception(e)
+                    continue
+                conn.execute('RELEASE item')
+                applied.append((future, result))
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        for future, result in applied:
+            future.set_result(result)
+        with self._lock:
+            self.batches += 1
+            self.writes += len(applied)
+            self.failures += len(batch) - len(applied)
+            self.largest_batch = max(self.largest_batch, len(batch))
+        if applied:
+            forum_events.hub.notify()
+
+    def stats(self):
+        """Return writer counters"""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'writes': self.writes,
+                'failures': self.failures,
+                'batches': self.batches,
+                'average_batch': round(self.writes / self.batches, 2) if self.batches else None,
+                'largest_batch': self.largest_batch,
+                'rejected': self.rejected,
+                'expired': self.expired,
+                'pending': self.pending,
+                'synchronous': self.synchronous,
+            }
+
+
+writer = GroupCommitWriter()
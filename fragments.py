@@ -0,0 +1,120 @@
+"""
+Dashboard panel fragments for the User Portal System
+Each panel is rendered from its own partial template and cached by the version of the data it shows,
+so unchanged panels are not re-rendered and can be fetched on their own after the page shell
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import render_template
+from markupsafe import Markup
+
+from cache import create_cache
+
+# Configuration
+FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') != '0'
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '4096'))
+FRAGMENT_CACHE_TTL = float(os.environ.get('FRAGMENT_CACHE_TTL', '3600'))
+DASHBOARD_LAZY_PANELS = os.environ.get('DASHBOARD_LAZY_PANELS', '0') == '1'
+
+# panel -> (partial template, dashboard context keys it renders)
+PANELS = {
+    'overview': ('panels/overview.html', ('attendance', 'notes')),
+    'timetable': ('panels/timetable.html', ('timetable',)),
+    'test_scores': ('panels/test_scores.html', ('test_scores',)),
+    'notice_board': ('panels/notice_board.html', ('notice_board',)),
+    'poll': ('panels/poll.html', ('poll_data', 'poll_participants')),
+    'upcoming_tasks': ('panels/upcoming_tasks.html', ('upcoming_tasks',)),
+}
+
+
+def _template_digests():
+    """Digest of each partial template, so edited templates get new versions too"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+    digests = {}
+    for name, (template, _) in PANELS.items():
+        with open(os.path.join(folder, template), 'rb') as f:
+            digests[name] = hashlib.sha1(f.read()).hexdigest()
+    return digests
+
+
+TEMPLATE_DIGESTS = _template_digests()
+
+
+def panel_versions(context):
+    """Return {panel: digest of its template and the data it renders}"""
+    versions = {}
+    for name, (_, keys) in PANELS.items():
+        data = json.dumps([context[key] for key in keys], sort_keys=True, default=str)
+        versions[name] = hashlib.sha1((TEMPLATE_DIGESTS[name] + data).encode()).hexdigest()[:16]
+    return versions
+
+
+class PanelRenderer:
+    """Renders dashboard panels through a fragment cache and records per-panel render times"""
+
+    def __init__(self, enabled=FRAGMENT_CACHE_ENABLED, max_entries=FRAGMENT_CACHE_SIZE, ttl=FRAGMENT_CACHE_TTL):
+        self.enabled = enabled
+        self.cache = create_cache('local', max_entries, ttl)
+        self._lock = threading.Lock()
+        self.timings = {name: {'renders': 0, 'cached': 0, 'total_ms': 0.0, 'max_ms': 0.0} for name in PANELS}
+
+    def _record(self, name, elapsed_ms=None):
+        with self._lock:
+            timing = self.timings[name]
+            if elapsed_ms is None:
+                timing['cached'] += 1
+                return
+            timing['renders'] += 1
+            timing['total_ms'] += elapsed_ms
+            timing['max_ms'] = max(timing['max_ms'], elapsed_ms)
+
+    def render(self, name, context):
+        """Return (html, milliseconds spent rendering) for one panel"""
+        version = context['panel_versions'][name]
+        key = f"{name}:{version}"
+        if self.enabled:
+            html = self.cache.get(key)
+            if html is not None:
+                self._record(name)
+                return html, 0.0
+
+        template, keys = PANELS[name]
+        start = time.perf_counter()
+        html = Markup(render_template(template, **{k: context[k] for k in keys}))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._record(name, elapsed_ms)
+        if self.enabled:
+            self.cache.set(key, html)
+        return html, elapsed_ms
+
+    def render_all(self, context):
+        """Return ({panel: html}, {panel: milliseconds}) for every panel"""
+        panels, timings = {}, {}
+        for name in PANELS:
+            panels[name], timings[name] = self.render(name, context)
+        return panels, timings
+
+    @staticmethod
+    def placeholders():
+        """Empty containers the page shell fills in from /dashboard/panels/<name>"""
+        return {name: Markup(f'<div class="lazy-panel" data-panel="{name}"></div>') for name in PANELS}
+
+    def stats(self):
+        """Return fragment cache counters and per-panel render times"""
+        with self._lock:
+            panels = {
+                name: {**timing,
+                       'total_ms': round(timing['total_ms'], 3),
+                       'max_ms': round(timing['max_ms'], 3),
+                       'mean_ms': round(timing['total_ms'] / timing['renders'], 3) if timing['renders'] else None}
+                for name, timing in self.timings.items()
+            }
+        return {'enabled': self.enabled, 'cache': self.cache.stats(), 'panels': panels}
+
+
+panel_renderer = PanelRenderer()
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for the User Portal System
+    gunicorn app:app
+Threaded workers let slow requests (streamed Doubt Solver answers) wait on
+upstream I/O without tying up a whole worker process.
+Every dashboard also keeps /api/forum/events open, which holds one of those
+threads for as long as the page is open, so under gthread each worker streams
+to at most PORTAL_THREADS // 2 dashboards (WEB_CONCURRENCY * 8 with the
+defaults) and keeps the other half of its threads for normal requests. Past
+that limit /api/forum/events answers 503 with Retry-After and the dashboard
+tries again 30 seconds later (posts made meanwhile show on the next reload).
+For many concurrent dashboards run
+    PORTAL_WORKER_CLASS=gevent gunicorn app:app
+so each idle stream is a greenlet instead of a thread and the limit becomes
+PORTAL_WORKER_CONNECTIONS - 100 per worker. FORUM_EVENTS_MAX_CLIENTS set in the
+environment overrides either default.
+"""
+
+import os
+
+bind = os.environ.get('PORTAL_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = os.environ.get('PORTAL_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('PORTAL_THREADS', '16'))
+worker_connections = int(os.environ.get('PORTAL_WORKER_CONNECTIONS', '2000'))
+
+# Live forum streams per worker, sized from the settings above (see the module docstring)
+if worker_class == 'gevent':
+    os.environ.setdefault('FORUM_EVENTS_MAX_CLIENTS', str(worker_connections - 100))
+else:
+    os.environ.setdefault('FORUM_EVENTS_MAX_CLIENTS', str(max(threads // 2, 1)))
+
+# Streamed answers can legitimately stay open longer than a normal request
+timeout = int(os.environ.get('PORTAL_WORKER_TIMEOUT', '120'))
+keepalive = 5
@@ -0,0 +1,353 @@
+"""
+LLM access for the Doubt Solver
+One shared OpenAI client per process with a persistent connection pool, single-flight
+coalescing of identical in-flight questions, per-tenant rate limiting, retries with
+exponential backoff and upstream latency histograms
+"""
+
+import bisect
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+try:
+    import httpx
+except ImportError:  # some openai releases ship their own HTTP stack; fall back to its defaults
+    httpx = None
+
+# Configuration
+OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-3.5-turbo')
+OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')  # e.g. http://127.0.0.1:8001/v1 for llm_stub.py
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', '30'))            # total seconds per answer
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', '2'))  # wait for a free slot
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+LLM_BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', '0.5'))
+LLM_RATE_PER_MINUTE = float(os.environ.get('LLM_RATE_PER_MINUTE', '20'))  # per tenant
+LLM_RATE_BURST = int(os.environ.get('LLM_RATE_BURST', '5'))
+LLM_POOL_CONNECTIONS = int(os.environ.get('LLM_POOL_CONNECTIONS', str(LLM_MAX_CONCURRENCY * 2)))
+
+SYSTEM_PROMPT = "You are a helpful educational assistant. Answer student doubts in a very precise and short manner."
+
+# Errors worth retrying: network failures, timeouts, upstream 429/5xx
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class LLMError(Exception):
+    """Base class for doubt solver failures"""
+
+
+class LLMBusyError(LLMError):
+    """All concurrency slots are taken"""
+
+
+class LLMTimeoutError(LLMError):
+    """The answer did not finish within LLM_TIMEOUT"""
+
+
+class LLMConfigError(LLMError):
+    """No API key configured"""
+
+
+class LLMRateLimitError(LLMError):
+    """The tenant asked too many questions too quickly"""
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+
+    def percentile(self, fraction):
+        """Upper bucket bound containing the given fraction of observations"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.BUCKETS_MS + (float('inf'),), self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        labels = [f"le_{bound}ms" for bound in self.BUCKETS_MS] + ['le_inf']
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class RateLimiter:
+    """Token bucket per tenant"""
+
+    def __init__(self, rate_per_minute=LLM_RATE_PER_MINUTE, burst=LLM_RATE_BURST, max_tenants=10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_tenants = max_tenants
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, tenant):
+        """Take one token for tenant; False when the bucket is empty"""
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(tenant, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self._buckets) >= self.max_tenants and tenant not in self._buckets:
+                # Forget full (idle) buckets first; they behave the same as new ones
+                self._buckets = {k: v for k, v in self._buckets.items() if v[0] < self.burst}
+            self._buckets[tenant] = (tokens, now)
+        return allowed
+
+
+class Flight:
+    """One upstream call whose tokens are shared by every request asking the same question"""
+
+    def __init__(self, key):
+        self.key = key
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def push(self, token):
+        with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def iter_tokens(self, timeout=LLM_TIMEOUT):
+        """Yield tokens as they arrive (from the start), raising the upstream error if any"""
+        deadline = time.monotonic() + timeout
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.tokens) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LLMTimeoutError('The doubt solver took too long to answer')
+                    self._cond.wait(remaining)
+                pending = self.tokens[index:]
+                finished = self.done
+                error = self.error
+            for token in pending:
+                yield token
+            index += len(pending)
+            if finished and index >= len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
+    def result(self, timeout=LLM_TIMEOUT):
+        """Block until the answer is complete and return it"""
+        return ''.join(self.iter_tokens(timeout)).strip()
+
+
+class LLMClient:
+    """Process-wide Doubt Solver client"""
+
+    def __init__(self, model=OPENAI_MODEL, base_url=OPENAI_BASE_URL, timeout=LLM_TIMEOUT,
+                 max_concurrency=LLM_MAX_CONCURRENCY, queue_timeout=LLM_QUEUE_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE, rate_limiter=None):
+        self.model = model
+        self.base_url = base_url
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._openai = {}
+        self._openai_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self.counters = {'requests': 0, 'upstream_calls': 0, 'coalesced': 0, 'retries': 0,
+                         'failures': 0, 'rate_limited': 0, 'busy': 0}
+        self.latency = LatencyHistogram()
+        self.first_token_latency = LatencyHistogram()
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def _get_openai(self):
+        """Return the OpenAI client for the configured key, created once with a pooled HTTP client"""
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            raise LLMConfigError('OpenAI API key not set in environment')
+        with self._openai_lock:
+            client = self._openai.get(api_key)
+            if client is None:
+                http_client = None
+                if httpx is not None:
+                    http_client = openai.DefaultHttpxClient(
+                        limits=httpx.Limits(max_connections=LLM_POOL_CONNECTIONS,
+                                            max_keepalive_connections=LLM_POOL_CONNECTIONS,
+                                            keepalive_expiry=60),
+                        timeout=self.timeout,
+                    )
+                client = openai.OpenAI(api_key=api_key, base_url=self.base_url, timeout=self.timeout,
+                                       max_retries=0, http_client=http_client)
+                self._openai[api_key] = client
+        return client
+
+    def reset(self, base_url=None):
+        """Drop cached OpenAI clients (e.g. after changing the base URL)"""
+        with self._openai_lock:
+            for client in self._openai.values():
+                client.close()
+            self._openai.clear()
+            if base_url is not None:
+                self.base_url = base_url
+
+    @staticmethod
+    def flight_key(message):
+        return ' '.join(message.lower().split())
+
+    def submit(self, message, tenant=None, on_complete=None):
+        """
+        Start (or join) the upstream call for message.
+        Returns (flight, leader); leader is False when an identical question was already in flight.
+        on_complete(answer) runs once in the worker when a new call succeeds.
+        """
+        self._count('requests')
+        if tenant is not None and not self.rate_limiter.allow(tenant):
+            self._count('rate_limited')
+            raise LLMRateLimitError('Too many questions - please wait a moment and try again')
+
+        key = self.flight_key(message)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._count('coalesced')
+                return flight, False
+
+        self._get_openai()  # fail fast on missing configuration
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count('busy')
+            raise LLMBusyError('Doubt solver is busy, please try again shortly')
+
+        with self._flights_lock:
+            # Another request may have started the same question while we waited for a slot
+            existing = self._flights.get(key)
+            if existing is not None:
+                self._slots.release()
+                self._count('coalesced')
+                return existing, False
+            flight = Flight(key)
+            self._flights[key] = flight
+
+        self._executor.submit(self._run, flight, message, on_complete)
+        return flight, True
+
+    def _run(self, flight, message, on_complete=None):
+        """Worker: call upstream with retries, publishing tokens into the flight"""
+        start = time.monotonic()
+        error = None
+        try:
+            attempt = 0
+            while True:
+                try:
+                    self._stream_upstream(flight, message, start)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    # Only retry before anything reached the clients
+                    delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+                    if flight.tokens or attempt >= self.max_retries or time.monotonic() + delay - start > self.timeout:
+                        if isinstance(e, openai.APITimeoutError):
+                            raise LLMTimeoutError('The doubt solver took too long to answer') from e
+                        raise
+                    attempt += 1
+                    self._count('retries')
+                    time.sleep(delay)
+            if on_complete is not None:
+                # Before the flight closes, so a follow-up request finds the stored answer
+                try:
+                    on_complete(''.join(flight.tokens).strip())
+                except Exception:
+                    pass
+        except Exception as e:
+            self._count('failures')
+            error = e if isinstance(e, LLMError) else LLMError('Failed to get response from LLM')
+        finally:
+            self.latency.observe(time.monotonic() - start)
+            with self._flights_lock:
+                self._flights.pop(flight.key, None)
+            self._slots.release()
+            flight.finish(error)
+
+    def _stream_upstream(self, flight, message, start):
+        self._count('upstream_calls')
+        response = self._get_openai().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": message}
+            ],
+            max_tokens=512,
+            temperature=0.7,
+            stream=True
+        )
+        with response:
+            for chunk in response:
+                if time.monotonic() - start > self.timeout:
+                    raise LLMTimeoutError('The doubt solver took too long to answer')
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if not flight.tokens:
+                        self.first_token_latency.observe(time.monotonic() - start)
+                    flight.push(delta)
+
+    def stats(self):
+        """Return counters and latency histograms"""
+        with self._counter_lock:
+            counters = dict(self.counters)
+        with self._flights_lock:
+            counters['in_flight'] = len(self._flights)
+        return {
+            **counters,
+            'upstream_latency': self.latency.snapshot(),
+            'first_token_latency': self.first_token_latency.snapshot(),
+        }
+
+
+def is_configured():
+    return bool(os.environ.get('OPENAI_API_KEY'))
+
+
+client = LLMClient()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API
+Lets the Doubt Solver run offline:
+    python llm_stub.py --port 8001
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub python app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    """Behaviour knobs and counters shared by all stub requests"""
+
+    def __init__(self, latency=0.2, token_delay=0.01):
+        self.latency = latency          # seconds before the first token
+        self.token_delay = token_delay  # seconds between streamed tokens
+        self.calls = 0
+        self.fail_next = 0              # answer this many calls with 503 (exercises client retries)
+        self.lock = threading.Lock()
+
+    def count_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def take_failure(self):
+        """Return True if this call should fail"""
+        with self.lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+            return False
+
+
+def stub_answer(question):
+    """Deterministic canned answer for a question"""
+    return f"Stub answer: {question.strip()} - explained briefly for revision."
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Handles POST /v1/chat/completions (streaming and non-streaming)"""
+
+    protocol_version = 'HTTP/1.1'
+    state = StubState()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        question = next((m['content'] for m in reversed(payload.get('messages', [])) if m.get('role') == 'user'), '')
+        model = payload.get('model', 'stub')
+        answer = stub_answer(question)
+
+        self.state.count_call()
+        time.sleep(self.state.latency)
+        if self.state.take_failure():
+            self._send_json(503, {'error': {'message': 'stub overloaded', 'type': 'server_error'}})
+            return
+
+        if not payload.get('stream'):
+            # Generation time is the same whether or not the tokens are streamed
+            time.sleep(self.state.token_delay * len(answer.split(' ')))
+            self._send_json(200, {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': len(question.split()), 'completion_tokens': len(answer.split()),
+                          'total_tokens': len(question.split()) + len(answer.split())},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def send_chunk(delta, finish_reason=None):
+            chunk = {
+                'id': 'chatcmpl-stub',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send_chunk({'role': 'assistant', 'content': ''})
+        for i, word in enumerate(answer.split(' ')):
+            send_chunk({'content': word if i == 0 else ' ' + word})
+            time.sleep(self.state.token_delay)
+        send_chunk({}, 'stop')
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_stub_server(port=0, latency=0.2, token_delay=0.01):
+    """Start the stub in a background thread; returns (server, base_url)"""
+    StubHandler.state = StubState(latency, token_delay)
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Local OpenAI chat completions stub')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.01, help='seconds between streamed tokens')
+    args = parser.parse_args()
+
+    StubHandler.state = StubState(args.latency, args.token_delay)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StubHandler)
+    print(f"🤖 OpenAI stub listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stub stopped.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""
+Login protection for the User Portal System
+Sliding-window limits on failed sign-ins per IP and per email, plus a Bloom filter of registered
+emails so attempts against unknown accounts are rejected without querying the users table
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import database
+
+# Configuration
+LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', '50'))
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.environ.get('LOGIN_MAX_FAILURES_PER_EMAIL', '10'))
+LOGIN_FAILURE_WINDOW = float(os.environ.get('LOGIN_FAILURE_WINDOW', '300'))   # seconds
+LOGIN_TRACKED_KEYS = int(os.environ.get('LOGIN_TRACKED_KEYS', '100000'))
+EMAIL_FILTER_ENABLED = os.environ.get('EMAIL_FILTER_ENABLED', '1') != '0'
+EMAIL_FILTER_CAPACITY = int(os.environ.get('EMAIL_FILTER_CAPACITY', '100000'))
+EMAIL_FILTER_ERROR_RATE = float(os.environ.get('EMAIL_FILTER_ERROR_RATE', '0.01'))
+# How often one sign-in checks the users table for accounts registered by other worker processes; such an
+# account can be refused as unknown for up to this many seconds
+EMAIL_FILTER_REFRESH_SECONDS = float(os.environ.get('EMAIL_FILTER_REFRESH_SECONDS', '5'))
+
+
+class SlidingWindowLimiter:
+    """Counts events per key over the last `window` seconds"""
+
+    def __init__(self, limit, window=LOGIN_FAILURE_WINDOW, max_keys=LOGIN_TRACKED_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, events, now):
+        cutoff = now - self.window
+        while events and events[0] <= cutoff:
+            events.popleft()
+
+    def blocked(self, key):
+        """True if key already reached the limit within the window"""
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                return False
+            self._prune(events, now)
+            if not events:
+                del self._events[key]
+                return False
+            return len(events) >= self.limit
+
+    def record(self, key):
+        """Record one event for key"""
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                if len(self._events) >= self.max_keys:
+                    self._evict(now)
+                events = self._events[key] = deque(maxlen=self.limit)
+            self._prune(events, now)
+            events.append(now)
+
+    def _evict(self, now):
+        """Drop expired keys, then the oldest half if still full"""
+        for key in [k for k, events in self._events.items() if not events or events[-1] <= now - self.window]:
+            del self._events[key]
+        if len(self._events) >= self.max_keys:
+            by_age = sorted(self._events, key=lambda k: self._events[k][-1])
+            for key in by_age[:len(by_age) // 2]:
+                del self._events[key]
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+    def __len__(self):
+        return len(self._events)
+
+
+class BloomFilter:
+    """Bit-array Bloom filter sized for capacity items at the given false-positive rate"""
+
+    def __init__(self, capacity, error_rate=EMAIL_FILTER_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def error_rate(self):
+        """Expected false-positive rate at the current fill"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class EmailFilter:
+    """
+    Bloom filter of registered emails, built from the users table.
+    A negative answer is definitive; a positive one still needs the database.
+    Lookups read the current filter without locking or touching the database. Accounts registered by
+    other processes are picked up by one caller per refresh interval, with an incremental sync when
+    SQLite's data_version shows another connection committed; deletions only leave harmless stale
+    positives until the next rebuild.
+    """
+
+    def __init__(self, capacity=EMAIL_FILTER_CAPACITY, error_rate=EMAIL_FILTER_ERROR_RATE, enabled=EMAIL_FILTER_ENABLED,
+                 refresh_seconds=EMAIL_FILTER_REFRESH_SECONDS):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()          # guards changes to the filter and counters
+        self._sync_lock = threading.Lock()     # one sync at a time; owns the connection
+        self._conn = None
+        self._pid = None
+        self._filter = None
+        self._last_id = 0
+        self._data_version = None
+        self._checked_at = None
+        self.removed = 0
+        self.rebuilds = 0
+        self.syncs = 0
+
+    def _connection(self):
+        """Dedicated connection: data_version only reports commits made by other connections"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(database.DATABASE_NAME, timeout=5.0, check_same_thread=False)
+            self._conn.execute('PRAGMA busy_timeout=5000')
+            self._pid = os.getpid()
+            self._filter = None
+        return self._conn
+
+    def _rebuild(self, conn):
+        total = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        bloom = BloomFilter(max(self.capacity, total * 2), self.error_rate)
+        last_id = 0
+        for user_id, email in conn.execute('SELECT id, email_address FROM users'):
+            bloom.add(email)
+            last_id = max(last_id, user_id)
+        with self._lock:
+            self._filter = bloom
+            self._last_id = last_id
+            self.removed = 0
+            self.rebuilds += 1
+
+    def _due(self):
+        return (self._filter is None or self._pid != os.getpid()
+                or time.monotonic() - self._checked_at >= self.refresh_seconds)
+
+    def _sync(self):
+        """
+        Build on first use (callers wait). Afterwards one caller per refresh interval checks the users
+        table while the others keep using the current filter.
+        """
+        if not self._due():
+            return
+        if not self._sync_lock.acquire(blocking=self._filter is None):
+            return
+        try:
+            if self._due():
+                self._refresh(self._connection())
+        finally:
+            self._sync_lock.release()
+
+    def _refresh(self, conn):
+        """Bring the filter up to date with the users table (caller holds the sync lock)"""
+        self._checked_at = time.monotonic()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if self._filter is not None and version == self._data_version:
+            return
+        self._data_version = version
+        max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]
+        bloom = self._filter
+        if (bloom is None or max_id < self._last_id or self.removed > bloom.count // 10
+                or bloom.count > bloom.capacity):
+            # First use, a reset table, many deletions or an overfull filter
+            self._rebuild(conn)
+            return
+        rows = conn.execute('SELECT id, email_address FROM users WHERE id > ?', (self._last_id,)).fetchall()
+        with self._lock:
+            for user_id, email in rows:
+                bloom.add(email)
+                self._last_id = max(self._last_id, user_id)
+            self.syncs += 1
+
+    def might_exist(self, email):
+        """False only if no account has this email"""
+        if not self.enabled:
+            return True
+        try:
+            self._sync()
+        except sqlite3.Error:
+            # No users table yet or a locked database - let the normal lookup decide
+            return True
+        bloom = self._filter
+        return bloom is None or email in bloom
+
+    def add(self, email):
+        """Record a newly registered email"""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(email)
+
+    def remove(self, email):
+        """Note a deleted email (Bloom filters cannot forget; rebuild once enough are stale)"""
+        with self._lock:
+            self.removed += 1
+
+    def invalidate(self):
+        """Force a full rebuild on next use (e.g. after the database was reset)"""
+        with self._lock:
+            self._filter = None
+
+    def stats(self):
+        with self._lock:
+            bloom = self._filter
+            return {
+                'enabled': self.enabled,
+                'emails': bloom.count if bloom else 0,
+                'bytes': len(bloom.bits) if bloom else 0,
+                'hashes': bloom.hashes if bloom else 0,
+                'expected_false_positive_rate': round(bloom.error_rate(), 6) if bloom else None,
+                'stale_deletions': self.removed,
+                'rebuilds': self.rebuilds,
+                'syncs': self.syncs,
+                'refresh_seconds': self.refresh_seconds,
+            }
+
+
+class LoginGuard:
+    """Throttling and negative-lookup counters for /api/authenticate"""
+
+    def __init__(self):
+        self.by_ip = SlidingWindowLimiter(LOGIN_MAX_FAILURES_PER_IP)
+        self.by_email = SlidingWindowLimiter(LOGIN_MAX_FAILURES_PER_EMAIL)
+        self.emails = EmailFilter()
+        self._lock = threading.Lock()
+        self.counters = {'attempts': 0, 'throttled_ip': 0, 'throttled_email': 0,
+                         'short_circuited': 0, 'filter_false_positives': 0, 'failures': 0}
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def throttled(self, ip, email):
+        """Return 'ip' or 'email' if the attempt must be refused, else None"""
+        self.count('attempts')
+        if self.by_ip.blocked(ip):
+            self.count('throttled_ip')
+            return 'ip'
+        if self.by_email.blocked(email):
+            self.count('throttled_email')
+            return 'email'
+        return None
+
+    def failed(self, ip, email):
+        """Record a failed sign-in against both windows"""
+        self.count('failures')
+        self.by_ip.record(ip)
+        self.by_email.record(email)
+
+    def succeeded(self, email):
+        self.by_email.reset(email)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            'tracked_ips': len(self.by_ip),
+            'tracked_emails': len(self.by_email),
+            'window_seconds': self.by_ip.window,
+            'email_filter': self.emails.stats(),
+        }
+
+
+login_guard = LoginGuard()
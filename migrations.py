@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Schema migrations for the User Portal System
+Versioned, forward-only migrations tracked in the schema_version table
+"""
+
+import json
+import sys
+from datetime import datetime
+
+from database import DATABASE_NAME, get_db
+from passwords import hasher, is_hashed
+
+# Base schema (version 1) - the tables the portal has always used
+BASE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email_address TEXT UNIQUE NOT NULL,
+        phone_number TEXT NOT NULL,
+        password TEXT NOT NULL,
+        registration_date DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        attended INTEGER,
+        total INTEGER,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS notes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        note_type TEXT,
+        count INTEGER,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS subjects (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        subject_name TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS timetable (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        subject TEXT,
+        date TEXT,
+        time TEXT,
+        status TEXT,
+        duration TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS test_scores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        subject TEXT,
+        lesson TEXT,
+        score REAL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS notice_board (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        title TEXT,
+        image_url TEXT,
+        date TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS polls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        title TEXT,
+        professor TEXT,
+        end_time TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS poll_participants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        poll_id INTEGER,
+        participant_img TEXT,
+        FOREIGN KEY(poll_id) REFERENCES polls(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS upcoming_tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        code TEXT,
+        title TEXT,
+        time TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    # Subject-wise daily scores
+    '''
+    CREATE TABLE IF NOT EXISTS score_activity (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        subject TEXT,
+        date TEXT,
+        score INTEGER,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+    ''',
+    # Raise Query submissions
+    '''
+    CREATE TABLE IF NOT EXISTS queries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        special_mentions TEXT,
+        brief TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # Teacher answers/comments
+    '''
+    CREATE TABLE IF NOT EXISTS answers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        query_id INTEGER,
+        answer_text TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(query_id) REFERENCES queries(id)
+    )
+    ''',
+]
+
+# Indexes for the per-user dashboard panels and the forum. The attendance, notes, subjects and
+# score_activity ones hold every column their panel reads (covering); the rest only find a user's rows.
+PORTAL_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_attendance_user ON attendance (user_id, attended, total)',
+    'CREATE INDEX IF NOT EXISTS idx_notes_user ON notes (user_id, note_type, count)',
+    'CREATE INDEX IF NOT EXISTS idx_subjects_user ON subjects (user_id, subject_name)',
+    'CREATE INDEX IF NOT EXISTS idx_timetable_user_date ON timetable (user_id, date, time)',
+    'CREATE INDEX IF NOT EXISTS idx_test_scores_user ON test_scores (user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_notice_board_user ON notice_board (user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_polls_user ON polls (user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_poll_participants_poll ON poll_participants (poll_id)',
+    'CREATE INDEX IF NOT EXISTS idx_upcoming_tasks_user ON upcoming_tasks (user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_score_activity_user_subject_date ON score_activity (user_id, subject, date, score)',
+    'CREATE INDEX IF NOT EXISTS idx_queries_created_at ON queries (created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_answers_query ON answers (query_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_answers_created_at ON answers (created_at)',
+]
+
+# Doubt Solver answer cache (see doubt_cache.py)
+DOUBT_CACHE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS doubt_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question_key TEXT UNIQUE NOT NULL,
+        question TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        term_count INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_hit_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS doubt_cache_terms (
+        term TEXT NOT NULL,
+        entry_id INTEGER NOT NULL,
+        PRIMARY KEY (term, entry_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_doubt_cache_terms_entry ON doubt_cache_terms (entry_id)',
+    'CREATE INDEX IF NOT EXISTS idx_doubt_cache_created ON doubt_cache (created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_doubt_cache_last_hit ON doubt_cache (last_hit_at)',
+]
+
+# Entries indexed by single words would only ever match one-word questions once lookups use bigrams
+DOUBT_CACHE_RESET = [
+    'DELETE FROM doubt_cache_terms',
+    'DELETE FROM doubt_cache',
+]
+
+# Score summary (version 5) as first shipped; score_summary.py --rebuild recreates it from the current code
+_SUMMARY_UPSERT = '''
+    INSERT INTO score_summary (source, grain, user_id, subject, period, count, total, total_squares,
+                               min_score, max_score)
+    VALUES ('{source}', '{grain}', NEW.user_id, NEW.subject, {period}, 1, NEW.score, NEW.score * NEW.score,
+            NEW.score, NEW.score)
+    ON CONFLICT (source, grain, user_id, subject, period) DO UPDATE SET
+        count = count + 1,
+        total = total + excluded.total,
+        total_squares = total_squares + excluded.total_squares,
+        min_score = min(min_score, excluded.min_score),
+        max_score = max(max_score, excluded.max_score);
+'''
+_SUMMARY_REMOVE = '''
+    UPDATE score_summary SET count = count - 1, total = total - OLD.score,
+        total_squares = total_squares - OLD.score * OLD.score
+    WHERE source = '{source}' AND grain = '{grain}' AND user_id = OLD.user_id AND subject = OLD.subject
+      AND period = {period};
+    UPDATE score_summary
+    SET min_score = (SELECT MIN(score) FROM {table} WHERE user_id = OLD.user_id AND subject = OLD.subject AND {bounds}),
+        max_score = (SELECT MAX(score) FROM {table} WHERE user_id = OLD.user_id AND subject = OLD.subject AND {bounds})
+    WHERE source = '{source}' AND grain = '{grain}' AND user_id = OLD.user_id AND subject = OLD.subject
+      AND period = {period} AND count > 0 AND (min_score = OLD.score OR max_score = OLD.score);
+    DELETE FROM score_summary
+    WHERE source = '{source}' AND grain = '{grain}' AND user_id = OLD.user_id AND subject = OLD.subject
+      AND period = {period} AND count <= 0;
+'''
+# (grain, first day of the period holding {row}date, the period's raw rows)
+_ACTIVITY_GRAINS = [
+    ('week', "date({row}date, 'weekday 0', '-6 days')",
+     "date >= score_summary.period AND date < date(score_summary.period, '+7 days')"),
+    ('month', "strftime('%Y-%m-01', {row}date)",
+     "date >= score_summary.period AND date < date(score_summary.period, '+1 month')"),
+    ('all', "''", '1'),
+]
+_ACTIVITY_COUNTED = ('{row}user_id IS NOT NULL AND {row}subject IS NOT NULL AND {row}score IS NOT NULL '
+                     'AND date({row}date) IS NOT NULL')
+_TEST_COUNTED = '{row}user_id IS NOT NULL AND {row}subject IS NOT NULL AND {row}score IS NOT NULL'
+_ACTIVITY_ADD = ''.join(_SUMMARY_UPSERT.format(source='activity', grain=grain, period=period.format(row='NEW.'))
+                        for grain, period, _ in _ACTIVITY_GRAINS)
+_ACTIVITY_REMOVE = ''.join(_SUMMARY_REMOVE.format(source='activity', grain=grain, period=period.format(row='OLD.'),
+                                                  table='score_activity', bounds=bounds)
+                           for grain, period, bounds in _ACTIVITY_GRAINS)
+_TEST_ADD = _SUMMARY_UPSERT.format(source='test', grain='all', period="''")
+_TEST_REMOVE = _SUMMARY_REMOVE.format(source='test', grain='all', period="''", table='test_scores', bounds='1')
+_SUMMARY_SELECT = '''
+    SELECT '{source}' AS source, '{grain}' AS grain, user_id, subject, {period} AS period, COUNT(*) AS count,
+           SUM(score) AS total, SUM(score * score) AS total_squares, MIN(score) AS min_score, MAX(score) AS max_score
+    FROM {table} WHERE {counted} AND {condition}
+    GROUP BY user_id, subject, period
+'''
+
+
+def _summary_triggers(table, columns, counted, add, remove):
+    # An update is a removal of the old row followed by an addition of the new one
+    return [f'''CREATE TRIGGER IF NOT EXISTS {table}_summary_{name} AFTER {event} ON {table}
+                WHEN {counted.format(row=row)}
+                BEGIN {body} END'''
+            for name, event, row, body in [('insert', 'INSERT', 'NEW.', add),
+                                           ('delete', 'DELETE', 'OLD.', remove),
+                                           ('update_old', f'UPDATE OF {columns}', 'OLD.', remove),
+                                           ('update_new', f'UPDATE OF {columns}', 'NEW.', add)]]
+
+
+def score_summary_select(condition='1'):
+    """SELECT computing every score_summary row from scratch, from the score rows matching condition"""
+    return ' UNION ALL '.join(
+        [_SUMMARY_SELECT.format(source='activity', grain=grain, period=period.format(row=''), table='score_activity',
+                                counted=_ACTIVITY_COUNTED.format(row=''), condition=condition)
+         for grain, period, _ in _ACTIVITY_GRAINS]
+        + [_SUMMARY_SELECT.format(source='test', grain='all', period="''", table='test_scores',
+                                  counted=_TEST_COUNTED.format(row=''), condition=condition)])
+
+
+SCORE_SUMMARY_TABLE = [
+    '''
+    CREATE TABLE IF NOT EXISTS score_summary (
+        source TEXT NOT NULL,
+        grain TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        subject TEXT NOT NULL,
+        period TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        total REAL NOT NULL,
+        total_squares REAL NOT NULL,
+        min_score REAL,
+        max_score REAL,
+        PRIMARY KEY (source, grain, user_id, subject, period)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_score_summary_subject ON score_summary (source, grain, subject, period)',
+    'CREATE INDEX IF NOT EXISTS idx_score_activity_user_date ON score_activity (user_id, date, subject, score)',
+]
+SCORE_SUMMARY_TRIGGERS = [
+    *_summary_triggers('score_activity', 'user_id, subject, score, date', _ACTIVITY_COUNTED,
+                       _ACTIVITY_ADD, _ACTIVITY_REMOVE),
+    *_summary_triggers('test_scores', 'user_id, subject, score', _TEST_COUNTED, _TEST_ADD, _TEST_REMOVE),
+]
+SCORE_SUMMARY_REBUILD = [
+    'DELETE FROM score_summary',
+    'INSERT INTO score_summary ' + score_summary_select(),
+]
+SCORE_SUMMARY_SCHEMA = [*SCORE_SUMMARY_TABLE, *SCORE_SUMMARY_TRIGGERS, *SCORE_SUMMARY_REBUILD]
+
+# Forum full-text search (version 6): one document per query, kept current by triggers
+_SEARCH_TAGS = '''CASE WHEN json_valid({q}special_mentions) AND json_type({q}special_mentions) = 'array'
+    THEN (SELECT group_concat(value, ' ') FROM json_each({q}special_mentions)) ELSE '' END'''
+_SEARCH_ANSWERS = "(SELECT group_concat(answer_text, ' ') FROM answers WHERE query_id = {id})"
+
+FORUM_SEARCH_TABLE = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS forum_search USING fts5(
+        brief, answers, tags,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+'''
+FORUM_SEARCH_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS queries_search_insert AFTER INSERT ON queries BEGIN
+        INSERT INTO forum_search (rowid, brief, answers, tags)
+        VALUES (NEW.id, NEW.brief, {_SEARCH_ANSWERS.format(id='NEW.id')}, {_SEARCH_TAGS.format(q='NEW.')});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS queries_search_update AFTER UPDATE OF brief, special_mentions ON queries BEGIN
+        UPDATE forum_search SET brief = NEW.brief, tags = {_SEARCH_TAGS.format(q='NEW.')} WHERE rowid = NEW.id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS queries_search_delete AFTER DELETE ON queries BEGIN
+        DELETE FROM forum_search WHERE rowid = OLD.id;
+    END''',
+    # Any change to an answer re-reads the answers of the queries involved (a handful of rows each)
+    f'''CREATE TRIGGER IF NOT EXISTS answers_search_insert AFTER INSERT ON answers BEGIN
+        UPDATE forum_search SET answers = {_SEARCH_ANSWERS.format(id='NEW.query_id')} WHERE rowid = NEW.query_id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS answers_search_update AFTER UPDATE OF query_id, answer_text ON answers BEGIN
+        UPDATE forum_search SET answers = {_SEARCH_ANSWERS.format(id='OLD.query_id')} WHERE rowid = OLD.query_id;
+        UPDATE forum_search SET answers = {_SEARCH_ANSWERS.format(id='NEW.query_id')} WHERE rowid = NEW.query_id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS answers_search_delete AFTER DELETE ON answers BEGIN
+        UPDATE forum_search SET answers = {_SEARCH_ANSWERS.format(id='OLD.query_id')} WHERE rowid = OLD.query_id;
+    END''',
+]
+FORUM_SEARCH_REBUILD = [
+    'DELETE FROM forum_search',
+    f'''
+    INSERT INTO forum_search (rowid, brief, answers, tags)
+    SELECT q.id, q.brief, a.text, {_SEARCH_TAGS.format(q='q.')}
+    FROM queries q
+    LEFT JOIN (SELECT query_id, group_concat(answer_text, ' ') AS text FROM answers GROUP BY query_id) a
+        ON a.query_id = q.id
+    ''',
+    "INSERT INTO forum_search (forum_search) VALUES ('optimize')",
+]
+FORUM_SEARCH_SCHEMA = [FORUM_SEARCH_TABLE, *FORUM_SEARCH_TRIGGERS, *FORUM_SEARCH_REBUILD]
+
+# Normalized forum tags (version 7): tables, then the backfill, then the triggers
+FORUM_TAGS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        query_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS query_tags (
+        query_id INTEGER NOT NULL,
+        tag_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (query_id, tag_id),
+        FOREIGN KEY(query_id) REFERENCES queries(id),
+        FOREIGN KEY(tag_id) REFERENCES tags(id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_query_tags_tag ON query_tags (tag_id, created_at, query_id)',
+    'CREATE INDEX IF NOT EXISTS idx_tags_count ON tags (query_count DESC, key)',
+]
+FORUM_TAGS_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS query_tags_count_insert AFTER INSERT ON query_tags BEGIN
+        UPDATE tags SET query_count = query_count + 1 WHERE id = NEW.tag_id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS query_tags_count_delete AFTER DELETE ON query_tags BEGIN
+        UPDATE tags SET query_count = query_count - 1 WHERE id = OLD.tag_id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS queries_tags_update AFTER UPDATE OF created_at ON queries BEGIN
+        UPDATE query_tags SET created_at = NEW.created_at WHERE query_id = NEW.id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS queries_tags_delete AFTER DELETE ON queries BEGIN
+        DELETE FROM query_tags WHERE query_id = OLD.id;
+    END''',
+]
+
+
+def hash_plaintext_passwords(conn):
+    """Replace legacy plaintext passwords with salted hashes"""
+    rows = [(user_id, password) for user_id, password in conn.execute('SELECT id, password FROM users')
+            if not is_hashed(password)]
+    hashes = hasher.hash_many([password for _, password in rows])
+    conn.executemany('UPDATE users SET password = ? WHERE id = ?',
+                     ((password_hash, user_id) for (user_id, _), password_hash in zip(rows, hashes)))
+
+
+def tag_names(values):
+    """
+    Tag names from a list of special mentions: trimmed, without a leading '#', unique ignoring case
+    (the lower-cased name is tags.key), at most 10 of at most 50 characters
+    """
+    names, seen = [], set()
+    for value in values:
+        if value is None or isinstance(value, (dict, list)):
+            continue
+        name = str(value).strip().lstrip('#').strip()[:50]
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names[:10]
+
+
+def _mention_names(special_mentions):
+    """Tag names in a special_mentions JSON list"""
+    try:
+        values = json.loads(special_mentions)
+    except (ValueError, TypeError):
+        return []
+    return tag_names(values) if isinstance(values, list) else []
+
+
+def backfill_forum_tags(conn):
+    """
+    Create the tag tables, tag every query from its special_mentions, then add the triggers; returns
+    the number of query_tags rows added (queries already tagged are left as they are)
+    """
+    for statement in FORUM_TAGS_SCHEMA:
+        conn.execute(statement)
+    links = []
+    for query_id, special_mentions, created_at in conn.execute('SELECT id, special_mentions, created_at FROM queries'):
+        for position, name in enumerate(_mention_names(special_mentions)):
+            links.append((name.lower(), name, query_id, position, created_at))
+    before = conn.execute('SELECT COUNT(*) FROM query_tags').fetchone()[0]
+    conn.executemany('INSERT OR IGNORE INTO tags (key, name) VALUES (?, ?)', (link[:2] for link in links))
+    conn.executemany('''
+        INSERT OR IGNORE INTO query_tags (query_id, tag_id, position, created_at)
+        SELECT ?, id, ?, ? FROM tags WHERE key = ?
+    ''', ((query_id, position, created_at, key) for key, _, query_id, position, created_at in links))
+    added = conn.execute('SELECT COUNT(*) FROM query_tags').fetchone()[0] - before
+    conn.execute('UPDATE tags SET query_count = (SELECT COUNT(*) FROM query_tags WHERE tag_id = tags.id)')
+    for statement in FORUM_TAGS_TRIGGERS:
+        conn.execute(statement)
+    return added
+
+
+# (version, description, statements) - append new migrations, never edit old ones. Every table, index and
+# trigger is defined once, above; score_summary.py, forum_search.py and forum_tags.py reuse these definitions
+# for --rebuild and bulk loads, so changing one of them means adding a migration here.
+MIGRATIONS = [
+    (1, 'Base portal schema', BASE_SCHEMA),
+    (2, 'Indexes for per-user panels, score activity and the forum', PORTAL_INDEXES),
+    (3, 'Doubt Solver answer cache', DOUBT_CACHE_SCHEMA),
+    (4, 'Hash stored passwords', hash_plaintext_passwords),
+    (5, 'Score summary table maintained by triggers', SCORE_SUMMARY_SCHEMA),
+    (6, 'Full-text search index for the doubt forum', FORUM_SEARCH_SCHEMA),
+    (7, 'Normalized forum tags backfilled from special_mentions', backfill_forum_tags),
+    (8, 'Doubt cache similarity terms become word bigrams', DOUBT_CACHE_RESET),
+]
+
+
+def ensure_version_table(conn):
+    """Create the schema_version bookkeeping table"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+
+def current_version(conn):
+    """Return the highest applied migration version (0 for a new database)"""
+    ensure_version_table(conn)
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Apply every pending migration up to target, each in its own transaction"""
+    version = current_version(conn)
+    applied = []
+    for number, description, statements in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        conn.execute('BEGIN')
+        try:
+            if callable(statements):
+                statements(conn)
+            else:
+                for statement in statements:
+                    conn.execute(statement)
+            conn.execute(
+                'INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)',
+                (number, description, datetime.now().isoformat(timespec='seconds'))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(number)
+    return applied
+
+
+def main():
+    """Command line entry point"""
+    args = sys.argv[1:]
+    with get_db() as conn:
+        if '--status' in args:
+            version = current_version(conn)
+            print(f"💾 Database: {DATABASE_NAME}")
+            print(f"📌 Schema version: {version} (latest {MIGRATIONS[-1][0]})")
+            for number, description, _ in MIGRATIONS:
+                mark = '✅' if number <= version else '⏳'
+                print(f"   {mark} {number:>3}  {description}")
+            return
+
+        applied = migrate(conn)
+        if applied:
+            print(f"✅ Applied migrations: {', '.join(map(str, applied))}")
+        else:
+            print("✅ Schema is up to date")
+
+
+if __name__ == '__main__':
+    main()
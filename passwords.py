@@ -0,0 +1,140 @@
+"""
+Password hashing for the User Portal System
+Salted scrypt or PBKDF2 hashes (standard library only) with a tunable work factor,
+constant-time verification and a bounded thread pool so hashing never starves request workers
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Configuration
+PASSWORD_HASH_ALGORITHM = os.environ.get('PASSWORD_HASH_ALGORITHM', 'scrypt')   # 'scrypt' or 'pbkdf2_sha256'
+PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', str(2 ** 14)))       # CPU/memory cost (power of 2)
+PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', '8'))
+PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', '1'))
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', '600000'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', '2'))   # seconds to wait for a queue slot
+# Bulk work (imports, migrations, seeding) gets its own smaller pool so it never queues ahead of sign-ins
+PASSWORD_BULK_WORKERS = int(os.environ.get('PASSWORD_BULK_WORKERS', str(max(1, PASSWORD_HASH_WORKERS // 2))))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class HasherBusyError(Exception):
+    """Too many hashes are already queued"""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    # scrypt needs ~128 * n * r bytes; leave headroom over OpenSSL's 32 MB default
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, dklen=KEY_BYTES)
+
+
+def current_params(algorithm=None):
+    """Return the configured (algorithm, cost parameters) used for new hashes"""
+    algorithm = algorithm or PASSWORD_HASH_ALGORITHM
+    if algorithm == 'scrypt':
+        return algorithm, (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+    if algorithm == 'pbkdf2_sha256':
+        return algorithm, (PASSWORD_PBKDF2_ITERATIONS,)
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def hash_password(password, algorithm=None, params=None):
+    """
+    Return an encoded salted hash:
+    scrypt$n$r$p$salt$key or pbkdf2_sha256$iterations$salt$key
+    """
+    algorithm, default_params = current_params(algorithm)
+    params = tuple(params or default_params)
+    salt = os.urandom(SALT_BYTES)
+    if algorithm == 'scrypt':
+        key = _scrypt(password, salt, *params)
+    else:
+        key = _pbkdf2(password, salt, *params)
+    return '$'.join([algorithm, *map(str, params), _b64(salt), _b64(key)])
+
+
+def is_hashed(stored):
+    """True if stored is an encoded hash rather than a legacy plaintext password"""
+    return stored.startswith(('scrypt$', 'pbkdf2_sha256$'))
+
+
+def verify_password(password, stored):
+    """Check password against an encoded hash in constant time"""
+    if not stored or not is_hashed(stored):
+        return False
+    parts = stored.split('$')
+    try:
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            n, r, p = map(int, parts[1:4])
+            key = _scrypt(password, _unb64(parts[4]), n, r, p)
+        elif parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            key = _pbkdf2(password, _unb64(parts[2]), int(parts[1]))
+        else:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(key, _unb64(parts[-1]))
+
+
+def needs_rehash(stored):
+    """True if stored was hashed with a different algorithm or work factor than configured"""
+    algorithm, params = current_params()
+    return stored.split('$')[:1 + len(params)] != [algorithm, *map(str, params)]
+
+
+class PasswordHasher:
+    """
+    Runs hashing on a fixed-size thread pool with a bounded queue (hashlib releases the GIL).
+    Batches run on a separate, smaller pool so sign-ins and registrations never wait behind them.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_size=PASSWORD_HASH_QUEUE, wait=PASSWORD_HASH_WAIT,
+                 bulk_workers=PASSWORD_BULK_WORKERS):
+        self.workers = workers
+        self.bulk_workers = bulk_workers
+        self.wait = wait
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+        self._bulk_executor = ThreadPoolExecutor(max_workers=bulk_workers, thread_name_prefix='pwhash-bulk')
+        self._queue = threading.BoundedSemaphore(queue_size)
+
+    def _run(self, func, *args):
+        if not self._queue.acquire(timeout=self.wait):
+            raise HasherBusyError('Too many sign-in attempts are being processed, please retry')
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._queue.release()
+
+    def hash(self, password):
+        return self._run(hash_password, password)
+
+    def verify(self, password, stored):
+        return self._run(verify_password, password, stored)
+
+    def hash_many(self, passwords):
+        """Hash a batch on the bulk pool (used by imports, migrations and seeding)"""
+        return list(self._bulk_executor.map(hash_password, passwords))
+
+
+hasher = PasswordHasher()
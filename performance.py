@@ -0,0 +1,232 @@
+"""
+Score activity analytics for the Performance tab
+One grouped query over score_activity for any date range and set of subjects with daily/weekly/monthly
+rollups (mean, min, max), a trailing moving average and LTTB downsampling to a target point count.
+Weekly and monthly rollups read whole periods from score_summary and only aggregate raw rows for
+periods the range cuts through
+"""
+
+import os
+from collections import deque
+from datetime import date, timedelta
+
+from score_summary import PERIODS
+from seed import SCORE_SUBJECTS
+
+# Configuration
+PERFORMANCE_DEFAULT_LIMIT = int(os.environ.get('PERFORMANCE_DEFAULT_LIMIT', '14'))   # points per subject when no range is given
+PERFORMANCE_MAX_POINTS = int(os.environ.get('PERFORMANCE_MAX_POINTS', '1000'))
+PERFORMANCE_MAX_WINDOW = int(os.environ.get('PERFORMANCE_MAX_WINDOW', '90'))
+PERFORMANCE_USE_SUMMARY = os.environ.get('PERFORMANCE_USE_SUMMARY', '1') != '0'
+
+# rollup -> SQL expression giving the first day of the bucket a date falls in
+ROLLUPS = {grain: PERIODS[grain].format(date='date') for grain in ('day', 'week', 'month')}
+SUMMARY_ROLLUPS = ('week', 'month')
+
+
+def bucket_start(day, rollup):
+    """First day of the week (Monday) or month containing day"""
+    return day - timedelta(days=day.weekday()) if rollup == 'week' else day.replace(day=1)
+
+
+def next_bucket(day, rollup):
+    """First day of the period after the one containing day"""
+    start = bucket_start(day, rollup)
+    if rollup == 'week':
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+class PerformanceQuery:
+    """Validated /api/performance-data parameters"""
+
+    def __init__(self, start=None, end=None, subjects=None, rollup=None, window=None, points=None, limit=None):
+        self.start = start
+        self.end = end
+        self.subjects = subjects
+        self.rollup = rollup
+        self.window = window
+        self.points = points
+        self.limit = limit
+
+    @classmethod
+    def from_args(cls, args, today=None):
+        """Parse query-string arguments; raises ValueError with a message for the client"""
+        def parse_date(name):
+            value = args.get(name)
+            if not value:
+                return None
+            try:
+                return date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+        def parse_int(name, low, high):
+            value = args.get(name)
+            if value in (None, ''):
+                return None
+            try:
+                number = int(value)
+            except ValueError:
+                number = None
+            if number is None or not low <= number <= high:
+                raise ValueError(f"{name} must be between {low} and {high}")
+            return number
+
+        start, end = parse_date('start'), parse_date('end')
+        days = parse_int('days', 1, 3660)
+        if days is not None:
+            if start is not None:
+                raise ValueError('Use either start or days, not both')
+            end = end or today or date.today()
+            start = end - timedelta(days=days - 1)
+        if start and end and start > end:
+            raise ValueError('start must not be after end')
+
+        rollup = args.get('rollup') or None
+        if rollup is not None and rollup not in ROLLUPS:
+            raise ValueError(f"rollup must be one of: {', '.join(ROLLUPS)}")
+        subjects = [s.strip() for s in args.get('subjects', '').split(',') if s.strip()] or None
+        window = parse_int('window', 1, PERFORMANCE_MAX_WINDOW)
+        points = parse_int('points', 3, PERFORMANCE_MAX_POINTS)
+        limit = parse_int('limit', 0, 100000)
+        if limit is None and not (start or end or rollup or points):
+            # The original response: the first two weeks of each subject
+            limit = PERFORMANCE_DEFAULT_LIMIT
+        return cls(start, end, subjects, rollup, window, points, limit or None)
+
+    def sql(self, user_id, use_summary=PERFORMANCE_USE_SUMMARY):
+        """Return (sql, params) for the grouped query"""
+        if use_summary and self.rollup in SUMMARY_ROLLUPS:
+            return self._summary_sql(user_id)
+        bucket = ROLLUPS[self.rollup or 'day']
+        where, params = self._filters(user_id)
+        if self.start:
+            where.append('date >= :start')
+            params['start'] = self.start.isoformat()
+        if self.end:
+            where.append('date <= :end')
+            params['end'] = self.end.isoformat()
+
+        sql = f'''
+            SELECT subject, {bucket} AS period, AVG(score), MIN(score), MAX(score), COUNT(*)
+            FROM score_activity
+            WHERE {' AND '.join(where)}
+            GROUP BY subject, period
+            ORDER BY subject, period
+        '''
+        return sql, params
+
+    def _filters(self, user_id):
+        where, params = ['user_id = :user_id'], {'user_id': user_id}
+        if self.subjects:
+            names = {f"s{i}": subject for i, subject in enumerate(self.subjects)}
+            where.append(f"subject IN ({', '.join(':' + name for name in names)})")
+            params.update(names)
+        return where, params
+
+    def _summary_sql(self, user_id):
+        """Whole periods from score_summary plus raw rows for the partial periods at either end"""
+        rollup = self.rollup
+        start, end = self.start, self.end
+        # [full_start, full_end) are the periods the range covers completely
+        full_start = ''
+        if start:
+            full_start = (start if bucket_start(start, rollup) == start else next_bucket(start, rollup)).isoformat()
+        full_end = '9999-12-31'
+        if end:
+            after = next_bucket(end, rollup)
+            full_end = (after if end + timedelta(days=1) == after else bucket_start(end, rollup)).isoformat()
+        if full_start > full_end:
+            # The range sits inside a single period
+            full_start = full_end = start.isoformat()
+        where, params = self._filters(user_id)
+        params.update(grain=rollup, full_start=full_start, full_end=full_end,
+                      start=start.isoformat() if start else '', end=end.isoformat() if end else '9999-12-31')
+        filters = ' AND '.join(where)
+        sql = f'''
+            SELECT subject, period, total / count, min_score, max_score, count
+            FROM score_summary
+            WHERE source = 'activity' AND grain = :grain AND {filters}
+              AND period >= :full_start AND period < :full_end
+            UNION ALL
+            SELECT subject, {ROLLUPS[rollup]} AS period, AVG(score), MIN(score), MAX(score), COUNT(*)
+            FROM score_activity
+            WHERE {filters} AND date >= :start AND date < :full_start
+            GROUP BY subject, period
+            UNION ALL
+            SELECT subject, {ROLLUPS[rollup]} AS period, AVG(score), MIN(score), MAX(score), COUNT(*)
+            FROM score_activity
+            WHERE {filters} AND date >= :full_end AND date <= :end
+            GROUP BY subject, period
+            ORDER BY subject, period
+        '''
+        return sql, params
+
+
+def _number(value):
+    """Whole numbers as ints (matches the stored INTEGER scores), others rounded"""
+    return int(value) if value == int(value) else round(value, 2)
+
+
+def lttb(points, threshold, key='score'):
+    """
+    Largest-Triangle-Three-Buckets downsampling of date-ordered point dicts to threshold points.
+    Keeps the first and last point and, per bucket, the one forming the largest triangle
+    with the previously kept point and the next bucket's average.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return points
+    xs = [date.fromisoformat(p['date']).toordinal() for p in points]
+    ys = [p[key] for p in points]
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the triangle's third vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, count)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def load_performance(conn, user_id, query):
+    """Return {subject: [point, ...]} for one user"""
+    sql, params = query.sql(user_id)
+    detailed = query.rollup is not None
+    series = {subject: [] for subject in query.subjects or SCORE_SUBJECTS}
+    # Per-subject limit and trailing moving average are applied while reading the ordered rows;
+    # SQLite window functions cost several times the grouped scan itself
+    window = deque(maxlen=query.window or 1)
+    current = None
+    for subject, period, mean, low, high, count in conn.execute(sql, params):
+        if subject != current:
+            current = subject
+            points = series.setdefault(subject, [])
+            window.clear()
+        if query.limit and len(points) >= query.limit:
+            continue
+        point = {'date': period, 'score': _number(mean)}
+        if detailed:
+            point.update(min=low, max=high, count=count)
+        if query.window:
+            window.append(mean)
+            point['moving_average'] = _number(sum(window) / len(window))
+        points.append(point)
+    if query.points:
+        series = {subject: lttb(points, query.points) for subject, points in series.items()}
+    return series
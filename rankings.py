@@ -0,0 +1,251 @@
+"""
+Class-wide rankings for the User Portal System
+Sorted in-memory indexes of every student's mean test score per subject and attendance ratio,
+so rank and percentile lookups are a bisect (O(log n)) instead of an ORDER BY over all students.
+Score writes made through the API update the indexes in place; changes committed elsewhere
+(seeding, other workers) trigger a rebuild from score_summary at most once per refresh interval.
+Rebuilds run outside the lookup lock and are swapped in, so lookups never wait for one.
+"""
+
+import bisect
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import database
+
+# Configuration
+RANKING_REFRESH_SECONDS = float(os.environ.get('RANKING_REFRESH_SECONDS', '60'))
+RANKING_LEADERBOARD_MAX = int(os.environ.get('RANKING_LEADERBOARD_MAX', '100'))
+
+ATTENDANCE = 'attendance'
+
+SUBJECT_QUERY = '''
+    SELECT subject, user_id, total / count FROM score_summary
+    WHERE source = 'test' AND grain = 'all' AND user_id IN (SELECT id FROM users)
+'''
+ATTENDANCE_QUERY = '''
+    SELECT user_id, CAST(attended AS REAL) / total FROM attendance
+    WHERE total > 0 AND user_id IN (SELECT id FROM users)
+    GROUP BY user_id
+'''
+
+# Moves when test scores, attendance or the set of users change, and not for unrelated commits
+# (forum posts, sign-ins); read at most once per refresh interval
+MARKER_QUERY = '''
+    SELECT count(*), total(count), total(total) FROM score_summary WHERE source = 'test' AND grain = 'all'
+    UNION ALL SELECT count(*), total(attended), total(total) FROM attendance
+    UNION ALL SELECT count(*), max(id), 0 FROM users
+'''
+
+
+class RankIndex:
+    """Values per user kept in a sorted list of (value, user_id) for bisect lookups"""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.keys = sorted((value, user_id) for user_id, value in self.values.items())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set(self, user_id, value):
+        """Insert, move or (value None) drop one user - O(log n) search plus a list shift"""
+        old = self.values.pop(user_id, None)
+        if old is not None:
+            del self.keys[bisect.bisect_left(self.keys, (old, user_id))]
+        if value is not None:
+            self.values[user_id] = value
+            bisect.insort(self.keys, (value, user_id))
+
+    def rank(self, user_id):
+        """Return {value, rank, of, percentile} or None; rank 1 is the highest value, ties share a rank"""
+        value = self.values.get(user_id)
+        if value is None:
+            return None
+        total = len(self.keys)
+        below = bisect.bisect_left(self.keys, (value, -math.inf))
+        not_above = bisect.bisect_right(self.keys, (value, math.inf))
+        return {
+            'value': value,
+            'rank': total - not_above + 1,
+            'of': total,
+            # Percentile rank: share of students below, counting ties as half
+            'percentile': round((below + (not_above - below) / 2) / total * 100, 1),
+        }
+
+    def top(self, limit):
+        """Highest values first as [(user_id, value)]"""
+        return [(user_id, value) for value, user_id in reversed(self.keys[-limit:])] if limit > 0 else []
+
+
+class Rankings:
+    """Per-subject and attendance rank indexes, rebuilt lazily from the database"""
+
+    def __init__(self, refresh_seconds=RANKING_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()          # guards the indexes and counters
+        self._build_lock = threading.Lock()    # one rebuild at a time; owns the connection
+        self._conn = None
+        self._pid = None
+        self._data_version = None
+        self._marker = None
+        self._built_at = None
+        self._checked_at = None
+        self._generation = 0
+        self._pending = None                   # writes applied while a rebuild is running
+        self.indexes = {}
+        self.rebuilds = 0
+        self.skipped_rebuilds = 0
+        self.updates = 0
+        self.lookups = 0
+        self.last_rebuild_ms = None
+
+    def _connection(self):
+        """Dedicated connection: data_version only reports commits made by other connections"""
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(database.DATABASE_NAME, timeout=5.0, check_same_thread=False)
+            self._conn.execute('PRAGMA busy_timeout=5000')
+            self._pid = os.getpid()
+            self._built_at = None
+        return self._conn
+
+    def _due(self):
+        return self._built_at is None or time.monotonic() - self._checked_at >= self.refresh_seconds
+
+    def _sync(self):
+        """
+        Build on first use (callers wait). Afterwards one caller per refresh interval checks for changes
+        while the others keep reading the current indexes.
+        """
+        if not self._due():
+            return
+        if not self._build_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self._due():
+                self._refresh(self._connection())
+        finally:
+            self._build_lock.release()
+
+    def _build(self, conn):
+        """Read every ranked value into new indexes"""
+        subjects = {}
+        for subject, user_id, value in conn.execute(SUBJECT_QUERY):
+            subjects.setdefault(subject, {})[user_id] = value
+        indexes = {subject: RankIndex(values) for subject, values in subjects.items()}
+        indexes[ATTENDANCE] = RankIndex(conn.execute(ATTENDANCE_QUERY))
+        return indexes
+
+    def _refresh(self, conn):
+        """Rebuild when another connection committed and the ranked data changed; swap the result in"""
+        self._checked_at = time.monotonic()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        built = self._built_at is not None
+        if built and version == self._data_version:
+            return
+        self._data_version = version
+        marker = conn.execute(MARKER_QUERY).fetchall()
+        if built and marker == self._marker:
+            self.skipped_rebuilds += 1
+            return
+        self._marker = marker
+
+        start = time.perf_counter()
+        with self._lock:
+            generation = self._generation
+            self._pending = []
+        try:
+            indexes = self._build(conn)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            # Writes made while building may not be in what was read; they are applied again on top
+            for metric, user_id, value in self._pending:
+                for name in ([metric] if metric else list(indexes)):
+                    indexes.setdefault(name, RankIndex()).set(user_id, value)
+            self._pending = None
+            self.indexes = indexes
+            if generation == self._generation:
+                self._built_at = time.monotonic()
+            self.rebuilds += 1
+            self.last_rebuild_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def student(self, user_id):
+        """Return {'subjects': {subject: rank}, 'attendance': rank or None}"""
+        self._sync()
+        with self._lock:
+            self.lookups += 1
+            subjects = {}
+            for name, index in self.indexes.items():
+                if name == ATTENDANCE:
+                    continue
+                ranked = index.rank(user_id)
+                if ranked is not None:
+                    subjects[name] = ranked
+            return {'subjects': dict(sorted(subjects.items())),
+                    'attendance': self.indexes[ATTENDANCE].rank(user_id)}
+
+    def leaderboard(self, metric, limit):
+        """Top students for a subject or 'attendance'; None for an unknown metric"""
+        self._sync()
+        with self._lock:
+            self.lookups += 1
+            index = self.indexes.get(metric)
+            if index is None:
+                return None
+            return [{'user_id': user_id, **index.rank(user_id)} for user_id, _ in index.top(limit)]
+
+    def metrics(self):
+        self._sync()
+        with self._lock:
+            return sorted(self.indexes)
+
+    def _set(self, metric, user_id, value):
+        """Apply one write to the current indexes (metric None: every index)"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((metric, user_id, value))
+            if self._built_at is None:
+                return  # built from the database on first use
+            self.updates += 1
+            for name in ([metric] if metric else list(self.indexes)):
+                self.indexes.setdefault(name, RankIndex()).set(user_id, value)
+
+    def test_score_written(self, conn, user_id, subject):
+        """Re-read one student's subject mean (maintained by score_summary) after a test score write"""
+        row = conn.execute(
+            "SELECT total / count FROM score_summary WHERE source = 'test' AND grain = 'all' "
+            "AND user_id = ? AND subject = ? AND period = ''", (user_id, subject)).fetchone()
+        self._set(subject, user_id, row[0] if row else None)
+
+    def attendance_written(self, user_id, attended, total):
+        self._set(ATTENDANCE, user_id, attended / total if total else None)
+
+    def user_removed(self, user_id):
+        self._set(None, user_id, None)
+
+    def invalidate(self):
+        """Rebuild on next use (e.g. after the database was reset)"""
+        with self._lock:
+            self._generation += 1
+            self._built_at = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'metrics': {name: len(index) for name, index in sorted(self.indexes.items())},
+                'rebuilds': self.rebuilds,
+                'skipped_rebuilds': self.skipped_rebuilds,
+                'last_rebuild_ms': self.last_rebuild_ms,
+                'incremental_updates': self.updates,
+                'lookups': self.lookups,
+                'refresh_seconds': self.refresh_seconds,
+            }
+
+
+rankings = Rankings()
@@ -44,7 +44,7 @@ def check_dependencies():
         return False
     return True
 
-def run_application():
+def run_application(app_args=None):
     """Run the Flask application"""
     python_exe = get_python_executable()
     
@@ -61,7 +61,7 @@ def run_application():
     
     try:
         # Run the Flask application
-        subprocess.run([str(python_exe), APP_FILE], check=True)
+        subprocess.run([str(python_exe), APP_FILE] + (app_args or []), check=True)
     except KeyboardInterrupt:
         print("\n🛑 Application stopped by user.")
         return True
@@ -82,6 +82,7 @@ def display_help():
     print("  --help     - Show this help message")
     print("  --check    - Check system requirements")
     print("  --info     - Show application information")
+    print("  --reset-db - Start with a freshly re-seeded database (deletes all data)")
     print("\nFirst time setup:")
     print("  1. python setup.py")
     print("  2. python run.py")
@@ -153,6 +154,10 @@ def main():
         elif arg in ['--info', '-i', 'info']:
             show_info()
             return
+        elif arg in ['--reset-db', 'reset-db']:
+            if check_virtual_environment() and check_dependencies():
+                run_application(['--reset-db'])
+            return
         else:
             print(f"❌ Unknown option: {arg}")
             print("💡 Use --help for available options")
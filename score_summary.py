@@ -0,0 +1,133 @@
+"""
+Materialized score summaries for the User Portal System
+score_summary holds count/sum/sum-of-squares/min/max per (source, grain, user, subject, period).
+SQLite triggers keep it current on every insert, update and delete of score_activity and test_scores,
+so analytics read O(periods) summary rows instead of O(rows) scores. The table, its triggers and the
+full recomputation are defined once, in migrations.py.
+
+Usage: python score_summary.py --check | --rebuild
+"""
+
+import argparse
+import sys
+from contextlib import contextmanager
+
+from database import DATABASE_NAME, get_db
+from migrations import (SCORE_SUMMARY_REBUILD, SCORE_SUMMARY_TABLE, SCORE_SUMMARY_TRIGGERS, migrate,
+                        score_summary_select)
+
+# grain -> SQL expression for the first day of the period containing {date} ('' for all time), as the
+# summary triggers compute it
+PERIODS = {
+    'day': '{date}',
+    'week': "date({date}, 'weekday 0', '-6 days')",   # weeks start on Monday
+    'month': "strftime('%Y-%m-01', {date})",
+    'all': "''",
+}
+
+# source -> (table, grains kept); test scores are undated so only have an all-time summary
+SOURCES = {
+    'activity': ('score_activity', ('week', 'month', 'all')),
+    'test': ('test_scores', ('all',)),
+}
+
+
+def rebuild(conn):
+    """Recompute score_summary from the source tables; returns the number of summary rows"""
+    for statement in SCORE_SUMMARY_REBUILD:
+        conn.execute(statement)
+    return conn.execute('SELECT COUNT(*) FROM score_summary').fetchone()[0]
+
+
+def trigger_names():
+    return [f"{table}_summary_{event}" for table, _ in SOURCES.values()
+            for event in ('insert', 'delete', 'update_old', 'update_new')]
+
+
+@contextmanager
+def suspended(conn, user_ids):
+    """
+    Bulk-load scores for a new range of users without per-row triggers, then summarize just those users.
+    Runs inside the caller's transaction so other connections never see the triggers missing.
+    """
+    installed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'score_summary'").fetchone()
+    if not installed or not user_ids:
+        yield
+        return
+    for name in trigger_names():
+        conn.execute(f'DROP TRIGGER IF EXISTS {name}')
+    yield
+    for statement in SCORE_SUMMARY_TRIGGERS:
+        conn.execute(statement)
+    params = {'first': min(user_ids), 'last': max(user_ids)}
+    conn.execute('DELETE FROM score_summary WHERE user_id BETWEEN :first AND :last', params)
+    conn.execute('INSERT INTO score_summary ' + score_summary_select('user_id BETWEEN :first AND :last'), params)
+
+
+def install(conn):
+    """Create the summary table (as migrations.py defines it) and any missing triggers, then backfill it"""
+    for statement in [*SCORE_SUMMARY_TABLE, *SCORE_SUMMARY_TRIGGERS]:
+        conn.execute(statement)
+    return rebuild(conn)
+
+
+def missing_triggers(conn):
+    """Names of maintenance triggers that are not installed"""
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return [name for name in trigger_names() if name not in present]
+
+
+def check(conn, limit=20):
+    """Return up to limit summary rows that differ from a full recomputation (empty when consistent)"""
+    key = 'source, grain, user_id, subject, period'
+    return conn.execute(f'''
+        WITH expected AS ({score_summary_select()})
+        SELECT {', '.join('coalesce(e.%s, s.%s)' % (c, c) for c in key.split(', '))},
+               e.count, s.count, e.total, s.total, e.min_score, s.min_score, e.max_score, s.max_score
+        FROM expected e FULL OUTER JOIN score_summary s USING ({key})
+        WHERE e.count IS NOT s.count
+           OR abs(e.total - s.total) > 1e-6 OR e.total IS NULL OR s.total IS NULL
+           OR abs(e.total_squares - s.total_squares) > 1e-6
+           OR e.min_score IS NOT s.min_score OR e.max_score IS NOT s.max_score
+        LIMIT ?
+    ''', (limit,)).fetchall()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Maintain the score_summary table')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--check', action='store_true', help='compare score_summary with the score tables')
+    action.add_argument('--rebuild', action='store_true', help='recompute score_summary from scratch')
+    args = parser.parse_args()
+
+    print(f"💾 Database: {DATABASE_NAME}")
+    with get_db() as conn:
+        migrate(conn)
+        if args.rebuild:
+            conn.execute('BEGIN')
+            count = install(conn)
+            conn.commit()
+            print(f"✅ Rebuilt score_summary: {count:,} rows")
+            return
+        missing = missing_triggers(conn)
+        mismatches = check(conn)
+        if not missing and not mismatches:
+            print("✅ score_summary matches score_activity and test_scores")
+            return
+        if missing:
+            print(f"❌ Missing triggers: {', '.join(missing)}")
+        if mismatches:
+            print(f"❌ {len(mismatches)} summary rows differ (source, grain, user, subject, period: expected vs stored):")
+        for row in mismatches:
+            source, grain, user_id, subject, period, *values = row
+            print(f"   {source}/{grain} user {user_id} {subject} {period or '-'}: "
+                  f"count {values[0]} vs {values[1]}, total {values[2]} vs {values[3]}, "
+                  f"min {values[4]} vs {values[5]}, max {values[6]} vs {values[7]}")
+        print("💡 Run: python score_summary.py --rebuild")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Seeding engine for the User Portal System
+Generates sample or synthetic data in batches with executemany inside one transaction
+"""
+
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from database import DATABASE_NAME, get_db
+from passwords import hasher
+import score_summary
+
+# Sample user data
+SAMPLE_USERS = [
+    ('Alex', 'Johnson', 'alex.johnson@email.com', '+1 555-0101', 'password123'),
+    ('Maria', 'Garcia', 'maria.garcia@email.com', '+1 555-0102', 'securepass'),
+    ('David', 'Chen', 'david.chen@email.com', '+1 555-0103', 'davidpass'),
+    ('Sarah', 'Williams', 'sarah.williams@email.com', '+1 555-0104', 'sarahpw'),
+    ('Michael', 'Brown', 'michael.brown@email.com', '+1 555-0105', 'michaelpw'),
+    ('Emily', 'Davis', 'emily.davis@email.com', '+1 555-0106', 'emilypw'),
+    ('James', 'Miller', 'james.miller@email.com', '+1 555-0107', 'jamespw'),
+    ('Lisa', 'Wilson', 'lisa.wilson@email.com', '+1 555-0108', 'lisapw'),
+    ('Robert', 'Taylor', 'robert.taylor@email.com', '+1 555-0109', 'robertpw'),
+    ('Jennifer', 'Anderson', 'jennifer.anderson@email.com', '+1 555-0110', 'jenniferpw')
+]
+
+# Synthetic accounts share one password so seeding does not pay a key derivation per user
+SYNTHETIC_PASSWORD = 'student123'
+
+# Name pools for synthetic users
+FIRST_NAMES = ['Alex', 'Maria', 'David', 'Sarah', 'Michael', 'Emily', 'James', 'Lisa', 'Robert', 'Jennifer',
+               'Priya', 'Arjun', 'Chen', 'Fatima', 'Lucas', 'Sofia', 'Noah', 'Aisha', 'Mateo', 'Yuki']
+LAST_NAMES = ['Johnson', 'Garcia', 'Chen', 'Williams', 'Brown', 'Davis', 'Miller', 'Wilson', 'Taylor', 'Anderson',
+              'Sharma', 'Patel', 'Kim', 'Khan', 'Silva', 'Rossi', 'Smith', 'Ali', 'Lopez', 'Sato']
+
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Economics", "Biology"]
+SCORE_SUBJECTS = ["Mathematics", "Physics", "Chemistry"]
+NOTE_TYPES = ["Personalised Notes", "Subject Planner", "Notes & PPT"]
+
+TIMETABLE_DATA = [
+    ("Mathematics", "18-Apr-2022", "10:00 am", "Complete", "50 Minutes"),
+    ("Physics", "18-Apr-2022", "11:05 pm", "Complete", "50 Minutes"),
+    ("Chemistry", "18-Apr-2022", "02:00 pm", "Complete", "50 Minutes"),
+    ("Physics", "19-Apr-2022", "10:00 am", "Pending", "50 Minutes"),
+    ("Economics", "19-Apr-2022", "02:00 pm", "Pending", "50 Minutes"),
+    ("Physics", "20-Apr-2022", "02:00 pm", "Pending", "50 Minutes"),
+    ("Mathematics", "20-Apr-2022", "02:00 pm", "Pending", "50 Minutes"),
+]
+
+NOTICE_DATA = [
+    ("Weekly Maths MCQs & General", "https://images.unsplash.com/photo-1506744038136-46273834b3fb?auto=format&fit=facearea&w=48&h=48", "21 Apr 2022"),
+    ("Weekly Physics MCQs", "https://images.unsplash.com/photo-1465101046530-73398c7f28ca?auto=format&fit=facearea&w=48&h=48", "22 Apr 2022"),
+    ("Chemistry Quiz-22", "https://images.unsplash.com/photo-1519125323398-675f0ddb6308?auto=format&fit=facearea&w=48&h=48", "22 Apr 2022"),
+    ("Biology Special Classes", "https://images.unsplash.com/photo-1462331940025-496dfbfc7564?auto=format&fit=facearea&w=48&h=48", "25 Apr 2022"),
+]
+
+POLL_PARTICIPANTS = [
+    "https://randomuser.me/api/portraits/men/31.jpg",
+    "https://randomuser.me/api/portraits/women/32.jpg",
+    "https://randomuser.me/api/portraits/men/33.jpg",
+    "https://randomuser.me/api/portraits/women/34.jpg",
+    "https://randomuser.me/api/portraits/men/35.jpg",
+]
+
+TASKS = [
+    ("P", "Metals Purification Methods", "08:30 am, 22 Apr 2022"),
+    ("M", "Maths Algorithm", "08:30 am, 22 Apr 2022"),
+    ("D", "DNA & RNA Modifications", "08:30 am, 22 Apr 2022"),
+    ("F", "Fundamental Physics MCQs", "08:30 am, 22 Apr 2022"),
+]
+
+
+# Subject-wise daily score curve and the +/- noise applied to it
+SCORE_CURVES = {
+    "Mathematics": (lambda i: 60 + 20 * math.sin(i / 2.0) + 10 * math.cos(i / 3.0), 5),
+    "Physics": (lambda i: 45 + 30 * math.cos(i / 1.7) + 8 * math.sin(i / 2.5), 8),
+    "Chemistry": (lambda i: 55 + 18 * math.sin(i / 1.3) - 12 * math.cos(i / 2.2), 10),
+}
+
+
+def _score_rows(user_ids, dates, rng):
+    """Yield score_activity rows; the curves are evaluated once per day, not once per row"""
+    random_float = rng.random
+    curves = []
+    for subject in SCORE_SUBJECTS:
+        curve, noise = SCORE_CURVES.get(subject, (lambda i: 50, 10))
+        curves.append((subject, [(date, curve(i)) for i, date in enumerate(dates)], noise))
+
+    for user_id in user_ids:
+        for subject, points, noise in curves:
+            span = 2 * noise + 1
+            for date, base in points:
+                score = int(base + int(random_float() * span) - noise)
+                yield user_id, subject, date, max(0, min(100, score))
+
+
+class SeedReport:
+    """Row counts and timing for one seeding run"""
+
+    def __init__(self):
+        self.rows = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, table, count):
+        self.rows[table] = self.rows.get(table, 0) + count
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.elapsed if self.elapsed else 0.0
+
+    def display(self):
+        """Print the per-table row counts and throughput"""
+        for table, count in self.rows.items():
+            print(f"   {table:<20} {count:>12,} rows")
+        print(f"   {'total':<20} {self.total_rows:>12,} rows in {self.elapsed:.2f}s "
+              f"({self.rows_per_second:,.0f} rows/sec)")
+
+
+def _insert(cursor, report, table, sql, rows):
+    """executemany a generator of rows and record how many went in"""
+    cursor.executemany(sql, rows)
+    report.add(table, max(cursor.rowcount, 0))
+
+
+def _insert_ids(cursor, report, table, sql, rows):
+    """
+    Insert rows in one executemany and return the ids SQLite assigned, in order. Runs inside the
+    seeding transaction, so every id above the previous maximum is one of these rows.
+    """
+    last_id = cursor.execute(f'SELECT coalesce(MAX(id), 0) FROM {table}').fetchone()[0]
+    cursor.executemany(sql, rows)
+    ids = [row[0] for row in cursor.execute(f'SELECT id FROM {table} WHERE id > ? ORDER BY id', (last_id,))]
+    report.add(table, len(ids))
+    return ids
+
+
+def seed_users(conn, users, days=14, rng=None, variant=None):
+    """
+    Insert users plus their dashboard data in one transaction.
+    users is a sequence of (first_name, last_name, email, phone, password) with plaintext passwords,
+    which are stored hashed; variant(idx) picks the per-user variation used by the attendance/notes/score formulas.
+    """
+    rng = rng or random.Random()
+    variant = variant or (lambda idx: idx)
+    report = SeedReport()
+    cursor = conn.cursor()
+
+    conn.execute('BEGIN')
+    try:
+        # Hash each distinct password once, in parallel
+        plaintexts = sorted({user[4] for user in users})
+        hashes = dict(zip(plaintexts, hasher.hash_many(plaintexts)))
+        # SQLite assigns the ids, so AUTOINCREMENT never hands out the id of a deleted user again
+        user_ids = _insert_ids(cursor, report, 'users',
+                               'INSERT INTO users (first_name, last_name, email_address, phone_number, password) '
+                               'VALUES (?, ?, ?, ?, ?)',
+                               ((*user[:4], hashes[user[4]]) for user in users))
+
+        def per_user():
+            for idx, user_id in enumerate(user_ids):
+                yield idx, variant(idx), user_id
+
+        # Attendance (vary attended for each user for realism)
+        _insert(cursor, report, 'attendance',
+                'INSERT INTO attendance (user_id, attended, total) VALUES (?, ?, ?)',
+                ((user_id, 254 - v * 10 if (254 - v * 10) > 0 else 100 + v * 5, 300)
+                 for _, v, user_id in per_user()))
+
+        # Notes (vary counts slightly)
+        _insert(cursor, report, 'notes',
+                'INSERT INTO notes (user_id, note_type, count) VALUES (?, ?, ?)',
+                (row for _, v, user_id in per_user() for row in (
+                    (user_id, NOTE_TYPES[0], 254 - v * 5),
+                    (user_id, NOTE_TYPES[1], 25 + v),
+                    (user_id, NOTE_TYPES[2], 50 + v * 2))))
+
+        # Subjects (same subjects for all)
+        _insert(cursor, report, 'subjects',
+                'INSERT INTO subjects (user_id, subject_name) VALUES (?, ?)',
+                ((user_id, subject) for _, _, user_id in per_user() for subject in SUBJECTS))
+
+        _insert(cursor, report, 'timetable',
+                'INSERT INTO timetable (user_id, subject, date, time, status, duration) VALUES (?, ?, ?, ?, ?, ?)',
+                ((user_id, *row) for _, _, user_id in per_user() for row in TIMETABLE_DATA))
+
+        # Scores are summarized for the whole batch at the end rather than by a trigger per row
+        with score_summary.suspended(conn, user_ids):
+            # Score Activity (subject-wise daily scores, only for Mathematics, Physics, Chemistry)
+            today = datetime.now()
+            dates = [(today - timedelta(days=days - i - 1)).strftime('%Y-%m-%d') for i in range(days)]
+            _insert(cursor, report, 'score_activity',
+                    'INSERT INTO score_activity (user_id, subject, date, score) VALUES (?, ?, ?, ?)',
+                    _score_rows(user_ids, dates, rng))
+
+            # Test Scores (vary scores for each user)
+            _insert(cursor, report, 'test_scores',
+                    'INSERT INTO test_scores (user_id, subject, lesson, score) VALUES (?, ?, ?, ?)',
+                    ((user_id, subject, lesson, round(score, 1))
+                     for _, v, user_id in per_user()
+                     for score, subject, lesson in (
+                         (8.5 - v * 0.2, "Physics", "Lesson 4"),
+                         (6.0 + v * 0.3, "Chemistry", "Lesson 2"),
+                         (7.2 + v * 0.1, "Maths", "Lesson 2"),
+                         (9.0 - v * 0.1, "Economics", "Lesson 2"),
+                         (8.0 + v * 0.2, "Biology", "Lesson 2"),
+                         (8.8 - v * 0.1, "Biology", "Lesson 6"),
+                         (6.8 + v * 0.2, "Biology", "Lesson 5"),
+                     )))
+
+        _insert(cursor, report, 'notice_board',
+                'INSERT INTO notice_board (user_id, title, image_url, date) VALUES (?, ?, ?, ?)',
+                ((user_id, *row) for _, _, user_id in per_user() for row in NOTICE_DATA))
+
+        # Ongoing Poll (one per user); participants point at the ids the polls were given
+        poll_ids = _insert_ids(cursor, report, 'polls',
+                               'INSERT INTO polls (user_id, title, professor, end_time) VALUES (?, ?, ?, ?)',
+                               ((user_id, "Maths Extra Class Poll", "Prof. Joshi", "22 Apr 2022, 12:30 pm")
+                                for _, _, user_id in per_user()))
+        _insert(cursor, report, 'poll_participants',
+                'INSERT INTO poll_participants (poll_id, participant_img) VALUES (?, ?)',
+                ((poll_id, img) for poll_id in poll_ids for img in POLL_PARTICIPANTS))
+
+        _insert(cursor, report, 'upcoming_tasks',
+                'INSERT INTO upcoming_tasks (user_id, code, title, time) VALUES (?, ?, ?, ?)',
+                ((user_id, *task) for _, _, user_id in per_user() for task in TASKS))
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return report.finish()
+
+
+def seed_sample_data(conn):
+    """Insert the ten sample users and their dashboard data"""
+    return seed_users(conn, SAMPLE_USERS)
+
+
+class SyntheticUsers:
+    """Lazily generated, unique synthetic user rows (sized sequence)"""
+
+    def __init__(self, count, offset=0):
+        self.count = count
+        self.offset = offset
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for n in range(self.offset, self.offset + self.count):
+            first = FIRST_NAMES[n % len(FIRST_NAMES)]
+            last = LAST_NAMES[(n // len(FIRST_NAMES)) % len(LAST_NAMES)]
+            yield (first, last, f"{first.lower()}.{last.lower()}.{n}@students.example.com",
+                   f"+1 555-{n % 10000:04d}", SYNTHETIC_PASSWORD)
+
+
+def seed_synthetic(conn, count, days=14, seed=42):
+    """Insert count synthetic users with realistic dashboard data"""
+    rng = random.Random(seed)
+    # Every synthetic user n gets an id above n, so numbering from the highest id never repeats an email
+    # (a row count would, once users have been deleted)
+    offset = conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0]
+    # Cycle the ten sample variations so values stay in realistic ranges
+    return seed_users(conn, SyntheticUsers(count, offset), days=days, rng=rng, variant=lambda idx: idx % 10)
+
+
+def main():
+    """Command line entry point"""
+    from migrations import migrate
+
+    parser = argparse.ArgumentParser(description='Seed the User Portal database')
+    parser.add_argument('--users', type=int, default=10000, help='number of synthetic users to add')
+    parser.add_argument('--days', type=int, default=14, help='days of score activity per subject')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    args = parser.parse_args()
+
+    print(f"🌱 Seeding {args.users:,} synthetic users into '{DATABASE_NAME}'...")
+    with get_db() as conn:
+        migrate(conn)
+        report = seed_synthetic(conn, args.users, days=args.days, seed=args.seed)
+    report.display()
+
+
+if __name__ == '__main__':
+    main()
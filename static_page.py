@@ -0,0 +1,62 @@
+"""
+Pre-rendered pages for the User Portal System
+Pages with no per-request context are rendered and compressed once, then served with
+strong ETags, pre-compressed gzip/brotli variants and long-lived Cache-Control headers
+"""
+
+import gzip
+import hashlib
+import os
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli to serve br variants
+    brotli = None
+
+# Configuration
+STATIC_PAGE_MAX_AGE = int(os.environ.get('STATIC_PAGE_MAX_AGE', '86400'))
+
+
+class StaticPage:
+    """One pre-rendered document and its compressed variants"""
+
+    def __init__(self, body, mimetype='text/html', max_age=STATIC_PAGE_MAX_AGE):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.mimetype = mimetype
+        self.max_age = max_age
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        # encoding -> (body, etag); each representation needs its own strong ETag
+        self.variants = {'identity': (body, digest)}
+        self.variants['gzip'] = (gzip.compress(body, compresslevel=9, mtime=0), f"{digest}-gzip")
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body, quality=11), f"{digest}-br")
+
+    def _encoding(self, request):
+        """Pick the smallest variant the client accepts"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and request.accept_encodings.quality(encoding) > 0:
+                return encoding
+        return 'identity'
+
+    def response(self, request):
+        """Return a 200 with the negotiated variant, or a 304 if the client copy is current"""
+        encoding = self._encoding(request)
+        body, etag = self.variants[encoding]
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=self.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
+
+    def sizes(self):
+        """Return {encoding: bytes} for every variant"""
+        return {encoding: len(body) for encoding, (body, _) in self.variants.items()}
@@ -0,0 +1,31 @@
+"""
+Shared fixtures for the User Portal System tests
+Every test session gets its own database file and cheap password hashing, set before the app is imported
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault('PORTAL_DATABASE', os.path.join(tempfile.mkdtemp(prefix='portal-tests-'), 'portal.db'))
+os.environ.setdefault('PASSWORD_SCRYPT_N', '1024')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def portal():
+    """The Flask app module, with a freshly seeded database"""
+    import app
+    app.init_database()
+    return app
+
+
+@pytest.fixture
+def client(portal):
+    return portal.app.test_client()
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: slow load tests (deselect with -m "not benchmark")')
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+import analytics
+from database import get_db
+
+
+def test_cohort_reloads_only_when_activity_scores_change(portal):
+    cohort = analytics.CohortSnapshot(refresh_seconds=0)
+    cohort.summary(start=date.today())
+    loads = cohort.loads
+
+    with get_db() as conn:
+        conn.execute("INSERT INTO queries (special_mentions, brief) VALUES ('[]', 'unrelated commit')")
+    cohort.summary(start=date.today())
+    assert cohort.loads == loads
+    assert cohort.skipped_loads == 1
+
+    with get_db() as conn:
+        conn.execute('INSERT INTO score_activity (user_id, subject, date, score) VALUES (1, ?, date(), 50)',
+                     ('Physics',))
+    cohort.summary(start=date.today())
+    assert cohort.loads == loads + 1
+
+
+def test_cohort_serves_the_last_year_from_the_snapshot(portal, client, monkeypatch):
+    cohort = analytics.CohortSnapshot(days=365)
+    monkeypatch.setattr(analytics, 'cohort', cohort)
+    monkeypatch.setattr(analytics, 'cohort_trends', None)   # no full-history fallback
+
+    assert client.get('/api/analytics/cohort?days=365').status_code == 200
+    assert client.get('/api/analytics/cohort').get_json()['subjects'] == cohort.summary(
+        start=date.today() - timedelta(days=364))
+    assert cohort.loads == 1
+
+    response = client.get('/api/analytics/cohort?days=366')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert client.get('/api/analytics/trends?days=366').status_code == 400
+    assert client.get('/api/analytics/trends?days=366&cohort=0').status_code == 200
+
+
+def test_series_parsing_keeps_every_subject_and_value():
+    many = [(1, f"Subject {i:03d}", f"{(20000 + i) << 16 | (i % 101)}") for i in range(300)]
+    columns = analytics._parse_series(many)
+
+    assert len(columns.subjects) == 300
+    assert columns.subject_codes.max() == 299
+    assert columns.days.tolist() == [20000 + i for i in range(300)]
+    assert columns.scores.tolist() == [i % 101 for i in range(300)]
@@ -0,0 +1,76 @@
+import io
+import threading
+import time
+
+import bulk_users
+from cache import DEFAULT_DASHBOARD_KEY, dashboard_cache
+
+HEADER = 'first_name,last_name,email_address,phone_number,password\n'
+
+
+def csv_upload(prefix, count, start=0):
+    rows = (f'Bulk,User,{prefix}{i}@example.com,+1 555 {i:07d},password{i}\n' for i in range(start, start + count))
+    return (HEADER + ''.join(rows)).encode('utf-8')
+
+
+def test_login_completes_while_import_is_hashing(portal, client):
+    done = {}
+
+    def run_import():
+        started = time.perf_counter()
+        response = portal.app.test_client().post('/api/users/import?format=csv', data=csv_upload('hashing', 1200))
+        done['import'] = response
+        done['import_seconds'] = time.perf_counter() - started
+
+    importer = threading.Thread(target=run_import)
+    importer.start()
+    time.sleep(0.2)
+    started = time.perf_counter()
+    response = client.post('/api/authenticate', json={'email': 'alex.johnson@email.com', 'password': 'password123'})
+    login_seconds = time.perf_counter() - started
+    importer.join()
+
+    assert response.status_code == 200
+    assert done['import'].get_json()['imported'] == 1200
+    # The sign-in did not queue behind the import's 1200 hashes
+    assert login_seconds < done['import_seconds'] / 4
+
+
+def test_import_stopped_by_bad_bytes_reports_committed_rows(portal):
+    body = csv_upload('stopped', 400) + b'Bad,Bytes,\xff\xfe@example.com,+1 555 0000000,password\n'
+    report = bulk_users.import_users(bulk_users.parse_rows(io.BytesIO(body), 'csv'), chunk_size=50)
+    result = report.to_dict()
+
+    assert result['success'] is False
+    assert 0 < report.imported < 400
+    assert report.imported == report.stopped['line'] - 2   # header line and the unreadable line
+    assert result['error'] == report.stopped['error']
+
+
+def test_import_stops_before_writing_on_missing_column(portal):
+    rows = bulk_users.parse_rows(io.BytesIO(b'first_name,email_address\nA,a@example.com\n'), 'csv')
+    report = bulk_users.import_users(rows)
+
+    assert report.imported == 0
+    assert report.stopped['line'] == 1
+    assert 'password' in report.stopped['error']
+
+
+def test_import_invalidates_dashboard(portal, client):
+    dashboard_cache.set(DEFAULT_DASHBOARD_KEY, {'users': []})
+    response = client.post('/api/users/import?format=csv', data=csv_upload('dashboard', 2))
+
+    assert response.get_json()['imported'] == 2
+    assert dashboard_cache.get(DEFAULT_DASHBOARD_KEY) is None
+
+
+def test_user_listing_rejects_bad_pagination(portal, client):
+    for query in ('limit=abc', 'limit=0', 'limit=1001', 'limit=', 'after=abc', 'after=-1', f'after={2 ** 63}',
+                  'after=1.5'):
+        response = client.get(f'/api/users?{query}')
+        assert response.status_code == 400, query
+        assert 'error' in response.get_json()
+
+    page = client.get('/api/users?fields=id&after=1&limit=2').get_json()
+    assert [user['id'] for user in page['users']] == [2, 3]
+    assert page['next_after'] == 3
@@ -0,0 +1,32 @@
+from doubt_cache import DoubtCache, normalize
+
+
+def test_normalize_keeps_numbers_and_operators():
+    assert normalize("Solve: x^2 = 4.5, what's x?") == 'solve x ^ 2 = 4.5 whats x'
+
+
+def test_similar_questions_must_have_the_same_numbers(portal):
+    cache = DoubtCache(similarity=0.5)
+    cache.clear()
+    cache.store('Please solve the quadratic equation x^2 = 4 for real x', 'x = 2 or x = -2')
+
+    assert cache.lookup('Solve the quadratic equation x^2 = 9 for real x') is None
+    assert cache.lookup('Solve the quadratic equation x^2 = 4 for real x, please') == 'x = 2 or x = -2'
+    assert cache.similar_hits == 1
+
+
+def test_similar_questions_must_have_the_same_operators(portal):
+    cache = DoubtCache(similarity=0.5)
+    cache.clear()
+    cache.store('Simplify the expression x + 1 for any integer x', 'x + 1')
+
+    assert cache.lookup('Simplify the expression x - 1 for any integer x') is None
+
+
+def test_similar_questions_must_have_the_same_word_order(portal):
+    cache = DoubtCache()
+    cache.clear()
+    cache.store('How do I convert kilometers to miles', 'Multiply km by 0.621')
+
+    assert cache.lookup('How do I convert miles to kilometers') is None
+    assert cache.lookup('Please explain how to convert kilometers to miles') == 'Multiply km by 0.621'
@@ -0,0 +1,75 @@
+import json
+import threading
+import time
+
+import pytest
+
+import forum_events
+
+
+def read_events(stream, wanted, deadline):
+    """Collect events from a server-sent event stream until one of type wanted arrives"""
+    received = []
+    while time.monotonic() < deadline:
+        for block in next(stream).decode().split('\n\n'):
+            lines = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+            if lines.get('event') == wanted:
+                received.append(json.loads(lines['data']))
+        if received:
+            return received
+    return received
+
+
+def test_posted_query_reaches_an_open_stream(client, monkeypatch):
+    monkeypatch.setattr(forum_events.hub, 'heartbeat_seconds', 0.2)
+    response = client.get('/api/forum/events')
+    assert response.status_code == 200
+    stream = iter(response.response)
+    assert next(stream).decode() == forum_events.RETRY
+
+    posted = client.post('/api/raise-query', json={'special_mentions': ['Optics'], 'brief': 'Why do lenses focus light?'})
+    assert posted.status_code == 200
+
+    [event] = read_events(stream, 'query', time.monotonic() + 5)
+    assert event['id'] == posted.get_json()['id']
+    assert event['brief'] == 'Why do lenses focus light?'
+    assert event['tags'] == ['#Optics']
+    response.close()
+
+
+def test_streams_past_the_limit_are_refused(client, monkeypatch):
+    monkeypatch.setattr(forum_events.hub, 'max_clients', forum_events.hub.clients)
+    response = client.get('/api/forum/events')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '30'
+
+
+@pytest.mark.benchmark
+def test_fan_out_reaches_a_thousand_streams(portal):
+    clients, messages = 1000, 200
+    hub = forum_events.ForumEvents(max_clients=clients, heartbeat_seconds=60, backlog=messages)
+    received = [[] for _ in range(clients)]
+
+    def read(stream, ids):
+        for chunk in stream:
+            ids += [int(line[len('id: '):].split('.')[1]) for line in chunk.splitlines() if line.startswith('id: ')]
+            if len(ids) >= messages:
+                break
+        stream.close()
+
+    streams = [hub.stream() for _ in range(clients)]
+    readers = [threading.Thread(target=read, args=(stream, ids), daemon=True) for stream, ids in zip(streams, received)]
+    for reader in readers:
+        reader.start()
+    query_mark, answer_mark = hub.marks
+
+    start = time.perf_counter()
+    for n in range(1, messages + 1):
+        hub.publish([('answer', {'id': n, 'query_id': 1, 'text': 'Fan-out'}, (query_mark, answer_mark + n))])
+    for reader in readers:
+        reader.join(60)
+    elapsed = time.perf_counter() - start
+
+    expected = [answer_mark + n for n in range(1, messages + 1)]
+    assert all(ids == expected for ids in received)
+    print(f"\n{messages / elapsed:,.0f} messages/s, {messages * clients / elapsed:,.0f} deliveries/s to {clients:,} streams")
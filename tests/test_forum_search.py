@@ -0,0 +1,31 @@
+import json
+
+import forum_search
+from database import get_db
+
+
+def test_old_posts_are_ranked_with_the_rest(portal):
+    with get_db() as conn:
+        conn.execute("INSERT INTO queries (special_mentions, brief) VALUES ('[]', 'zorbium zorbium zorbium decay')")
+        best = conn.execute('SELECT MAX(id) FROM queries').fetchone()[0]
+        conn.executemany('INSERT INTO queries (special_mentions, brief) VALUES (?, ?)',
+                         (('[]', f'Question {n} about lab safety, mentions zorbium once') for n in range(2100)))
+
+        results = forum_search.search(conn, 'zorbium')
+        assert results[0]['id'] == best
+        assert len(forum_search.search(conn, 'zorbium', limit=50, offset=2050)) == 50
+
+
+def test_snippets_come_from_the_brief_or_answers(portal):
+    with get_db() as conn:
+        conn.execute('INSERT INTO queries (special_mentions, brief) VALUES (?, ?)',
+                     (json.dumps(['Quarkology']), 'Why is the sky blue at noon?'))
+        query_id = conn.execute('SELECT MAX(id) FROM queries').fetchone()[0]
+        conn.execute('INSERT INTO answers (query_id, answer_text) VALUES (?, ?)',
+                     (query_id, 'Rayleigh scattering favours short wavelengths'))
+
+        [tag_only] = forum_search.search(conn, 'quarkology')
+        [in_answer] = forum_search.search(conn, 'rayleigh')
+
+    assert tag_only['snippet_html'] == 'Why is the sky blue at noon?'
+    assert in_answer['snippet_html'] == '<mark>Rayleigh</mark> scattering favours short wavelengths'
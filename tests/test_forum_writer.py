@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+import forum_writer
+from database import get_db
+from forum_writer import GroupCommitWriter, SubmissionPendingError, WriterBusyError
+
+
+def count_queries(brief):
+    with get_db() as conn:
+        return conn.execute('SELECT COUNT(*) FROM queries WHERE brief = ?', (brief,)).fetchone()[0]
+
+
+def blocking_insert(release):
+    def insert(conn, brief):
+        release.wait(5)
+        return forum_writer.insert_query(conn, brief, '[]', [], forum_writer.timestamp())
+    return insert
+
+
+def test_timed_out_submission_in_the_queue_is_withdrawn(portal):
+    writer = GroupCommitWriter(batch_size=1)
+    release = threading.Event()
+    first = writer.submit(blocking_insert(release), 'Writer ahead of the queue')
+
+    with pytest.raises(WriterBusyError):
+        writer.write(forum_writer.insert_query, 'Withdrawn after timeout', '[]', [], forum_writer.timestamp(),
+                     timeout=0.1)
+    release.set()
+    first.result(5)
+    writer.write(forum_writer.insert_query, 'Written after the withdrawn one', '[]', [], forum_writer.timestamp())
+
+    assert count_queries('Withdrawn after timeout') == 0
+    assert writer.stats()['expired'] == 1
+
+
+def test_timed_out_submission_being_committed_is_saved_once(portal):
+    writer = GroupCommitWriter()
+    release = threading.Event()
+    threading.Timer(0.3, release.set).start()
+
+    with pytest.raises(SubmissionPendingError):
+        writer.write(blocking_insert(release), 'Committed after timeout', timeout=0.1)
+    writer.write(forum_writer.insert_query, 'Committed after it', '[]', [], forum_writer.timestamp())
+
+    assert count_queries('Committed after timeout') == 1
+    assert writer.stats()['pending'] == 1
+
+
+def test_pending_submission_is_accepted_not_failed(client, monkeypatch):
+    def pending(*args):
+        raise SubmissionPendingError('Submission received and is still being saved')
+    monkeypatch.setattr(forum_writer.writer, 'add_query', pending)
+
+    response = client.post('/api/raise-query', json={'special_mentions': [], 'brief': 'Slow disk question'})
+
+    assert response.status_code == 202
+    assert response.get_json()['pending'] is True
+    assert 'id' not in response.get_json()
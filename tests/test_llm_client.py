@@ -0,0 +1,114 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+import pytest
+
+import llm_client
+import llm_stub
+from llm_client import LLMBusyError, LLMClient, LLMError, LLMRateLimitError, RateLimiter
+
+
+@pytest.fixture
+def stub_url(monkeypatch):
+    """Base URL of the local OpenAI stub on a free port (its counters are llm_stub.StubHandler.state)"""
+    server, base_url = llm_stub.start_stub_server(latency=0.2, token_delay=0.001)
+    monkeypatch.setenv('OPENAI_API_KEY', 'stub')
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def stub(stub_url):
+    return llm_stub.StubHandler.state
+
+
+def make_client(stub_url, **options):
+    options.setdefault('rate_limiter', RateLimiter(rate_per_minute=0))
+    return LLMClient(base_url=stub_url, backoff_base=0.01, **options)
+
+
+def test_identical_questions_share_one_upstream_call(stub, stub_url):
+    client = make_client(stub_url)
+
+    def ask(_):
+        flight, _ = client.submit("What is Ohm's law?")
+        return flight.result()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        answers = list(executor.map(ask, range(8)))
+
+    assert answers == [llm_stub.stub_answer("What is Ohm's law?")] * 8
+    assert client.counters['upstream_calls'] == 1
+    assert client.counters['coalesced'] == 7
+    assert stub.calls == 1
+
+
+def test_transient_503s_are_retried_with_backoff(stub, stub_url):
+    client = make_client(stub_url)
+    stub.fail_next = 2
+
+    flight, _ = client.submit('Define photosynthesis')
+
+    assert flight.result() == llm_stub.stub_answer('Define photosynthesis')
+    assert client.counters['retries'] == 2
+    assert stub.calls == 3
+
+
+def test_no_retry_once_tokens_were_sent(stub, stub_url, monkeypatch):
+    client = make_client(stub_url)
+    stream_upstream = client._stream_upstream
+
+    def drop_after_answer(flight, message, start):
+        stream_upstream(flight, message, start)
+        raise openai.APIConnectionError(request=None)
+    monkeypatch.setattr(client, '_stream_upstream', drop_after_answer)
+
+    flight, _ = client.submit('Define osmosis')
+
+    with pytest.raises(LLMError):
+        flight.result()
+    assert flight.tokens
+    assert client.counters['retries'] == 0
+    assert stub.calls == 1
+
+
+def test_each_tenant_has_its_own_rate_limit(stub_url):
+    client = make_client(stub_url, rate_limiter=RateLimiter(rate_per_minute=1, burst=2))
+    client.submit('Question one', tenant='10.0.0.1')
+    client.submit('Question two', tenant='10.0.0.1')
+
+    with pytest.raises(LLMRateLimitError):
+        client.submit('Question three', tenant='10.0.0.1')
+    client.submit('Question three', tenant='10.0.0.2')
+    assert client.counters['rate_limited'] == 1
+
+
+def test_busy_when_every_slot_is_taken(stub_url):
+    client = make_client(stub_url, max_concurrency=1, queue_timeout=0.05)
+    flight, _ = client.submit('First question')
+
+    with pytest.raises(LLMBusyError):
+        client.submit('Second question')
+    assert client.counters['busy'] == 1
+    flight.result()
+
+
+def test_doubt_solver_streams_server_sent_events_offline(client, stub_url, monkeypatch):
+    monkeypatch.setattr(llm_client.client.rate_limiter, 'rate', 0)
+    monkeypatch.setattr(llm_client.client, 'base_url', stub_url)
+    llm_client.client.reset()
+    monkeypatch.setattr('doubt_cache.doubt_cache.enabled', False)
+
+    response = client.post('/api/doubt-solver', json={'message': 'What is inertia?', 'stream': True})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    assert events[-1] == ('done', {})
+    assert ''.join(payload['text'] for event, payload in events[:-1] if event == 'token') == \
+        llm_stub.stub_answer('What is inertia?')
+    llm_client.client.reset()
@@ -0,0 +1,34 @@
+from database import get_db
+from login_guard import EmailFilter
+
+
+def register(email):
+    with get_db() as conn:
+        conn.execute('INSERT INTO users (first_name, last_name, email_address, phone_number, password) '
+                     'VALUES (?, ?, ?, ?, ?)', ('Filter', 'Test', email, '0000000000', 'x'))
+
+
+def test_unknown_emails_are_rejected_without_the_database(portal, monkeypatch):
+    emails = EmailFilter(refresh_seconds=3600)
+    register('known.before@example.com')
+    assert emails.might_exist('known.before@example.com')
+
+    def no_database():
+        raise AssertionError('the users table was read')
+    monkeypatch.setattr(emails, '_connection', no_database)
+    register('committed.meanwhile@example.com')   # a commit from another connection
+
+    assert not any(emails.might_exist(f"nobody{n}@example.com") for n in range(100))
+    assert emails.might_exist('known.before@example.com')
+
+
+def test_accounts_from_other_processes_appear_after_the_refresh_interval(portal):
+    emails = EmailFilter(refresh_seconds=3600)
+    assert not emails.might_exist('registered.elsewhere@example.com')
+    register('registered.elsewhere@example.com')
+    assert not emails.might_exist('registered.elsewhere@example.com')
+
+    emails.refresh_seconds = 0
+    assert emails.might_exist('registered.elsewhere@example.com')
+    assert emails.stats()['rebuilds'] == 1
+    assert emails.stats()['syncs'] == 1
@@ -0,0 +1,81 @@
+"""
+EXPLAIN QUERY PLAN checks for the queries the routes issue: every table lookup must use an index
+"""
+
+from datetime import date
+
+import pytest
+
+import analytics
+import forum
+import forum_events
+import forum_search
+import forum_tags
+import rankings
+from dashboard_data import DASHBOARD_QUERY
+from database import get_db
+from performance import PerformanceQuery
+
+ROUTE_QUERIES = [
+    ('dashboard', DASHBOARD_QUERY, {'user_id': None}),
+    ('authenticate_user', '''
+        SELECT id, first_name, last_name, email_address, phone_number, password FROM users WHERE email_address = ?
+    ''', ('a@b.com',)),
+    ('get_all_users (keyset page)', 'SELECT id, email_address FROM users WHERE id > ? ORDER BY id LIMIT ?', (0, 100)),
+    ('delete_user', 'SELECT id FROM users WHERE id = ?', (1,)),
+    ('performance_data (first 14 days)', *PerformanceQuery(limit=14).sql(1)),
+    ('performance_data (weekly rollup from score_summary)',
+     *PerformanceQuery(start=date(2025, 1, 1), end=date(2025, 12, 31), rollup='week', window=4).sql(1)),
+    ('performance_data (weekly rollup, raw rows)',
+     *PerformanceQuery(start=date(2025, 1, 1), end=date(2025, 12, 31), rollup='week').sql(1, use_summary=False)),
+    ('analytics trends (one student)', analytics.SERIES_QUERY.format(filters='user_id = :user_id AND date >= :start'),
+     {'user_id': 1, 'start': '2025-01-01'}),
+    ('rankings rebuild (subjects)', rankings.SUBJECT_QUERY, ()),
+    ('rankings rebuild (attendance)', rankings.ATTENDANCE_QUERY, ()),
+    ('analytics cohort change marker', analytics.COHORT_MARKER_QUERY, ()),
+    ('forum (first page)', forum.FIRST_PAGE_QUERY, {'limit': 21}),
+    ('forum (next page)', forum.PAGE_QUERY, {'created_at': '2025-01-01 00:00:00', 'id': 100, 'limit': 21}),
+    ('forum (answers for a page)', forum.ANSWERS_QUERY.format(placeholders='?,?,?'), (1, 2, 3)),
+    ('forum search (BM25, tag filter)', forum_search.SEARCH_QUERY.format(tag_filter=forum_search.TAG_FILTER),
+     {'match': '"ohm"* tags : "Physics"', 'tag_id': 1, 'limit': 20, 'offset': 0}),
+    ('forum by tag (first page)', forum.TAG_FIRST_PAGE_QUERY, {'tag_id': 1, 'limit': 21}),
+    ('forum by tag (next page)', forum.TAG_PAGE_QUERY,
+     {'tag_id': 1, 'created_at': '2025-01-01 00:00:00', 'id': 100, 'limit': 21}),
+    ('forum (tags for a page)', forum_tags.PAGE_TAGS_QUERY.format(placeholders='?,?,?'), (1, 2, 3)),
+    ('forum tag lookup', forum_tags.TAG_ID_QUERY, ('physics',)),
+    ('forum tag counts', forum_tags.TOP_TAGS_QUERY, {'limit': 50}),
+    ('forum events (new queries)', forum_events.NEW_QUERIES, (0, 200)),
+    ('forum events (new answers)', forum_events.NEW_ANSWERS, (0, 200)),
+    ('forum events (last ids)', forum_events.LAST_IDS, ()),
+    ('doubt_solver (exact cache)', 'SELECT id, answer FROM doubt_cache WHERE question_key = ? AND created_at >= ?', ('q', 0)),
+]
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for sql"""
+    return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()]
+
+
+def full_scans(plan):
+    """Return the plan lines that scan a table without an index"""
+    scans = []
+    for detail in plan:
+        if not detail.startswith('SCAN '):
+            continue
+        if 'USING' in detail or 'CONSTANT ROW' in detail:
+            continue
+        # CTEs and FROM-subqueries are materialised rows, not tables
+        target = detail.split()[1]
+        if target in ('me', 'uid', 'hits') or target.startswith('('):
+            continue
+        # FTS5 MATCH lookups (index string "...:M...") and json_each over one row's value are not table scans
+        if 'VIRTUAL TABLE' in detail and (':M' in detail or target in ('json_each', 'json_tree')):
+            continue
+        scans.append(detail)
+    return scans
+
+
+@pytest.mark.parametrize('name, sql, params', ROUTE_QUERIES, ids=[name for name, _, _ in ROUTE_QUERIES])
+def test_route_query_uses_indexes(portal, name, sql, params):
+    with get_db() as conn:
+        assert full_scans(explain(conn, sql, params)) == []
@@ -0,0 +1,64 @@
+import threading
+
+from database import get_db
+from rankings import Rankings
+
+
+def _post_forum_query():
+    with get_db() as conn:
+        conn.execute("INSERT INTO queries (special_mentions, brief) VALUES ('[]', 'unrelated commit')")
+
+
+def _add_test_score(user_id, score):
+    with get_db() as conn:
+        conn.execute('INSERT INTO test_scores (user_id, subject, lesson, score) VALUES (?, ?, ?, ?)',
+                     (user_id, 'Physics', 'Lesson 9', score))
+
+
+def test_rebuilds_only_when_ranked_data_changes(portal):
+    rankings = Rankings(refresh_seconds=0)
+    rankings.student(1)
+    assert rankings.rebuilds == 1
+
+    _post_forum_query()
+    rankings.student(1)
+    assert rankings.rebuilds == 1
+    assert rankings.skipped_rebuilds == 1
+
+    _add_test_score(1, 10.0)
+    rankings.student(1)
+    assert rankings.rebuilds == 2
+
+
+def test_lookups_do_not_wait_for_a_rebuild(portal):
+    rankings = Rankings(refresh_seconds=0)
+    before = rankings.student(2)
+    _add_test_score(2, 1.0)
+
+    # Another request is rebuilding: lookups keep answering from the current indexes
+    rankings._build_lock.acquire()
+    try:
+        result = {}
+        lookup = threading.Thread(target=lambda: result.update(rankings.student(2)))
+        lookup.start()
+        lookup.join(timeout=2)
+        assert not lookup.is_alive()
+        assert result == before
+    finally:
+        rankings._build_lock.release()
+    assert rankings.student(2) != before
+
+
+def test_writes_during_a_rebuild_are_kept(portal):
+    rankings = Rankings(refresh_seconds=0)
+    rankings.student(3)
+    _add_test_score(3, 2.0)
+    build = rankings._build
+
+    def build_with_concurrent_write(conn):
+        indexes = build(conn)
+        rankings.attendance_written(3, 1, 1000)   # committed after the rebuild read attendance
+        return indexes
+
+    rankings._build = build_with_concurrent_write
+    assert rankings.student(3)['attendance']['value'] == 0.001
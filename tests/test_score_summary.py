@@ -0,0 +1,57 @@
+import score_summary
+from database import get_db
+
+USER = 900001   # no seeded student has this id
+
+
+def summary(conn, source, grain, period):
+    return conn.execute('''
+        SELECT count, total, min_score, max_score FROM score_summary
+        WHERE source = ? AND grain = ? AND user_id = ? AND subject = 'Physics' AND period = ?
+    ''', (source, grain, USER, period)).fetchone()
+
+
+def test_triggers_keep_the_summaries_equal_to_a_full_recomputation(portal):
+    with get_db() as conn:
+        assert score_summary.missing_triggers(conn) == []
+        low, high, middle = (conn.execute(
+            "INSERT INTO score_activity (user_id, subject, date, score) VALUES (?, 'Physics', ?, ?)",
+            (USER, day, score)).lastrowid for day, score in
+            (('2024-03-04', 40), ('2024-03-05', 90), ('2024-03-06', 70)))
+        assert summary(conn, 'activity', 'week', '2024-03-04') == (3, 200, 40, 90)
+        assert score_summary.check(conn) == []
+
+        # Removing the period's maximum and minimum must recompute them from the remaining rows
+        conn.execute('DELETE FROM score_activity WHERE id = ?', (high,))
+        assert summary(conn, 'activity', 'week', '2024-03-04') == (2, 110, 40, 70)
+        conn.execute('UPDATE score_activity SET score = 85 WHERE id = ?', (low,))
+        assert summary(conn, 'activity', 'week', '2024-03-04') == (2, 155, 70, 85)
+        assert score_summary.check(conn) == []
+
+        # Moving a row to another week (and month) updates both periods
+        conn.execute("UPDATE score_activity SET date = '2024-04-01' WHERE id = ?", (middle,))
+        assert summary(conn, 'activity', 'week', '2024-03-04') == (1, 85, 85, 85)
+        assert summary(conn, 'activity', 'month', '2024-04-01') == (1, 70, 70, 70)
+        assert summary(conn, 'activity', 'all', '') == (2, 155, 70, 85)
+        conn.execute('DELETE FROM score_activity WHERE id = ?', (low,))
+        assert summary(conn, 'activity', 'week', '2024-03-04') is None
+        assert score_summary.check(conn) == []
+
+        first, second = (conn.execute(
+            "INSERT INTO test_scores (user_id, subject, lesson, score) VALUES (?, 'Physics', 'Optics', ?)",
+            (USER, score)).lastrowid for score in (55.5, 95.0))
+        conn.execute('UPDATE test_scores SET score = 30 WHERE id = ?', (second,))
+        assert summary(conn, 'test', 'all', '') == (2, 85.5, 30, 55.5)
+        conn.execute('DELETE FROM test_scores WHERE id = ?', (first,))
+        assert summary(conn, 'test', 'all', '') == (1, 30, 30, 30)
+        assert score_summary.check(conn) == []
+
+        # A stale summary row is reported
+        stale = "UPDATE score_summary SET max_score = ? WHERE source = 'test' AND user_id = ?"
+        conn.execute(stale, (99, USER))
+        assert [row[:3] for row in score_summary.check(conn)] == [('test', 'all', USER)]
+        conn.execute(stale, (30, USER))
+
+        conn.execute('DELETE FROM score_activity WHERE user_id = ?', (USER,))
+        conn.execute('DELETE FROM test_scores WHERE user_id = ?', (USER,))
+        assert score_summary.check(conn) == []
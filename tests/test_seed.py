@@ -0,0 +1,27 @@
+import seed
+from database import get_db
+
+
+def _delete_user(conn, user_id):
+    conn.execute('DELETE FROM polls WHERE user_id = ?', (user_id,))
+    conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+    conn.commit()
+
+
+def test_synthetic_users_after_deletes_get_fresh_ids_and_emails(portal):
+    with get_db() as conn:
+        seed.seed_synthetic(conn, 3, days=2)
+        first_id, last_id = conn.execute('SELECT MIN(id), MAX(id) FROM users').fetchone()
+        # Removing an early user used to make the next batch reuse the newest synthetic email
+        _delete_user(conn, first_id)
+        # Removing the newest user used to make the next batch reuse its id
+        _delete_user(conn, last_id)
+
+        report = seed.seed_synthetic(conn, 3, days=2)
+        added = [row[0] for row in conn.execute('SELECT id FROM users ORDER BY id DESC LIMIT 3')]
+        poll_id = conn.execute('SELECT poll_id FROM poll_participants ORDER BY id DESC LIMIT 1').fetchone()[0]
+        poll_user = conn.execute('SELECT user_id FROM polls WHERE id = ?', (poll_id,)).fetchone()[0]
+
+    assert report.rows['users'] == 3
+    assert min(added) > last_id
+    assert poll_user == max(added)
@@ -0,0 +1,23 @@
+from validators import (EMAIL_MESSAGE, INPUT_FIELDS, NAME_MESSAGE, PHONE_MESSAGE, REQUIRED_MESSAGE, first_error,
+                        record_errors, validate_many)
+
+VALID = dict(zip(INPUT_FIELDS, ('Mary-Jane', "O'Neil", 'mary@school.example.com', '(555) 010-0000', 'secret')))
+
+
+def test_missing_fields_are_not_pattern_checked():
+    record = {**VALID, 'first_name': '', 'phone_number': 'call me'}
+    del record['email_address']
+
+    assert record_errors(record) == {'first_name': REQUIRED_MESSAGE, 'email_address': REQUIRED_MESSAGE,
+                                     'phone_number': PHONE_MESSAGE}
+
+
+def test_first_only_stops_at_the_error_signup_reports():
+    records = [VALID, {**VALID, 'password': '', 'last_name': '42'},
+               {**VALID, 'last_name': '42', 'email_address': 'nobody@nowhere'}, {**VALID, 'phone_number': 'x'}]
+
+    full, short = validate_many(records), validate_many(records, first_only=True)
+
+    assert short == [{}, {'password': REQUIRED_MESSAGE}, {'last_name': NAME_MESSAGE}, {'phone_number': PHONE_MESSAGE}]
+    assert full[2] == {'last_name': NAME_MESSAGE, 'email_address': EMAIL_MESSAGE}
+    assert [first_error(errors) for errors in full] == [first_error(errors) for errors in short]
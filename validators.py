@@ -0,0 +1,88 @@
+"""
+Input validation for the User Portal System
+Precompiled, length-bounded patterns plus a batch API used by signup and bulk import
+"""
+
+import re
+
+# Patterns are compiled once; fullmatch anchors both ends
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'[\+]?[0-9\s\-\(\)]{10,15}')
+NAME_PATTERN = re.compile(r'[a-zA-Z\s\-\']+')
+
+# Length caps checked before any regex runs, so pathological inputs cost O(1)
+MAX_EMAIL_LENGTH = 254   # RFC 5321 path limit
+MAX_PHONE_LENGTH = 16
+MAX_NAME_LENGTH = 100
+
+INPUT_FIELDS = ('first_name', 'last_name', 'email_address', 'phone_number', 'password')
+
+REQUIRED_MESSAGE = 'All fields are required'
+NAME_MESSAGE = 'Names should only contain letters, spaces, and hyphens'
+EMAIL_MESSAGE = 'Please enter a valid email address'
+PHONE_MESSAGE = 'Please enter a valid phone number'
+
+# field -> (pattern, max length, message); checked in this order
+FIELD_RULES = {
+    'first_name': (NAME_PATTERN, MAX_NAME_LENGTH, NAME_MESSAGE),
+    'last_name': (NAME_PATTERN, MAX_NAME_LENGTH, NAME_MESSAGE),
+    'email_address': (EMAIL_PATTERN, MAX_EMAIL_LENGTH, EMAIL_MESSAGE),
+    'phone_number': (PHONE_PATTERN, MAX_PHONE_LENGTH, PHONE_MESSAGE),
+}
+
+
+def validate_email(email):
+    """Validate email format"""
+    return len(email) <= MAX_EMAIL_LENGTH and EMAIL_PATTERN.fullmatch(email) is not None
+
+
+def validate_phone(phone):
+    """Validate phone number format"""
+    return len(phone) <= MAX_PHONE_LENGTH and PHONE_PATTERN.fullmatch(phone) is not None
+
+
+def validate_name(name):
+    """Validate name (letters, spaces, hyphens only)"""
+    return len(name) <= MAX_NAME_LENGTH and NAME_PATTERN.fullmatch(name) is not None
+
+
+def record_errors(record, first_only=False):
+    """
+    Validate one user record; returns {field: message}, empty if valid. Fields missing a value are not
+    pattern-checked. With first_only, stops at the problem first_error would report.
+    """
+    get = record.get
+    errors = {}
+    if not all(map(get, INPUT_FIELDS)):
+        errors = {field: REQUIRED_MESSAGE for field in INPUT_FIELDS if not get(field)}
+        if first_only:
+            return {next(iter(errors)): REQUIRED_MESSAGE}
+    for field, (pattern, max_length, message) in FIELD_RULES.items():
+        if field not in errors:
+            value = record[field]
+            if len(value) > max_length or pattern.fullmatch(value) is None:
+                errors[field] = message
+                if first_only:
+                    return errors
+    return errors
+
+
+def validate_many(records, first_only=False):
+    """
+    Validate a batch of user records (dicts keyed by INPUT_FIELDS, values already stripped).
+    Returns one {field: message} dict per record; an empty dict means the record is valid.
+    first_only keeps only the first problem of each record (see record_errors).
+    """
+    return [record_errors(record, first_only) for record in records]
+
+
+def first_error(errors):
+    """The single message signup reports for a record's errors (required fields first), or None"""
+    if not errors:
+        return None
+    if REQUIRED_MESSAGE in errors.values():
+        return REQUIRED_MESSAGE
+    for field in FIELD_RULES:
+        if field in errors:
+            return errors[field]
+    return next(iter(errors.values()))